@@ -1,167 +1,227 @@
+import bisect
+import os
+import queue
 import sqlite3
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
 from datetime import datetime
-from PIL import Image
+from gestion.catalogo import catalogo
+from gestion.autocompletado import IndiceAutocompletado
+from gestion.dinero import a_centavos, a_texto, formatear
+from gestion.reportes import REPORTES, exportar
+from gestion import trabajador
+from gestion.metricas import metricas, medir
 
 # CONFIGURACIÓN VISUAL
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
+INTERVALO_VIGILANCIA = 2000 # ms entre chequeos de cambios hechos por otras terminales
+ESPERA_BUSQUEDA = 250 # ms sin teclear antes de buscar
+INTERVALO_COLA_UI = 30 # ms entre revisiones de resultados que llegan de los hilos de DB
+INTERVALO_LATIDO = 100 # ms; si el latido llega tarde, la ventana estuvo congelada (ui.congelamiento)
 
 # ==========================================
-# PARTE 1: BACKEND (DB + LÓGICA FINANCIERA) - VERSIÓN ANTI-LOCK
+# PARTE 1: BACKEND (DB + LÓGICA FINANCIERA)
 # ==========================================
-def iniciar_db():
-    # timeout=10 hace que espere 10 segundos antes de dar error de bloqueo
-    conn = sqlite3.connect("negocio.db", timeout=10)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS productos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            tipo TEXT, 
-            nombre TEXT, 
-            genero TEXT, 
-            cantidad INTEGER, 
-            precio REAL,
-            UNIQUE(nombre, tipo, genero))''')
-    
-    cursor.execute('''CREATE TABLE IF NOT EXISTS historial (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            ticket_id TEXT,
-            producto_id INTEGER, 
-            producto_nombre TEXT, 
-            tipo_movimiento TEXT, 
-            cantidad INTEGER, 
-            precio_unitario REAL,
-            total_renglon REAL,
-            fecha TEXT)''')
-    conn.commit()
-    conn.close()
-
-def db_consultar(query, params=()):
-    try:
-        # Usamos 'with' para que la conexión se cierre AUTOMÁTICAMENTE al terminar
-        with sqlite3.connect("negocio.db", timeout=10) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            datos = cursor.fetchall()
-            return datos
-    except Exception as e:
-        print(f"Error Lectura DB: {e}")
-        return []
-
-def db_ejecutar(query, params=()):
-    try:
-        with sqlite3.connect("negocio.db", timeout=10) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return "OK", cursor.lastrowid
-    except Exception as e:
-        return str(e), 0
-
-# --- FUNCIONES ESPECÍFICAS (Wrappers) ---
-
-def db_listar_productos(filtro=""):
-    q = "SELECT id, tipo, nombre, genero, cantidad, precio FROM productos"
-    if filtro: q += f" WHERE nombre LIKE '%{filtro}%' OR tipo LIKE '%{filtro}%' ORDER BY nombre"
-    else: q += " ORDER BY nombre"
-    return db_consultar(q)
-
-def db_actualizar_producto(pid, t, n, g, c, p):
-    res, _ = db_ejecutar("UPDATE productos SET tipo=?, nombre=?, genero=?, cantidad=?, precio=? WHERE id=?", (t, n, g, c, p, pid))
-    return res
-
-def db_obtener_precio(pid):
-    res = db_consultar("SELECT precio FROM productos WHERE id=?", (pid,))
-    return res[0][0] if res else 0.0
-
-def db_procesar_venta(carrito):
-    # En transacciones complejas (varios pasos), controlamos la conexión manualmente
-    conn = sqlite3.connect("negocio.db", timeout=10)
-    cursor = conn.cursor()
-    
-    ticket_id = f"T-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    try:
-        for item in carrito:
-            # 1. Verificar Stock
-            cursor.execute("SELECT cantidad FROM productos WHERE id=?", (item['id'],))
-            stock_actual = cursor.fetchone()[0]
-            if stock_actual < item['cantidad']:
-                conn.close(); return f"Error: Stock insuficiente para {item['nombre']}"
-            
-            # 2. Descontar
-            cursor.execute("UPDATE productos SET cantidad=? WHERE id=?", (stock_actual - item['cantidad'], item['id']))
-            
-            # 3. Historial
-            total_linea = item['cantidad'] * item['precio']
-            cursor.execute("""
-                INSERT INTO historial (ticket_id, producto_id, producto_nombre, tipo_movimiento, cantidad, precio_unitario, total_renglon, fecha)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (ticket_id, item['id'], item['nombre'], "VENTA", item['cantidad'], item['precio'], total_linea, fecha))
-            
-        conn.commit()
-        return "OK"
-    except Exception as e: 
-        conn.rollback() # Si falla, deshacer cambios
-        return str(e)
-    finally:
-        conn.close() # ESTO GARANTIZA QUE SIEMPRE SE CIERRE
-
-def db_procesar_compra(carrito):
-    conn = sqlite3.connect("negocio.db", timeout=10)
-    cursor = conn.cursor()
-    ticket_id = f"C-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    try:
-        for item in carrito:
-            pid, nom = 0, item['nombre']
-            if item['nuevo']:
-                cursor.execute("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)", 
-                              (item['tipo'], item['nombre'], item['genero'], item['cantidad'], item['precio']))
-                pid = cursor.lastrowid
-            else:
-                pid = item['id']
-                cursor.execute("UPDATE productos SET cantidad=cantidad+?, precio=? WHERE id=?", (item['cantidad'], item['precio'], pid))
-                if 'nombre_real' in item: nom = item['nombre_real']
-            
-            total_linea = item['cantidad'] * item['precio']
-            cursor.execute("INSERT INTO historial VALUES (NULL,?,?,?,?,?,?,?,?)", 
-                           (ticket_id, pid, nom, "COMPRA", item['cantidad'], item['precio'], total_linea, fecha))
-        conn.commit()
-        return "OK"
-    except Exception as e: 
-        conn.rollback()
-        return str(e)
-    finally:
-        conn.close()
+# Vive en gestion.db (sin dependencias de Tk) para poder usarlo desde scripts y la CLI.
+# Con NEGOCIO_SERVIDOR definida la app es un cliente liviano de gestion.servidor:
+# las mismas funciones, pero resueltas por HTTP contra la caja que tiene la base.
+if os.environ.get("NEGOCIO_SERVIDOR"):
+    from gestion.cliente import (iniciar_db, db_buscar_productos, db_actualizar_producto, db_obtener_precio,
+                                 db_crear_producto, db_historial_pagina, db_totales_dashboard,
+                                 db_procesar_venta, db_procesar_compra, importar, generar)
+else:
+    from gestion.db import (iniciar_db, db_buscar_productos, db_actualizar_producto, db_obtener_precio,
+                            db_crear_producto, db_historial_pagina, db_totales_dashboard,
+                            db_procesar_venta, db_procesar_compra)
+    from gestion.importador import importar
+    from gestion.reportes import generar
 
 # ==========================================
 # PARTE 2: WIDGETS PROPIOS
 # ==========================================
 class AutocompleteCombobox(ttk.Combobox):
-    def __init__(self, master=None, **kwargs):
+    # matcher: clase que se arma con (lista, stock) y responde buscar(texto, limite) (ver gestion.autocompletado)
+    def __init__(self, master=None, matcher=IndiceAutocompletado, limite=50, **kwargs):
         super().__init__(master, **kwargs)
         self._completion_list = []; self._hits = []; self.mapa_ids = {} 
+        self.matcher = matcher; self.limite = limite; self._matcher = matcher([])
         self.bind('<KeyRelease>', self.handle_keyrelease)
-    def set_completion_list(self, l, m): self._completion_list = sorted(l); self.mapa_ids = m; self['values'] = self._completion_list
+    def set_completion_list(self, l, m, stock=None):
+        self._completion_list = sorted(l); self.mapa_ids = m
+        self._matcher = self.matcher(self._completion_list, stock)
+        self['values'] = self._completion_list[:self.limite]
     def handle_keyrelease(self, event):
         if event.keysym in ('BackSpace', 'Left', 'Right', 'Up', 'Down', 'Return', 'Tab'): return
-        val = self.get()
-        if val == '': self['values'] = self._completion_list
-        else: self['values'] = [x for x in self._completion_list if val.lower() in x.lower()]
+        self._hits = self._matcher.buscar(self.get(), self.limite)
+        self['values'] = self._hits
     def get_selected_id(self): return self.mapa_ids.get(self.get(), None)
 
 def ordenar_treeview(tree, col, reverse):
     l = [(tree.set(k, col), k) for k in tree.get_children('')]
-    try: l.sort(key=lambda t: float(t[0].replace("$","")), reverse=reverse)
+    try: l.sort(key=lambda t: float(t[0].replace("$","").replace(",","")), reverse=reverse)
     except: l.sort(reverse=reverse)
     for index, (val, k) in enumerate(l): tree.move(k, '', index)
     tree.heading(col, command=lambda: ordenar_treeview(tree, col, not reverse))
 
+def _fila_producto(p):
+    # (id, tipo, nombre, genero, cantidad, precio en centavos) -> valores para mostrar
+    return p[:5] + (formatear(p[5]),)
+
+def _fila_historial(fila):
+    i, (ticket, fecha, mov, prod, cant, unit, total) = fila
+    return i, (ticket, fecha, mov, prod, cant, formatear(unit), formatear(total))
+
+def _subsecuencia_creciente(seq):
+    # Índices de una subsecuencia creciente más larga de seq (patience sorting, O(n log n))
+    colas, previo, idx_colas = [], [-1] * len(seq), []
+    for i, v in enumerate(seq):
+        pos = bisect.bisect_left(colas, v)
+        if pos == len(colas): colas.append(v); idx_colas.append(i)
+        else: colas[pos] = v; idx_colas[pos] = i
+        previo[i] = idx_colas[pos - 1] if pos else -1
+    res, i = [], idx_colas[-1] if idx_colas else -1
+    while i != -1: res.append(i); i = previo[i]
+    return res[::-1]
+
+class ReconciliadorTree:
+    # Refresca un Treeview aplicando solo las diferencias con lo que ya muestra:
+    # borra lo que no está, inserta lo nuevo, actualiza valores cambiados y mueve
+    # lo mínimo para respetar el orden. Los items usan la clave de la fila como iid.
+    def __init__(self, tree, clave=lambda fila: fila[0]):
+        self.tree = tree; self.clave = clave
+        self.valores = {}  # iid -> valores mostrados
+
+    def aplicar(self, filas, valores=lambda fila: fila):
+        nuevos = {}
+        for fila in filas: nuevos[str(self.clave(fila))] = tuple(valores(fila))
+        orden = list(nuevos)
+
+        # El orden actual se lee del árbol (puede haber sido reordenado por columna)
+        actuales = self.tree.get_children()
+        fuera = [iid for iid in actuales if iid not in nuevos]
+        if fuera: self.tree.delete(*fuera)
+        for iid in fuera: self.valores.pop(iid, None)
+
+        # Los que sobreviven y ya están en orden relativo correcto no se tocan
+        posicion = {iid: i for i, iid in enumerate(orden)}
+        quedan = [iid for iid in actuales if iid in nuevos]
+        fijos = {quedan[i] for i in _subsecuencia_creciente([posicion[iid] for iid in quedan])}
+        mover = {iid for iid in quedan if iid not in fijos}
+        if mover: self.tree.detach(*mover)
+
+        # Con los desplazados fuera del árbol, el índice i siempre es exacto
+        for i, iid in enumerate(orden):
+            vals = nuevos[iid]
+            if iid in fijos:
+                if self.valores.get(iid) != vals: self.tree.item(iid, values=vals)
+            elif iid in mover:
+                self.tree.move(iid, '', i)
+                if self.valores.get(iid) != vals: self.tree.item(iid, values=vals)
+            else:
+                self.tree.insert('', i, iid=iid, values=vals)
+        self.valores = nuevos
+
+class TablaPaginada(ttk.Frame):
+    # Treeview "virtual": pide filas por páginas a medida que se desplaza y
+    # mantiene vivas como máximo 'max_filas' (descarta las del extremo opuesto).
+    # cargar(clave, direccion, limite) -> [(clave, valores)] en el orden de la tabla,
+    # con direccion None (primera página), "abajo" (después de clave) o "arriba" (antes de clave).
+    # asincrono(fn, al_terminar, al_fallar), si se da, corre fn fuera del hilo de Tk.
+    def __init__(self, master, columnas, cargar, pagina=200, max_filas=1000, asincrono=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.cargar = cargar; self.pagina = pagina; self.max_filas = max_filas; self.asincrono = asincrono
+        self.tree = ttk.Treeview(self, columns=columnas, show='headings')
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._al_desplazar)
+        self.scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self._claves = {}
+        self._sync = ReconciliadorTree(self.tree)
+        self._fin_arriba = self._fin_abajo = True
+        self._pendiente = False
+        self._gen = 0
+
+    def _pedir(self, fn, al_terminar):
+        # Una recarga posterior invalida lo que se haya pedido antes
+        gen = self._gen
+        def aplicar(filas):
+            if gen == self._gen: al_terminar(filas)
+        def fallar(e):
+            metricas().registrar_error("ui.cargar_tabla", e)
+            if gen == self._gen: self._pendiente = False
+        if self.asincrono: self.asincrono(fn, aplicar, fallar)
+        else: aplicar(fn())
+
+    def recargar(self):
+        self._gen += 1; self._pendiente = True
+        self._pedir(lambda: self.cargar(None, None, self.pagina), self._aplicar_recarga)
+
+    def _aplicar_recarga(self, filas):
+        # Si la vista está arriba (lo normal tras una venta) solo entran las filas nuevas
+        self._sync.aplicar(filas, valores=lambda fila: fila[1])
+        self._claves = {str(clave): clave for clave, _ in filas}
+        self._fin_arriba = True
+        self._fin_abajo = len(filas) < self.pagina
+        self.tree.yview_moveto(0)
+        self._pendiente = False
+
+    def _insertar(self, filas, al_final):
+        for clave, valores in (filas if al_final else reversed(filas)):
+            iid = str(clave)
+            self._claves[iid] = clave; self._sync.valores[iid] = tuple(valores)
+            self.tree.insert("", "end" if al_final else 0, iid=iid, values=valores)
+
+    def _recortar(self, desde_arriba):
+        hijos = self.tree.get_children()
+        sobran = len(hijos) - self.max_filas
+        if sobran <= 0: return
+        fuera = hijos[:sobran] if desde_arriba else hijos[-sobran:]
+        for iid in fuera: del self._claves[iid]; del self._sync.valores[iid]
+        self.tree.delete(*fuera)
+        if desde_arriba:
+            # Borrar filas por encima corre el contenido: compensamos para no "saltar"
+            self.tree.yview_scroll(-sobran, "units"); self._fin_arriba = False
+        else:
+            self._fin_abajo = False
+
+    def _al_desplazar(self, primero, ultimo):
+        self.scroll.set(primero, ultimo)
+        if self._pendiente: return
+        primero, ultimo = float(primero), float(ultimo)
+        if ultimo > 0.9 and not self._fin_abajo:
+            self._pendiente = True; self.after_idle(self._cargar_abajo)
+        elif primero < 0.1 and not self._fin_arriba:
+            self._pendiente = True; self.after_idle(self._cargar_arriba)
+
+    def _cargar_abajo(self):
+        hijos = self.tree.get_children()
+        if not hijos: self._fin_abajo = True; self._pendiente = False; return
+        clave = self._claves[hijos[-1]]
+        self._pedir(lambda: self.cargar(clave, "abajo", self.pagina), self._aplicar_abajo)
+
+    def _aplicar_abajo(self, filas):
+        self._insertar(filas, al_final=True)
+        if len(filas) < self.pagina: self._fin_abajo = True
+        self._recortar(desde_arriba=True)
+        self._pendiente = False
+
+    def _cargar_arriba(self):
+        hijos = self.tree.get_children()
+        if not hijos: self._fin_arriba = True; self._pendiente = False; return
+        clave = self._claves[hijos[0]]
+        self._pedir(lambda: self.cargar(clave, "arriba", self.pagina), self._aplicar_arriba)
+
+    def _aplicar_arriba(self, filas):
+        self._insertar(filas, al_final=False)
+        # Las filas nuevas quedan por encima de la vista: la mantenemos donde estaba
+        if filas: self.tree.yview_scroll(len(filas), "units")
+        if len(filas) < self.pagina: self._fin_arriba = True
+        self._recortar(desde_arriba=False)
+        self._pendiente = False
+
 # ==========================================
 # PARTE 3: INTERFAZ
 # ==========================================
@@ -181,11 +241,18 @@ class Aplicacion(ctk.CTk):
         ctk.CTkLabel(self.sidebar, text="MI NEGOCIO", font=ctk.CTkFont(size=20, weight="bold")).grid(row=0, column=0, padx=20, pady=(20, 10))
         
         self.botones_menu = {}
-        items = [("🏠 Inicio", "inicio"), ("📦 Inventario", "inventario"), ("💰 Nueva Venta", "venta"), ("🚚 Nueva Compra", "compra"), ("📅 Registro", "historial")]
+        items = [("🏠 Inicio", "inicio"), ("📦 Inventario", "inventario"), ("💰 Nueva Venta", "venta"), ("🚚 Nueva Compra", "compra"), ("📅 Registro", "historial"), ("🩺 Diagnóstico", "diagnostico")]
         for i, (txt, key) in enumerate(items):
             btn = ctk.CTkButton(self.sidebar, text=txt, command=lambda k=key: self.mostrar_frame(k), fg_color="transparent", anchor="w", height=40)
             btn.grid(row=i+1, column=0, sticky="ew", padx=10, pady=5)
             self.botones_menu[key] = btn
+        self.lbl_estado = ctk.CTkLabel(self.sidebar, text="", text_color="gray60")
+        self.lbl_estado.grid(row=len(items)+1, column=0, padx=20, pady=10)
+
+        # Tareas de DB en segundo plano (ver gestion.trabajador)
+        self._cola_ui = queue.Queue()
+        self._en_curso = 0; self._escrituras_en_curso = 0; self._importando = False
+        self.botones_escritura = []
 
         # ÁREA CONTENIDO
         self.main = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
@@ -197,6 +264,7 @@ class Aplicacion(ctk.CTk):
         # Variables y Estilos
         self.carrito_ventas = []
         self.carrito_compras = []
+        self.reconciliadores = {}
         
         style = ttk.Style()
         style.theme_use("clam")
@@ -205,11 +273,69 @@ class Aplicacion(ctk.CTk):
         style.configure("Treeview.Heading", background="#333333", foreground="white", relief="flat")
         
         iniciar_db()
+        self._refresco_catalogo_pendiente = False
+        catalogo().suscribir(self.al_cambiar_catalogo)
+        self.procesar_cola_ui()
+        self.latido(time.perf_counter() + INTERVALO_LATIDO / 1000)
         self.refrescar_datos_globales()
         self.mostrar_frame("inicio")
+        self.after(INTERVALO_VIGILANCIA, self.vigilar_otras_terminales)
+        self.protocol("WM_DELETE_WINDOW", self.al_cerrar)
+
+    def al_cerrar(self):
+        # Una venta en curso se termina de guardar antes de cerrar
+        trabajador.detener()
+        self.destroy()
+
+    # --- SEGUNDO PLANO ---
+    def en_segundo_plano(self, fn, *args, al_terminar=None, al_fallar=None, escritura=False, ocupado=True):
+        # Corre fn en un hilo de DB; al_terminar/al_fallar se llaman luego en el loop de Tk
+        fut = (trabajador.escribir if escritura else trabajador.leer)(fn, *args)
+        if ocupado: self._cambiar_ocupado(1, escritura)
+        # tarea.<fn>: espera en cola + DB + vuelta al loop de Tk, lo que de verdad espera el usuario
+        nombre, t0 = f"tarea.{getattr(fn, '__name__', 'tarea')}", time.perf_counter()
+        fut.add_done_callback(lambda f: self.en_ui(self._terminar_tarea, f, al_terminar, al_fallar, escritura, ocupado, nombre, t0))
+        return fut
+
+    def en_ui(self, fn, *args):
+        # Se puede llamar desde cualquier hilo
+        self._cola_ui.put((fn, args))
+
+    def procesar_cola_ui(self):
+        try:
+            while True:
+                fn, args = self._cola_ui.get_nowait()
+                try: fn(*args)
+                except Exception as e: metricas().registrar_error(f"ui.{getattr(fn, '__name__', 'tarea')}", e)
+        except queue.Empty: pass
+        self.after(INTERVALO_COLA_UI, self.procesar_cola_ui)
+
+    def _terminar_tarea(self, fut, al_terminar, al_fallar, escritura, ocupado, nombre, t0):
+        if ocupado: self._cambiar_ocupado(-1, escritura)
+        if fut.cancelled(): return
+        metricas().registrar(nombre, (time.perf_counter() - t0) * 1000)
+        err = fut.exception()
+        if err is not None:
+            if al_fallar: al_fallar(err)
+            else: messagebox.showerror("Error", str(err))
+        elif al_terminar: al_terminar(fut.result())
+
+    def latido(self, esperado):
+        # Cualquier handler que bloquee el loop de Tk atrasa este after: el atraso es el congelamiento
+        ahora = time.perf_counter()
+        metricas().registrar("ui.congelamiento", max(0.0, (ahora - esperado) * 1000))
+        self.after(INTERVALO_LATIDO, self.latido, ahora + INTERVALO_LATIDO / 1000)
+
+    def _cambiar_ocupado(self, delta, escritura):
+        self._en_curso += delta
+        if escritura: self._escrituras_en_curso += delta
+        self.lbl_estado.configure(text="⏳ Procesando..." if self._en_curso else "")
+        # Mientras se guarda algo, no se puede volver a confirmar (evita ventas duplicadas)
+        for b in self.botones_escritura: b.configure(state="disabled" if self._escrituras_en_curso else "normal")
+        self.configure(cursor="watch" if self._escrituras_en_curso else "")
 
     def crear_frames(self):
-        for k in ["inicio", "inventario", "venta", "compra", "historial"]:
+        for k in ["inicio", "inventario", "venta", "compra", "historial", "diagnostico"]:
             f = ctk.CTkFrame(self.main, fg_color="transparent")
             self.frames[k] = f
             getattr(self, f"setup_{k}")(f)
@@ -219,6 +345,7 @@ class Aplicacion(ctk.CTk):
         for k, b in self.botones_menu.items(): b.configure(fg_color=("gray75", "gray25") if k == key else "transparent")
         self.frames[key].pack(fill="both", expand=True)
         if key == "inicio": self.actualizar_dashboard()
+        if key == "diagnostico": self.actualizar_diagnostico()
 
     # --- INICIO ---
     def setup_inicio(self, f):
@@ -231,14 +358,38 @@ class Aplicacion(ctk.CTk):
         ctk.CTkButton(btns, text="VENDER", width=200, height=80, fg_color="#2ECC71", command=lambda: self.mostrar_frame("venta")).grid(row=0, column=0, padx=10)
         ctk.CTkButton(btns, text="COMPRAR", width=200, height=80, fg_color="#E67E22", command=lambda: self.mostrar_frame("compra")).grid(row=0, column=1, padx=10)
 
+        # Reportes (gestion.reportes, necesita pandas): se generan en segundo plano y se exportan
+        rep = ctk.CTkFrame(f); rep.pack(fill="x", pady=30)
+        ctk.CTkLabel(rep, text="Reportes", font=ctk.CTkFont(size=16, weight="bold")).pack(side="left", padx=10, pady=10)
+        self.cb_reporte = ctk.CTkComboBox(rep, values=list(REPORTES), width=200, state="readonly"); self.cb_reporte.set(list(REPORTES)[0])
+        self.cb_reporte.pack(side="left", padx=5)
+        self.er_desde = ctk.CTkEntry(rep, placeholder_text="Desde (AAAA-MM-DD)", width=150); self.er_desde.pack(side="left", padx=2)
+        self.er_hasta = ctk.CTkEntry(rep, placeholder_text="Hasta (AAAA-MM-DD)", width=150); self.er_hasta.pack(side="left", padx=2)
+        ctk.CTkButton(rep, text="📊 Exportar", width=100, command=self.exportar_reporte).pack(side="left", padx=5)
+
     def actualizar_dashboard(self):
-        try:
-            tot = db_consultar("SELECT count(*) FROM productos")[0][0]
-            # Calculamos ventas totales de la historia
-            caja = db_consultar("SELECT sum(total_renglon) FROM historial WHERE tipo_movimiento='VENTA'")[0][0] or 0
-            self.lbl_tot.configure(text=f"Productos en Catálogo: {tot}")
-            self.lbl_caja.configure(text=f"Ventas Históricas: ${caja:,.2f}")
-        except: pass
+        # Productos y ventas totales de la historia, desde el resumen
+        self.en_segundo_plano(db_totales_dashboard, al_terminar=self.mostrar_totales, al_fallar=lambda e: None)
+
+    def mostrar_totales(self, totales):
+        tot, caja = totales
+        self.lbl_tot.configure(text=f"Productos en Catálogo: {tot}")
+        self.lbl_caja.configure(text=f"Ventas Históricas: {formatear(caja)}")
+
+    def exportar_reporte(self):
+        nombre, desde, hasta = self.cb_reporte.get(), self.er_desde.get().strip(), self.er_hasta.get().strip()
+        for d in (desde, hasta):
+            if d:
+                try: datetime.strptime(d, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("Fecha inválida", f"'{d}' no tiene el formato AAAA-MM-DD"); return
+        ruta = filedialog.asksaveasfilename(title="Exportar reporte", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")])
+        if not ruta: return
+        def generar_y_exportar():
+            return exportar(generar(nombre, desde, hasta), ruta)
+        self.en_segundo_plano(generar_y_exportar,
+                              al_terminar=lambda filas: messagebox.showinfo("Reporte", f"{nombre}: {filas} filas exportadas a\n{ruta}"))
 
     # --- INVENTARIO ---
     def setup_inventario(self, f):
@@ -251,11 +402,16 @@ class Aplicacion(ctk.CTk):
         
         # NUEVO BOTÓN: Agregar Producto
         ctk.CTkButton(top, text="➕ Nuevo Producto", command=self.ventana_nuevo_producto, fg_color="#2ECC71", hover_color="#27AE60", width=120).pack(side="left", padx=20)
+        self.btn_importar = ctk.CTkButton(top, text="📥 Importar CSV/Excel", command=self.importar_archivo, width=120)
+        self.btn_importar.pack(side="left"); self.botones_escritura.append(self.btn_importar)
+        self.lbl_importacion = ctk.CTkLabel(top, text="", text_color="gray60")
+        self.lbl_importacion.pack(side="left", padx=10)
         
         # Buscador (Corregido el error del width)
         self.entry_inv = ctk.CTkEntry(top, placeholder_text="🔍 Buscar por nombre...", width=250)
         self.entry_inv.pack(side="right")
-        self.entry_inv.bind("<KeyRelease>", lambda e: self.llenar_tree(self.tree_inv, db_listar_productos(self.entry_inv.get())))
+        self.entry_inv.bind("<KeyRelease>", self.al_teclear_busqueda)
+        self._busqueda_programada = None; self._busqueda_gen = 0; self._busqueda_fut = None
 
         # Tabla
         cols = ("ID", "Tipo", "Nombre", "Genero", "Cant", "Precio")
@@ -271,6 +427,26 @@ class Aplicacion(ctk.CTk):
         # Evento Doble Click para editar
         self.tree_inv.bind("<Double-1>", self.editar_producto)
 
+    def al_teclear_busqueda(self, event):
+        # Debounce: cada tecla cancela la búsqueda anterior y la reprograma
+        if self._busqueda_programada: self.after_cancel(self._busqueda_programada)
+        self._busqueda_gen += 1
+        self._busqueda_programada = self.after(ESPERA_BUSQUEDA, self.ejecutar_busqueda, self._busqueda_gen)
+
+    @medir("ui.ejecutar_busqueda")
+    def ejecutar_busqueda(self, gen=None):
+        self._busqueda_programada = None
+        if gen is None: self._busqueda_gen += 1; gen = self._busqueda_gen
+        # La búsqueda anterior, si todavía no arrancó, ya no sirve
+        if self._busqueda_fut: self._busqueda_fut.cancel()
+        filtro = self.entry_inv.get().strip()
+        if not filtro:
+            self.llenar_tree(self.tree_inv, catalogo().listar(), valores=_fila_producto); return
+        def mostrar(filas):
+            # Si mientras tanto se tecleó otra cosa, este resultado ya no sirve
+            if gen == self._busqueda_gen: self.llenar_tree(self.tree_inv, filas, valores=_fila_producto)
+        self._busqueda_fut = self.en_segundo_plano(db_buscar_productos, filtro, al_terminar=mostrar, ocupado=False)
+
     # --- VENTAS ---
     def setup_venta(self, f):
         ctk.CTkLabel(f, text="Nueva Venta", font=ctk.CTkFont(size=20)).pack(anchor="w")
@@ -295,14 +471,15 @@ class Aplicacion(ctk.CTk):
         self.lbl_total_v = ctk.CTkLabel(f, text="TOTAL: $0.00", font=ctk.CTkFont(size=20, weight="bold"), text_color="#2ECC71")
         self.lbl_total_v.pack(pady=5)
         
-        ctk.CTkButton(f, text="✅ FINALIZAR VENTA", height=50, fg_color="#2ECC71", command=self.fin_venta).pack(fill="x")
+        self.btn_fin_v = ctk.CTkButton(f, text="✅ FINALIZAR VENTA", height=50, fg_color="#2ECC71", command=self.fin_venta)
+        self.btn_fin_v.pack(fill="x"); self.botones_escritura.append(self.btn_fin_v)
 
     def al_seleccionar_producto_venta(self, event):
         pid = self.combo_v.get_selected_id()
         if pid:
             precio = db_obtener_precio(pid)
             self.entry_v_p.delete(0, 'end')
-            self.entry_v_p.insert(0, str(precio))
+            self.entry_v_p.insert(0, a_texto(precio))
 
     # --- COMPRAS ---
     def setup_compra(self, f):
@@ -330,14 +507,15 @@ class Aplicacion(ctk.CTk):
         self.tree_c.heading("Costo", text="Costo"); self.tree_c.heading("Subtotal", text="Subtotal")
         self.tree_c.pack(fill="both", expand=True, pady=10)
         
-        ctk.CTkButton(f, text="🚚 REGISTRAR INGRESO", height=50, fg_color="#E67E22", command=self.fin_compra).pack(fill="x")
+        self.btn_fin_c = ctk.CTkButton(f, text="🚚 REGISTRAR INGRESO", height=50, fg_color="#E67E22", command=self.fin_compra)
+        self.btn_fin_c.pack(fill="x"); self.botones_escritura.append(self.btn_fin_c)
         self.toggle_compra_ui()
 
     def al_seleccionar_producto_compra(self, event):
         pid = self.combo_c.get_selected_id()
         if pid:
             p = db_obtener_precio(pid)
-            self.ec_p.delete(0, 'end'); self.ec_p.insert(0, str(p))
+            self.ec_p.delete(0, 'end'); self.ec_p.insert(0, a_texto(p))
 
     def toggle_compra_ui(self):
         if self.var_new.get(): self.fr_exist.pack_forget(); self.fr_new.pack(fill="x")
@@ -346,29 +524,138 @@ class Aplicacion(ctk.CTk):
     # --- HISTORIAL ---
     def setup_historial(self, f):
         ctk.CTkLabel(f, text="Registro Detallado", font=ctk.CTkFont(size=20)).pack(anchor="w")
+
+        # Filtros (se resuelven en SQL, no en la tabla)
+        fil = ctk.CTkFrame(f, fg_color="transparent"); fil.pack(fill="x", pady=5)
+        self.eh_desde = ctk.CTkEntry(fil, placeholder_text="Desde (AAAA-MM-DD)", width=150); self.eh_desde.pack(side="left", padx=2)
+        self.eh_hasta = ctk.CTkEntry(fil, placeholder_text="Hasta (AAAA-MM-DD)", width=150); self.eh_hasta.pack(side="left", padx=2)
+        self.eh_ticket = ctk.CTkEntry(fil, placeholder_text="Ticket", width=150); self.eh_ticket.pack(side="left", padx=2)
+        ctk.CTkButton(fil, text="Filtrar", width=80, command=self.filtrar_historial).pack(side="left", padx=5)
+        ctk.CTkButton(fil, text="Limpiar", width=80, fg_color="gray30", command=self.limpiar_filtro_historial).pack(side="left")
+        self.filtros_h = {}
+
         cols = ("Ticket", "Fecha", "Mov", "Producto", "Cant", "Precio Unit", "Total")
-        self.tree_h = ttk.Treeview(f, columns=cols, show='headings')
+        self.tabla_h = TablaPaginada(f, cols, lambda clave, direc, lim: [_fila_historial(f) for f in db_historial_pagina(clave, direc, lim, **self.filtros_h)],
+                                     asincrono=lambda fn, ok, err: self.en_segundo_plano(fn, al_terminar=ok, al_fallar=err))
+        self.tree_h = self.tabla_h.tree
         for c in cols: self.tree_h.heading(c, text=c)
         self.tree_h.column("Ticket", width=120); self.tree_h.column("Precio Unit", width=80); self.tree_h.column("Total", width=80)
-        self.tree_h.pack(fill="both", expand=True)
+        self.tabla_h.pack(fill="both", expand=True)
+
+    def filtrar_historial(self):
+        desde, hasta, ticket = self.eh_desde.get().strip(), self.eh_hasta.get().strip(), self.eh_ticket.get().strip()
+        for d in (desde, hasta):
+            if d:
+                try: datetime.strptime(d, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("Fecha inválida", f"'{d}' no tiene el formato AAAA-MM-DD"); return
+        self.filtros_h = {'desde': desde, 'hasta': hasta, 'ticket': ticket}
+        self.tabla_h.recargar()
+
+    def limpiar_filtro_historial(self):
+        for e in (self.eh_desde, self.eh_hasta, self.eh_ticket): e.delete(0, 'end')
+        self.filtros_h = {}
+        self.tabla_h.recargar()
+
+    # --- DIAGNÓSTICO ---
+    def setup_diagnostico(self, f):
+        ctk.CTkLabel(f, text="Diagnóstico de Rendimiento", font=ctk.CTkFont(size=20)).pack(anchor="w")
+        bar = ctk.CTkFrame(f, fg_color="transparent"); bar.pack(fill="x", pady=5)
+        ctk.CTkLabel(bar, text="Lentas desde (ms):").pack(side="left", padx=(0, 5))
+        self.e_umbral = ctk.CTkEntry(bar, width=80); self.e_umbral.insert(0, f"{metricas().umbral_lento_ms:g}"); self.e_umbral.pack(side="left")
+        ctk.CTkButton(bar, text="Aplicar", width=80, command=self.aplicar_umbral).pack(side="left", padx=5)
+        ctk.CTkButton(bar, text="🔄 Actualizar", width=100, command=self.actualizar_diagnostico).pack(side="left", padx=5)
+        ctk.CTkButton(bar, text="📊 Exportar", width=100, command=self.exportar_metricas).pack(side="left", padx=5)
+        ctk.CTkButton(bar, text="Reiniciar", width=80, fg_color="gray30", command=self.reiniciar_metricas).pack(side="left", padx=5)
+
+        cols = ("Operación", "N", "p50 ms", "p95 ms", "p99 ms", "Máx ms", "Filas", "Errores")
+        self.tree_diag = ttk.Treeview(f, columns=cols, show="headings", height=12)
+        for c in cols:
+            self.tree_diag.heading(c, text=c, command=lambda c=c: ordenar_treeview(self.tree_diag, c, True))
+            self.tree_diag.column(c, width=260 if c == "Operación" else 80)
+        self.tree_diag.pack(fill="both", expand=True, pady=5)
+
+        ctk.CTkLabel(f, text="Operaciones lentas y errores recientes").pack(anchor="w")
+        cols = ("Fecha", "Tipo", "Operación", "ms", "Detalle")
+        self.tree_lentas = ttk.Treeview(f, columns=cols, show="headings", height=8)
+        for c in cols: self.tree_lentas.heading(c, text=c)
+        self.tree_lentas.column("Fecha", width=150); self.tree_lentas.column("Tipo", width=70)
+        self.tree_lentas.column("ms", width=70); self.tree_lentas.column("Detalle", width=450)
+        self.tree_lentas.pack(fill="both", expand=True)
+
+    def actualizar_diagnostico(self):
+        datos = metricas().instantanea()
+        filas = [(n, r["cantidad"], f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}", f"{r['p99_ms']:.1f}", f"{r['max_ms']:.1f}",
+                  r["filas"], r["errores"]) for n, r in datos["operaciones"].items()]
+        self.llenar_tree(self.tree_diag, filas)
+        eventos = [(e["fecha"], "LENTA", e["nombre"], e["ms"], e["detalle"]) for e in datos["lentas"]]
+        eventos += [(e["fecha"], "ERROR", e["nombre"], "", e["error"]) for e in datos["errores"]]
+        eventos.sort(key=lambda e: e[0], reverse=True)
+        self.llenar_tree(self.tree_lentas, list(enumerate(eventos)), valores=lambda d: d[1])
+
+    def aplicar_umbral(self):
+        try: metricas().umbral_lento_ms = float(self.e_umbral.get())
+        except ValueError: messagebox.showwarning("Umbral inválido", "El umbral tiene que ser un número de milisegundos")
+
+    def exportar_metricas(self):
+        ruta = filedialog.asksaveasfilename(defaultextension=".json", initialfile="metricas.json", filetypes=[("JSON", "*.json")])
+        if not ruta: return
+        try: metricas().exportar(ruta)
+        except OSError as e: messagebox.showerror("Error", str(e)); return
+        messagebox.showinfo("Métricas", f"Métricas exportadas a {ruta}")
+
+    def reiniciar_metricas(self):
+        metricas().reiniciar()
+        self.actualizar_diagnostico()
 
     # --- LÓGICA ---
+    @medir("ui.refrescar_datos_globales")
     def refrescar_datos_globales(self):
-        prods = db_listar_productos()
-        self.llenar_tree(self.tree_inv, prods)
-        self.llenar_tree(self.tree_h, db_consultar("SELECT ticket_id, fecha, tipo_movimiento, producto_nombre, cantidad, precio_unitario, total_renglon FROM historial ORDER BY id DESC"))
+        self.refrescar_catalogo()
+        self.tabla_h.recargar() # Solo la primera página; el resto se pide al desplazarse
+
+    def refrescar_tras_escritura(self):
+        # Las escrituras de la app ya hacen que el catálogo avise (al_cambiar_catalogo refresca
+        # inventario y combos una vez): acá solo falta el Registro
+        self.tabla_h.recargar()
+
+    def al_cambiar_catalogo(self, ids):
+        # Aviso del catálogo (puede llegar desde un hilo de DB): agrupamos avisos seguidos en un solo refresco
+        if not self._refresco_catalogo_pendiente:
+            self._refresco_catalogo_pendiente = True
+            self.en_ui(self.refrescar_catalogo)
+
+    def vigilar_otras_terminales(self):
+        # Si otra terminal escribió en la DB, el catálogo se recarga (y avisa) solo
+        def seguir(cambio=False):
+            if cambio: self.tabla_h.recargar()
+            self.after(INTERVALO_VIGILANCIA, self.vigilar_otras_terminales)
+        self.en_segundo_plano(catalogo().verificar_externos, al_terminar=seguir, al_fallar=lambda e: seguir(), ocupado=False)
+
+    @medir("ui.refrescar_catalogo")
+    def refrescar_catalogo(self):
+        self._refresco_catalogo_pendiente = False
+        prods = catalogo().listar()
+        # Respetamos la búsqueda que esté escrita en Inventario
+        self.ejecutar_busqueda()
         
-        lv, mv, lc, mc = [], {}, [], {}
+        lv, mv, lc, mc, stock = [], {}, [], {}, {}
         for pid, t, n, g, c, p in prods:
             txt = f"{n} - {t} ({g})"
-            if c > 0: lv.append(f"{txt} | ${p} | Stock: {c}"); mv[f"{txt} | ${p} | Stock: {c}"] = pid
-            lc.append(txt); mc[txt] = pid
-        self.combo_v.set_completion_list(lv, mv)
-        self.combo_c.set_completion_list(lc, mc)
+            if c > 0: lv.append(f"{txt} | {formatear(p)} | Stock: {c}"); mv[lv[-1]] = pid; stock[lv[-1]] = c
+            lc.append(txt); mc[txt] = pid; stock[txt] = c
+        self.combo_v.set_completion_list(lv, mv, stock)
+        self.combo_c.set_completion_list(lc, mc, stock)
 
-    def llenar_tree(self, tree, datos):
-        for i in tree.get_children(): tree.delete(i)
-        for d in datos: tree.insert("", "end", values=d)
+    @medir("ui.llenar_tree")
+    def llenar_tree(self, tree, datos, clave=lambda d: d[0], valores=lambda d: d):
+        # Refresco por diferencias: solo se tocan las filas que cambiaron (ver ReconciliadorTree)
+        if tree not in self.reconciliadores: self.reconciliadores[tree] = ReconciliadorTree(tree, clave)
+        self.reconciliadores[tree].aplicar(datos, valores)
+
+    def mostrar_carrito(self, tree, carrito):
+        filas = [(i, it['detalle'], it['cantidad'], formatear(it['precio']), formatear(it['cantidad'] * it['precio'])) for i, it in enumerate(carrito)]
+        self.llenar_tree(tree, filas, valores=lambda d: d[1:])
 
     # Ventas
     def add_venta(self):
@@ -376,50 +663,69 @@ class Aplicacion(ctk.CTk):
         c = self.entry_v_c.get()
         p = self.entry_v_p.get()
         if pid and c and p:
-            sub = int(c) * float(p)
-            self.carrito_ventas.append({'id':pid, 'cantidad':int(c), 'precio':float(p), 'nombre': self.combo_v.get().split('|')[0]})
-            self.tree_v.insert("", "end", values=(self.combo_v.get(), c, f"${p}", f"${sub}"))
+            try: cantidad, precio = int(c), a_centavos(p)
+            except ValueError as e: messagebox.showwarning("Dato inválido", str(e)); return
+            self.carrito_ventas.append({'id':pid, 'cantidad':cantidad, 'precio':precio, 'nombre': self.combo_v.get().split('|')[0], 'detalle': self.combo_v.get()})
+            self.mostrar_carrito(self.tree_v, self.carrito_ventas)
             self.entry_v_c.delete(0,'end'); self.entry_v_p.delete(0,'end'); self.combo_v.set("")
             self.calc_total_venta()
     
     def calc_total_venta(self):
+        # Centavos enteros: el total es exacto, sin redondeos de float
         tot = sum(item['cantidad'] * item['precio'] for item in self.carrito_ventas)
-        self.lbl_total_v.configure(text=f"TOTAL: ${tot:,.2f}")
+        self.lbl_total_v.configure(text=f"TOTAL: {formatear(tot)}")
 
+    @medir("ui.fin_venta")
     def fin_venta(self):
-        if self.carrito_ventas and db_procesar_venta(self.carrito_ventas) == "OK":
-            messagebox.showinfo("OK", "Venta Guardada"); self.carrito_ventas=[]
-            for i in self.tree_v.get_children(): self.tree_v.delete(i)
-            self.lbl_total_v.configure(text="TOTAL: $0.00")
-            self.refrescar_datos_globales()
+        if not self.carrito_ventas: return
+        enviado = list(self.carrito_ventas)
+        self.en_segundo_plano(db_procesar_venta, enviado, al_terminar=lambda res: self.venta_terminada(res, enviado), escritura=True)
+
+    def venta_terminada(self, res, enviado):
+        if res != "OK":
+            messagebox.showerror("Error", res); return
+        messagebox.showinfo("OK", "Venta Guardada")
+        # Sacamos solo lo que se vendió (se pudo seguir cargando mientras se guardaba)
+        self.carrito_ventas = [it for it in self.carrito_ventas if not any(it is e for e in enviado)]
+        self.mostrar_carrito(self.tree_v, self.carrito_ventas)
+        self.calc_total_venta()
+        self.refrescar_tras_escritura()
 
     # Compras
     def add_compra(self):
         c = self.ec_c.get()
         p = self.ec_p.get()
         if not c or not p: return
+        try: cantidad, precio = int(c), a_centavos(p)
+        except ValueError as e: messagebox.showwarning("Dato inválido", str(e)); return
         
         if self.var_new.get():
-            item = {'nuevo':True, 'nombre':self.ec_n.get().upper(), 'tipo':self.ec_t.get(), 'genero':self.ec_g.get(), 'cantidad':int(c), 'precio':float(p)}
-            txt = f"NUEVO: {item['nombre']}"
+            item = {'nuevo':True, 'nombre':self.ec_n.get().upper(), 'tipo':self.ec_t.get(), 'genero':self.ec_g.get(), 'cantidad':cantidad, 'precio':precio}
+            item['detalle'] = f"NUEVO: {item['nombre']}"
         else:
             pid = self.combo_c.get_selected_id()
             if not pid: return
-            item = {'nuevo':False, 'id':pid, 'cantidad':int(c), 'precio':float(p), 'nombre_real': self.combo_c.get().split(' - ')[0]}
-            txt = self.combo_c.get()
+            item = {'nuevo':False, 'id':pid, 'cantidad':cantidad, 'precio':precio, 'nombre_real': self.combo_c.get().split(' - ')[0], 'detalle': self.combo_c.get()}
         
-        sub = int(c) * float(p)
         self.carrito_compras.append(item)
-        self.tree_c.insert("", "end", values=(txt, c, f"${p}", f"${sub}"))
+        self.mostrar_carrito(self.tree_c, self.carrito_compras)
         self.ec_c.delete(0,'end'); self.ec_p.delete(0,'end')
         if self.var_new.get(): self.ec_n.delete(0,'end'); self.ec_t.delete(0,'end'); self.ec_g.delete(0,'end')
         else: self.combo_c.set("")
 
+    @medir("ui.fin_compra")
     def fin_compra(self):
-        if self.carrito_compras and db_procesar_compra(self.carrito_compras) == "OK":
-            messagebox.showinfo("OK", "Ingreso Guardado"); self.carrito_compras=[]
-            for i in self.tree_c.get_children(): self.tree_c.delete(i)
-            self.refrescar_datos_globales()
+        if not self.carrito_compras: return
+        enviado = list(self.carrito_compras)
+        self.en_segundo_plano(db_procesar_compra, enviado, al_terminar=lambda res: self.compra_terminada(res, enviado), escritura=True)
+
+    def compra_terminada(self, res, enviado):
+        if res != "OK":
+            messagebox.showerror("Error", res); return
+        messagebox.showinfo("OK", "Ingreso Guardado")
+        self.carrito_compras = [it for it in self.carrito_compras if not any(it is e for e in enviado)]
+        self.mostrar_carrito(self.tree_c, self.carrito_compras)
+        self.refrescar_tras_escritura()
 
     def ventana_nuevo_producto(self):
         # Crear ventana flotante
@@ -458,27 +764,55 @@ class Aplicacion(ctk.CTk):
                 return
             
             try:
-                # Insertamos directo en la base de datos
-                conn = sqlite3.connect("negocio.db")
-                cursor = conn.cursor()
-                cursor.execute("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)", 
-                              (tip, nom, gen, int(can), float(pre)))
-                conn.commit()
-                conn.close()
-                
+                datos = (tip, nom, gen, int(can), a_centavos(pre))
+            except ValueError as e:
+                messagebox.showerror("Error", f"Precio y Cantidad deben ser números válidos.\n{e}"); return
+
+            def creado(pid):
                 messagebox.showinfo("Éxito", "Producto creado correctamente")
                 win.destroy()
-                self.refrescar_datos_globales() # Actualizar la tabla de atrás
-                
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "Ya existe un producto con ese Nombre, Tipo y Género.")
-            except ValueError:
-                messagebox.showerror("Error", "Precio y Cantidad deben ser números.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Ocurrió un error: {e}")
+                self.refrescar_tras_escritura()
+
+            def fallo(e):
+                if isinstance(e, sqlite3.IntegrityError):
+                    messagebox.showerror("Error", "Ya existe un producto con ese Nombre, Tipo y Género.")
+                else:
+                    messagebox.showerror("Error", f"Ocurrió un error: {e}")
+
+            # Insertamos en la base de datos desde el hilo de escrituras
+            self.en_segundo_plano(db_crear_producto, *datos, al_terminar=creado, al_fallar=fallo, escritura=True)
 
         ctk.CTkButton(win, text="Guardar Producto", command=guardar_nuevo, fg_color="#2ECC71", hover_color="#27AE60").pack(pady=20)
 
+    # Importación masiva (gestion.importador): columnas tipo, nombre, genero, cantidad, precio
+    def importar_archivo(self):
+        ruta = filedialog.askopenfilename(title="Importar productos",
+                                          filetypes=[("CSV o Excel", "*.csv *.xlsx"), ("Todos", "*.*")])
+        if not ruta or self._importando: return
+        def progreso(leidas, importadas, errores):
+            # Llega desde el hilo que lee el archivo
+            texto = f"{leidas} leídas, {importadas} importadas, {errores} errores"
+            self.en_ui(lambda: self.lbl_importacion.configure(text=texto))
+        # No es una escritura de la UI: el archivo se lee en un hilo de lectura y cada lote entra
+        # al de escrituras por separado, así Finalizar Venta/Compra no espera el archivo entero
+        def fallo(e):
+            self._importando = False; self.lbl_importacion.configure(text="")
+            messagebox.showerror("Importación", str(e))
+        self._importando = True
+        self.en_segundo_plano(importar, ruta, None, progreso, trabajador.escribir, al_terminar=self.importacion_terminada, al_fallar=fallo)
+
+    def importacion_terminada(self, res):
+        self._importando = False
+        self.lbl_importacion.configure(text="")
+        msg = f"Ticket {res['ticket']}: {res['importadas']} de {res['leidas']} filas importadas."
+        if res['cant_errores']:
+            msg += f"\n\n{res['cant_errores']} filas con errores:\n" + "\n".join(f"Línea {l}: {m}" for l, m in res['errores'][:15])
+            if res['cant_errores'] > 15: msg += "\n..."
+            messagebox.showwarning("Importación", msg)
+        else:
+            messagebox.showinfo("Importación", msg)
+        self.refrescar_tras_escritura()
+
     # Editar
     def editar_producto(self, event):
         item = self.tree_inv.focus(); 
@@ -489,10 +823,15 @@ class Aplicacion(ctk.CTk):
         ctk.CTkLabel(win, text="Nombre:").pack(); en=ctk.CTkEntry(win); en.insert(0,vals[2]); en.pack()
         ctk.CTkLabel(win, text="Género:").pack(); eg=ctk.CTkEntry(win); eg.insert(0,vals[3]); eg.pack()
         ctk.CTkLabel(win, text="Stock:").pack(); ec=ctk.CTkEntry(win); ec.insert(0,vals[4]); ec.pack()
-        ctk.CTkLabel(win, text="Precio:").pack(); ep=ctk.CTkEntry(win); ep.insert(0,vals[5]); ep.pack()
+        ctk.CTkLabel(win, text="Precio:").pack(); ep=ctk.CTkEntry(win); ep.insert(0,a_texto(db_obtener_precio(vals[0]))); ep.pack()
         def save():
-            if db_actualizar_producto(vals[0], et.get(), en.get(), eg.get(), int(ec.get()), float(ep.get())) == "OK":
-                win.destroy(); self.refrescar_datos_globales()
+            def guardado(res):
+                if res == "OK": win.destroy(); self.refrescar_tras_escritura()
+                else: messagebox.showerror("Error", res)
+            try: cantidad, precio = int(ec.get()), a_centavos(ep.get())
+            except ValueError as e: messagebox.showwarning("Dato inválido", str(e), parent=win); return
+            self.en_segundo_plano(db_actualizar_producto, vals[0], et.get(), en.get(), eg.get(), cantidad, precio,
+                                  al_terminar=guardado, escritura=True)
         ctk.CTkButton(win, text="Guardar", command=save).pack(pady=20)
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+# Benchmark: costo de importación del camino sin interfaz (python -X importtime).
+# Verifica que gestion.db y la CLI no carguen tkinter/customtkinter/PIL/pandas y compara
+# contra importar app.py (si customtkinter está instalado).
+# Uso: python benchmarks/bench_arranque.py  (sale con 1 si el camino headless carga algo de la GUI)
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROHIBIDOS = ("tkinter", "customtkinter", "PIL", "pandas", "numpy")
+
+
+def importtime(codigo):
+    # -> (microsegundos acumulados de todo lo importado, {módulo: acumulado})
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=RAIZ,
+                       capture_output=True, text=True, env={**os.environ, "PYTHONPATH": RAIZ})
+    if r.returncode != 0: raise RuntimeError(r.stderr.strip().splitlines()[-1])
+    modulos = {}
+    for linea in r.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", linea)
+        if m: modulos[m.group(4)] = (int(m.group(2)), len(m.group(3)))
+    # Los de nivel superior (sangría 1) suman el total sin contar dos veces
+    return sum(acum for acum, nivel in modulos.values() if nivel == 1), modulos
+
+
+def informar(nombre, codigo):
+    total, modulos = importtime(codigo)
+    cargados = [p for p in PROHIBIDOS if p in modulos]
+    propios = sorted(((acum, m) for m, (acum, _) in modulos.items() if m.startswith("gestion")), reverse=True)[:5]
+    print(f"{nombre:28s} {total / 1000:7.1f} ms  ({len(modulos)} módulos)")
+    for acum, m in propios: print(f"    {m:30s} {acum / 1000:6.1f} ms")
+    return cargados
+
+
+if __name__ == "__main__":
+    malos = []
+    for nombre, codigo in (("import gestion.db", "import gestion.db"),
+                           ("CLI (python -m gestion)", "import gestion.__main__"),
+                           ("import gestion.reportes", "import gestion.reportes")):
+        cargados = informar(nombre, codigo)
+        if cargados:
+            print(f"    ¡carga módulos de interfaz o pesados!: {', '.join(cargados)}")
+            malos.append(nombre)
+    try:
+        informar("import app (con interfaz)", "import app")
+    except RuntimeError as e:
+        print(f"import app omitido: {e}")
+    sys.exit(1 if malos else 0)
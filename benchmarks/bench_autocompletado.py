@@ -0,0 +1,51 @@
+# Benchmark del autocompletado con 100k opciones: filtro lineal original
+# (val.lower() in x.lower() en cada tecla) vs IndiceAutocompletado.
+# Uso: python benchmarks/bench_autocompletado.py [opciones]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gestion.autocompletado import IndiceAutocompletado
+
+PALABRAS = ["REMERA", "CAMPERA", "PANTALÓN", "ZAPATILLA", "GORRA", "BUZO", "MEDIAS", "SHORT",
+            "NIKE", "ADIDAS", "PUMA", "ROJA", "AZUL", "NEGRO", "BLANCO", "ALGODÓN"]
+
+
+def opciones(n):
+    random.seed(42)
+    res, stock = [], {}
+    for i in range(n):
+        txt = f"{' '.join(random.sample(PALABRAS, 3))} {i} - Ropa ({random.choice(['Hombre', 'Mujer', 'Uni'])})"
+        c = random.randint(1, 200)
+        txt += f" | ${random.randint(1, 500) * 100} | Stock: {c}"
+        res.append(txt); stock[txt] = c
+    return sorted(res), stock
+
+
+def tipeo(palabra):
+    return [palabra[:i] for i in range(1, len(palabra) + 1)]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lista, stock = opciones(n)
+    consultas = tipeo("remera azul") + tipeo("algodon")
+
+    t0 = time.perf_counter()
+    for val in consultas:
+        [x for x in lista if val.lower() in x.lower()]
+    t_lineal = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indice = IndiceAutocompletado(lista, stock)
+    t_armado = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for val in consultas:
+        indice.buscar(val)
+    t_indice = time.perf_counter() - t0
+
+    print(f"{n} opciones, {len(consultas)} teclas")
+    print(f"  filtro lineal: {t_lineal * 1000:8.1f} ms ({t_lineal / len(consultas) * 1000:6.2f} ms/tecla)")
+    print(f"  índice:        {t_indice * 1000:8.1f} ms ({t_indice / len(consultas) * 1000:6.2f} ms/tecla) + armado {t_armado * 1000:.1f} ms")
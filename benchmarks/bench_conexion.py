@@ -0,0 +1,55 @@
+# Micro-benchmark: conexión nueva por llamada (camino viejo) vs pool de conexiones.
+# Uso: python benchmarks/bench_conexion.py [llamadas]
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gestion.conexion import PoolConexiones
+
+CONSULTA = "SELECT id, tipo, nombre, genero, cantidad, precio FROM productos WHERE id=?"
+
+
+def preparar(ruta, productos=500):
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE productos (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, nombre TEXT, genero TEXT, cantidad INTEGER, precio REAL, UNIQUE(nombre, tipo, genero))")
+    conn.executemany("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)",
+                     [("Remera", f"PRODUCTO {i}", "Uni", 10, 100.0) for i in range(productos)])
+    conn.commit()
+    conn.close()
+
+
+def camino_viejo(ruta, llamadas):
+    for i in range(llamadas):
+        with sqlite3.connect(ruta, timeout=10) as conn:
+            conn.execute(CONSULTA, (i % 500 + 1,)).fetchall()
+        conn.close()
+
+
+def camino_pool(pool, llamadas):
+    for i in range(llamadas):
+        with pool.conexion() as conn:
+            conn.execute(CONSULTA, (i % 500 + 1,)).fetchall()
+
+
+def medir(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    llamadas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.db")
+        preparar(ruta)
+        pool = PoolConexiones(ruta)
+        t_viejo = medir(camino_viejo, ruta, llamadas)
+        t_pool = medir(camino_pool, pool, llamadas)
+        pool.cerrar()
+    print(f"{llamadas} llamadas")
+    print(f"  conexión por llamada: {t_viejo * 1000:8.1f} ms ({t_viejo / llamadas * 1e6:6.1f} us/llamada)")
+    print(f"  pool de conexiones:   {t_pool * 1000:8.1f} ms ({t_pool / llamadas * 1e6:6.1f} us/llamada)")
+    print(f"  mejora: x{t_viejo / t_pool:.1f}")
@@ -0,0 +1,66 @@
+# Benchmark: importación masiva de un CSV de proveedor (filas por segundo).
+# Primera pasada: todos productos nuevos. Segunda pasada: el mismo archivo, todo upsert.
+# Compara contra cargar las mismas filas como una compra del carrito (db_procesar_compra).
+# Uso: python benchmarks/bench_importador.py [filas]
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gestion import conexion as cx
+from gestion.dinero import a_centavos
+from gestion.importador import importar
+from gestion.migraciones import migrar
+
+
+def generar_csv(ruta, filas):
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["Tipo", "Nombre", "Género", "Cantidad", "Precio"])
+        for i in range(filas):
+            w.writerow(["Remera", f"PRODUCTO {i:07d}", ("Hombre", "Mujer", "Uni")[i % 3], 10 + i % 7, f"{100 + i % 50},50"])
+
+
+def base_nueva(ruta):
+    cx.configurar(ruta)
+    with cx.conexion() as conn: migrar(conn)
+
+
+def medir(ruta_csv):
+    t0 = time.perf_counter()
+    res = importar(ruta_csv)
+    return time.perf_counter() - t0, res
+
+
+def compra_por_renglon(ruta_csv):
+    # Camino anterior: el archivo convertido en un carrito de compra de productos nuevos
+    from gestion.db import db_procesar_compra
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        lector = csv.reader(f, delimiter=";"); next(lector)
+        carrito = [{'nuevo': True, 'tipo': t, 'nombre': n, 'genero': g, 'cantidad': int(c),
+                    'precio': a_centavos(p)} for t, n, g, c, p in lector]
+    t0 = time.perf_counter()
+    assert db_procesar_compra(carrito) == "OK"
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_csv = os.path.join(tmp, "proveedor.csv")
+        generar_csv(ruta_csv, filas)
+        base_nueva(os.path.join(tmp, "bench.db"))
+        t_alta, res = medir(ruta_csv)
+        assert res['importadas'] == filas and not res['cant_errores']
+        t_upsert, res = medir(ruta_csv)
+        assert res['importadas'] == filas
+        base_nueva(os.path.join(tmp, "bench_compra.db"))
+        t_compra = compra_por_renglon(ruta_csv)
+        cx.obtener_pool().cerrar()
+
+    print(f"{filas} filas")
+    print(f"  importador, productos nuevos: {t_alta:6.2f} s  ({filas / t_alta:9,.0f} filas/s)")
+    print(f"  importador, todo upsert:      {t_upsert:6.2f} s  ({filas / t_upsert:9,.0f} filas/s)")
+    print(f"  compra renglón por renglón:   {t_compra:6.2f} s  ({filas / t_compra:9,.0f} filas/s)")
@@ -0,0 +1,57 @@
+# Benchmark: reportes sobre un historial grande (tiempo y memoria máxima del proceso).
+# La memoria debe quedar acotada por gestion.reportes.BLOQUE, no por el tamaño del historial.
+# Necesita pandas. Uso: python benchmarks/bench_reportes.py [renglones] [productos]
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gestion import conexion as cx
+from gestion import reportes
+from gestion.migraciones import migrar
+
+
+def preparar(ruta, renglones, productos):
+    cx.configurar(ruta)
+    random.seed(0)
+    with cx.conexion() as conn:
+        migrar(conn)
+        conn.executemany("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)",
+                         [("Remera", f"PRODUCTO {i:06d}", "Uni", 1000, 10000) for i in range(productos)])
+        for inicio in range(0, renglones, 100_000):
+            filas = []
+            for i in range(inicio, min(inicio + 100_000, renglones)):
+                pid, can = random.randint(1, productos), random.randint(1, 5)
+                tipo, pre = ("COMPRA", 6000 + pid % 20 * 100) if i % 4 == 0 else ("VENTA", 10000 + pid % 30 * 100)
+                fecha = date(2025, 1, 1) + timedelta(days=i * 730 // renglones)  # 2 años de historial en orden
+                filas.append((f"T-{i}", pid, f"PRODUCTO {pid:06d}", tipo, can, pre, can * pre, f"{fecha} 10:00:00"))
+            conn.executemany("INSERT INTO historial VALUES (NULL,?,?,?,?,?,?,?,?)", filas)
+        conn.commit()
+
+
+def memoria_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    renglones = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    productos = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        print("Sin pandas; benchmark omitido"); sys.exit(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        preparar(os.path.join(tmp, "bench.db"), renglones, productos)
+        print(f"{renglones} renglones, {productos} productos (generados en {time.perf_counter() - t0:.1f} s)")
+        base = memoria_mb()
+        print(f"  memoria antes de los reportes: {base:7.0f} MB")
+        for nombre in reportes.REPORTES:
+            t0 = time.perf_counter()
+            df = reportes.generar(nombre, "2025-01-01", "2026-12-31")
+            print(f"  {nombre:24s} {time.perf_counter() - t0:6.2f} s  {len(df):6d} filas  memoria máx {memoria_mb():7.0f} MB")
+        cx.obtener_pool().cerrar()
@@ -0,0 +1,111 @@
+# Prueba de carga: varias cajas cobrando a la vez contra un gestion.servidor en localhost.
+# Cada caja es un hilo con su propia conexión keep-alive que manda ventas de 1 a 4 renglones.
+# Informa latencia p50/p99 y ventas por segundo, y verifica que el stock cierre exacto.
+# Uso: python benchmarks/bench_servidor.py [cajas] [ventas_por_caja]
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from gestion import conexion as cx
+from gestion.migraciones import migrar
+
+PRODUCTOS = 500
+STOCK = 100_000
+
+
+def preparar(ruta):
+    cx.configurar(ruta)
+    with cx.conexion() as conn:
+        migrar(conn)
+        conn.executemany("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)",
+                         [("Remera", f"PRODUCTO {i:04d}", "Uni", STOCK, 10000) for i in range(PRODUCTOS)])
+        conn.commit()
+    cx.obtener_pool().cerrar()
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar(puerto, segundos=10):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.2).close(); return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("el servidor no arrancó")
+
+
+def caja(puerto, ventas, latencias, vendidas, errores, semilla):
+    rnd = random.Random(semilla)
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    for _ in range(ventas):
+        carrito = [{'id': rnd.randint(1, PRODUCTOS), 'cantidad': rnd.randint(1, 3), 'precio': 10000, 'nombre': 'X'}
+                   for _ in range(rnd.randint(1, 4))]
+        t0 = time.perf_counter()
+        conn.request("POST", "/ventas", body=json.dumps({"carrito": carrito}), headers={"Content-Type": "application/json"})
+        res = json.loads(conn.getresponse().read())
+        latencias.append(time.perf_counter() - t0)
+        if res.get("resultado") == "OK":
+            for it in carrito: vendidas[it['id']] = vendidas.get(it['id'], 0) + it['cantidad']
+        else:
+            errores.append(res)
+    conn.close()
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+if __name__ == "__main__":
+    cajas = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ventas = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.db")
+        preparar(ruta)
+        puerto = puerto_libre()
+        servidor = subprocess.Popen([sys.executable, "-m", "gestion.servidor", "--db", ruta, "--puerto", str(puerto)],
+                                    cwd=RAIZ, stdout=subprocess.DEVNULL)
+        try:
+            esperar(puerto)
+            latencias, errores, vendidas_por_caja = [], [], [dict() for _ in range(cajas)]
+            hilos = [threading.Thread(target=caja, args=(puerto, ventas, latencias, vendidas_por_caja[i], errores, i))
+                     for i in range(cajas)]
+            t0 = time.perf_counter()
+            for h in hilos: h.start()
+            for h in hilos: h.join()
+            total = time.perf_counter() - t0
+        finally:
+            servidor.terminate(); servidor.wait()
+
+        # El stock final tiene que ser exactamente el inicial menos lo vendido
+        vendidas = {}
+        for v in vendidas_por_caja:
+            for pid, c in v.items(): vendidas[pid] = vendidas.get(pid, 0) + c
+        conn = sqlite3.connect(ruta)
+        stock = dict(conn.execute("SELECT id, cantidad FROM productos"))
+        renglones = conn.execute("SELECT count(*) FROM historial WHERE tipo_movimiento='VENTA'").fetchone()[0]
+        conn.close()
+        descuadres = [pid for pid in stock if stock[pid] != STOCK - vendidas.get(pid, 0)]
+
+    n = len(latencias)
+    print(f"{cajas} cajas x {ventas} ventas = {n} ventas en {total:.2f} s ({n / total:,.0f} ventas/s)")
+    print(f"  latencia p50: {percentil(latencias, 50) * 1000:6.1f} ms")
+    print(f"  latencia p99: {percentil(latencias, 99) * 1000:6.1f} ms")
+    print(f"  máxima:       {max(latencias) * 1000:6.1f} ms")
+    print(f"  errores: {len(errores)}  renglones de venta: {renglones}  productos descuadrados: {len(descuadres)}")
+    sys.exit(1 if errores or descuadres else 0)
@@ -0,0 +1,57 @@
+# Prueba de estrés de la numeración de tickets: varios procesos x varios hilos
+# pidiendo tickets a la vez sobre la misma DB. Verifica que no haya duplicados.
+# Uso: python benchmarks/bench_tickets.py [procesos] [hilos] [tickets_por_hilo]
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gestion import conexion
+from gestion.tickets import crear_tabla_secuencias, nuevo_ticket
+
+
+def trabajar(args):
+    ruta, hilos, por_hilo = args
+    conexion.configurar(ruta)
+    resultados = [[] for _ in range(hilos)]
+
+    def pedir(lista):
+        for _ in range(por_hilo):
+            lista.append(nuevo_ticket("T"))
+
+    ts = [threading.Thread(target=pedir, args=(r,)) for r in resultados]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    # Dentro de cada hilo los números tienen que ser estrictamente crecientes
+    for r in resultados:
+        nums = [int(x.rsplit("-", 1)[1]) for x in r]
+        assert all(a < b for a, b in zip(nums, nums[1:])), "numeración no monótona"
+    return [x for r in resultados for x in r]
+
+
+if __name__ == "__main__":
+    procesos = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    por_hilo = int(sys.argv[3]) if len(sys.argv) > 3 else 2500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "tickets.db")
+        conn = sqlite3.connect(ruta)
+        crear_tabla_secuencias(conn.cursor())
+        conn.commit(); conn.close()
+
+        t0 = time.perf_counter()
+        with Pool(procesos) as p:
+            partes = p.map(trabajar, [(ruta, hilos, por_hilo)] * procesos)
+        dt = time.perf_counter() - t0
+
+    tickets = [x for parte in partes for x in parte]
+    duplicados = len(tickets) - len(set(tickets))
+    print(f"{len(tickets)} tickets en {dt:.2f} s ({len(tickets) / dt:,.0f} tickets/s) - "
+          f"{procesos} procesos x {hilos} hilos")
+    print(f"duplicados: {duplicados}")
+    sys.exit(1 if duplicados else 0)
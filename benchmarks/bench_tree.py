@@ -0,0 +1,67 @@
+# Benchmark: refrescar un Treeview de 10k productos cuando cambian 5 filas.
+# Compara el borrar-y-recargar original contra ReconciliadorTree.
+# Necesita un display (Tk); sin display informa y sale.
+# Uso: python benchmarks/bench_tree.py [productos]
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import ReconciliadorTree
+
+
+def datos(n):
+    return [(i, "Remera", f"PRODUCTO {i:06d}", "Uni", 10, 100.0) for i in range(1, n + 1)]
+
+
+def con_cambios(filas):
+    # 5 cambios: 2 stocks modificados, 1 baja, 1 alta en el medio, 1 alta al final
+    filas = list(filas)
+    filas[10] = filas[10][:4] + (9, 100.0)
+    filas[len(filas) // 2] = filas[len(filas) // 2][:4] + (3, 100.0)
+    del filas[100]
+    filas.insert(200, (10 ** 7, "Gorra", "PRODUCTO NUEVO", "Uni", 5, 50.0))
+    filas.append((10 ** 7 + 1, "Gorra", "ZZZ ULTIMO", "Uni", 5, 50.0))
+    return filas
+
+
+def llenar_original(tree, filas):
+    for i in tree.get_children(): tree.delete(i)
+    for d in filas: tree.insert("", "end", values=d)
+
+
+def medir(fn, root):
+    t0 = time.perf_counter()
+    fn()
+    root.update_idletasks()
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Sin display para Tk ({e}); benchmark omitido")
+        sys.exit(0)
+    root.withdraw()
+    cols = ("ID", "Tipo", "Nombre", "Genero", "Cant", "Precio")
+    antes, despues = datos(n), con_cambios(datos(n))
+
+    tree = ttk.Treeview(root, columns=cols, show="headings")
+    llenar_original(tree, antes)
+    t_original = medir(lambda: llenar_original(tree, despues), root)
+    tree.destroy()
+
+    tree = ttk.Treeview(root, columns=cols, show="headings")
+    rec = ReconciliadorTree(tree)
+    rec.aplicar(antes)
+    t_diff = medir(lambda: rec.aplicar(despues), root)
+    assert list(tree.get_children()) == [str(f[0]) for f in despues]
+    root.destroy()
+
+    print(f"{n} productos, 5 filas cambiadas")
+    print(f"  borrar y recargar: {t_original * 1000:8.1f} ms")
+    print(f"  por diferencias:   {t_diff * 1000:8.1f} ms  (x{t_original / t_diff:.0f})")
@@ -0,0 +1,149 @@
+# Genera bases de prueba de un negocio grande con el esquema real (gestion.db.iniciar_db).
+# Productos con nombres, precios y stock verosímiles; historial de tickets de venta y compra
+# en orden de fecha, con popularidad tipo Zipf (pocos productos venden mucho). El stock final de
+# cada producto sale de sus movimientos, desde un stock inicial que nunca deja el saldo negativo.
+# La carga masiva se hace sin índices ni triggers y después se recrean tal cual estaban y se
+# reconstruyen las tablas derivadas (resumen, FTS, libro de stock), igual que quedarían en uso.
+# Las bases se guardan en DIRECTORIO y se reutilizan si ya existen.
+# Uso: python benchmarks/generar_datos.py [1k|50k|500k ...] [--historial N] [--dir carpeta] [--regenerar]
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gestion import conexion as cx
+from gestion.buscador import crear_indice_busqueda
+from gestion.db import iniciar_db
+from gestion.movimientos import cargar_movimientos_iniciales
+from gestion.resumen import reconstruir_resumen
+
+# escala -> (productos, renglones de historial)
+ESCALAS = {"1k": (1_000, 100_000), "50k": (50_000, 2_000_000), "500k": (500_000, 10_000_000)}
+DIRECTORIO = os.path.join(tempfile.gettempdir(), "gestion_bench")
+DIAS = 730
+SEMILLA = 42
+LOTE = 100_000
+
+TIPOS = ["Remera", "Pantalón", "Buzo", "Campera", "Short", "Vestido", "Pollera", "Camisa", "Medias",
+         "Gorra", "Zapatilla", "Bermuda", "Chomba", "Musculosa", "Jean"]
+MODELOS = ["LISA", "RAYADA", "ESTAMPADA", "OVERSIZE", "SLIM", "CLÁSICA", "DEPORTIVA", "BÁSICA", "PREMIUM", "VINTAGE"]
+COLORES = ["NEGRO", "BLANCO", "AZUL", "ROJO", "VERDE", "GRIS", "BEIGE", "BORDÓ", "CELESTE", "ROSA", "MOSTAZA", "NATURAL"]
+TALLES = ["XS", "S", "M", "L", "XL", "XXL"]
+GENEROS = ["Hombre", "Mujer", "Unisex", "Niño", "Niña"]
+
+
+def ruta_escala(escala, historial=None, directorio=DIRECTORIO):
+    productos, renglones = ESCALAS[escala]
+    return os.path.join(directorio, f"negocio_{escala}_{historial or renglones}.db")
+
+
+def _productos(rnd, n):
+    for i in range(n):
+        nombre = f"{rnd.choice(MODELOS)} {rnd.choice(COLORES)} {rnd.choice(TALLES)} {i:06d}"
+        precio = rnd.randint(30, 1800) * 5000  # $1.500 a $90.000 de a $50, en centavos
+        yield (rnd.choice(TIPOS), nombre, rnd.choice(GENEROS), 0, precio)  # cantidad: ver _stock_final
+
+
+def _historial(rnd, renglones, productos, saldos):
+    # Tickets de 1 a 4 renglones repartidos en DIAS días hasta ayer; 1 de cada 5 es una compra.
+    # saldos[pid] = [neto, mínimo del saldo acumulado] para después fijar el stock
+    ids = list(range(1, len(productos) + 1))
+    rnd.shuffle(ids)
+    acumulado, pesos = 0.0, []
+    for rango in range(1, len(ids) + 1):
+        acumulado += 1 / rango ** 0.8
+        pesos.append(acumulado)
+    inicio = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=DIAS)
+    segundos = DIAS * 86400 / max(1, renglones / 2.5)
+    generados, ticket, momento = 0, 0, inicio
+    while generados < renglones:
+        ticket += 1
+        momento += timedelta(seconds=rnd.expovariate(1 / segundos))
+        fecha = momento.strftime("%Y-%m-%d %H:%M:%S")
+        compra = rnd.random() < 0.2
+        tid = f"{'C' if compra else 'T'}-{momento:%Y%m%d}-{ticket:07d}"
+        for pid in rnd.choices(ids, cum_weights=pesos, k=min(rnd.randint(1, 4), renglones - generados)):
+            tipo, nombre, genero, _, precio = productos[pid - 1]
+            if compra: mov, cantidad, unitario = "COMPRA", rnd.randint(6, 60), precio * 55 // 100
+            else: mov, cantidad, unitario = "VENTA", rnd.choice((1, 1, 1, 2, 2, 3)), precio
+            saldo = saldos.setdefault(pid, [0, 0])
+            saldo[0] += cantidad if compra else -cantidad
+            saldo[1] = min(saldo[1], saldo[0])
+            yield (tid, pid, nombre, mov, cantidad, unitario, cantidad * unitario, fecha)
+            generados += 1
+
+
+def _stock_final(rnd, n, saldos):
+    # Stock inicial = lo justo para que ninguna venta deje el saldo bajo cero, más un remanente;
+    # el stock actual es ese inicial más el neto del historial
+    for pid in range(1, n + 1):
+        neto, minimo = saldos.get(pid, (0, 0))
+        yield (-minimo + int(rnd.expovariate(1 / 30)) + neto, pid)
+
+
+def generar(ruta, productos, renglones, semilla=SEMILLA, progreso=print):
+    if os.path.exists(ruta): os.remove(ruta)
+    cx.configurar(ruta)
+    iniciar_db()  # mismo esquema y migraciones que la app
+    cx.obtener_pool().cerrar()
+    rnd = random.Random(semilla)
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-200000")
+    # Índices y triggers afuera durante la carga; se recrean con el mismo SQL
+    extras = conn.execute("""SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger')
+                             AND sql IS NOT NULL AND tbl_name IN ('productos', 'historial')""").fetchall()
+    for tipo, nombre, _ in extras: conn.execute(f"DROP {tipo.upper()} {nombre}")
+
+    filas = list(_productos(rnd, productos))
+    conn.executemany("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)", filas)
+    conn.commit()
+    lote, hechos, saldos = [], 0, {}
+    for fila in _historial(rnd, renglones, filas, saldos):
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            conn.executemany("INSERT INTO historial VALUES (NULL,?,?,?,?,?,?,?,?)", lote); conn.commit()
+            hechos += len(lote); lote = []
+            progreso(f"\r  historial {hechos:,}/{renglones:,}", end="", flush=True)
+    if lote: conn.executemany("INSERT INTO historial VALUES (NULL,?,?,?,?,?,?,?,?)", lote); conn.commit()
+    conn.executemany("UPDATE productos SET cantidad = ? WHERE id = ?", _stock_final(rnd, productos, saldos)); conn.commit()
+    progreso(f"\r  historial {renglones:,}/{renglones:,}; índices, triggers y tablas derivadas...", flush=True)
+
+    for _, _, sql in extras: conn.execute(sql)
+    cursor = conn.cursor()
+    reconstruir_resumen(cursor)
+    crear_indice_busqueda(cursor)
+    for tabla in ("movimientos_stock", "snapshots_stock", "snapshots_stock_detalle"): cursor.execute(f"DELETE FROM {tabla}")
+    cargar_movimientos_iniciales(cursor)
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return ruta
+
+
+def obtener(escala, historial=None, directorio=DIRECTORIO, regenerar=False, progreso=print):
+    # Ruta de la base de esa escala; la genera si no existe. Devuelve (ruta, segundos de generación o None)
+    os.makedirs(directorio, exist_ok=True)
+    ruta = ruta_escala(escala, historial, directorio)
+    if os.path.exists(ruta) and not regenerar: return ruta, None
+    productos, renglones = ESCALAS[escala]
+    progreso(f"Generando {escala}: {productos:,} productos, {historial or renglones:,} renglones en {ruta}")
+    t0 = time.perf_counter()
+    generar(ruta + ".tmp", productos, historial or renglones, progreso=progreso)
+    os.replace(ruta + ".tmp", ruta)
+    return ruta, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opcion = lambda nombre, defecto: args[args.index(nombre) + 1] if nombre in args else defecto
+    historial = int(opcion("--historial", 0)) or None
+    directorio = opcion("--dir", DIRECTORIO)
+    escalas = [a for a in args if a in ESCALAS] or ["1k"]
+    for escala in escalas:
+        ruta, segundos = obtener(escala, historial, directorio, "--regenerar" in args)
+        print(f"{escala}: {ruta}" + (f" (generada en {segundos:.1f} s)" if segundos else " (ya existía)"))
@@ -0,0 +1,239 @@
+# Suite de benchmarks sobre bases de un negocio grande (ver generar_datos.py).
+# Por escala mide las funciones db_* reales: listado con y sin filtro, búsqueda, ventas con
+# carritos de distintos tamaños, compras, totales del dashboard, historial (primera página
+# y carga completa por páginas), stock a una fecha y, si hay display, llenar y ordenar el
+# Treeview del inventario. Cada corrida trabaja sobre una copia de la base generada, así
+# todas parten de los mismos datos, y deja un JSON para comparar contra corridas anteriores.
+# Uso: python benchmarks/suite.py [1k 50k 500k] [--historial N] [--dir carpeta] [--rep N]
+#                                 [--salida archivo.json] [--comparar base.json] [--tolerancia 0.25]
+# Con --comparar sale con código 1 si alguna operación es más lenta que la base por encima de la tolerancia.
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generar_datos import DIRECTORIO, ESCALAS, obtener
+from gestion import conexion as cx
+from gestion.catalogo import catalogo
+from gestion.db import (db_buscar_productos, db_historial_pagina, db_listar_productos, db_procesar_compra,
+                        db_procesar_venta, db_totales_dashboard)
+from gestion.movimientos import conciliar, stock_al
+from gestion.resumen import totales_periodo
+
+CARRITOS = (1, 5, 20, 100)
+PAGINA_HISTORIAL = 10_000
+MAX_FILAS_TREE = 100_000  # más que esto en un Treeview no es algo que la app muestre
+MINIMO_COMPARABLE_MS = 1.0  # por debajo el ruido pesa más que la diferencia
+
+
+def cronometrar(fn, repeticiones, antes=None):
+    # fn() se corre 'repeticiones' veces; antes(), si se da, prepara cada vuelta fuera del tiempo
+    tiempos, filas = [], None
+    for _ in range(repeticiones):
+        arg = antes() if antes else None
+        t0 = time.perf_counter()
+        res = fn(arg) if antes else fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+        if isinstance(res, str) and res != "OK": raise RuntimeError(res)
+        if isinstance(res, (list, dict)): filas = len(res)
+        elif isinstance(res, int) and not isinstance(res, bool): filas = res
+    tiempos.sort()
+    return {"repeticiones": repeticiones, "min_ms": round(tiempos[0], 3),
+            "mediana_ms": round(statistics.median(tiempos), 3),
+            "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 3),
+            "max_ms": round(tiempos[-1], 3), "filas": filas}
+
+
+def historial_completo():
+    # Lo que costaría traer todo el Registro: páginas por clave hasta agotar
+    total, clave, direccion = 0, None, None
+    while True:
+        pagina = db_historial_pagina(clave, direccion, limite=PAGINA_HISTORIAL)
+        if not pagina: return total
+        total += len(pagina)
+        clave, direccion = pagina[-1][0], "abajo"
+
+
+def dashboard_sin_resumen():
+    # Referencia: el total recorriendo el historial, como antes del resumen materializado
+    with cx.conexion() as conn:
+        return conn.execute("SELECT coalesce(sum(total_renglon), 0), count(*) FROM historial WHERE tipo_movimiento='VENTA'").fetchone()
+
+
+def medir_backend(rep):
+    rnd = random.Random(7)
+    ops = {}
+    with cx.conexion() as conn:
+        ids = [f[0] for f in conn.execute("SELECT id FROM productos ORDER BY id")]
+        medio = conn.execute("SELECT fecha FROM historial WHERE id = (SELECT max(id) / 2 FROM historial)").fetchone()
+        mes = conn.execute("SELECT max(mes) FROM resumen_mensual").fetchone()[0]
+
+    ops["listar_productos"] = cronometrar(db_listar_productos, rep)
+    ops["listar_productos_filtro"] = cronometrar(lambda: db_listar_productos("RAYADA AZUL"), rep)
+    ops["buscar_productos"] = cronometrar(lambda: db_buscar_productos("rayada azul"), rep * 2)
+    ops["catalogo_cargar"] = cronometrar(lambda: catalogo().cargar() or len(catalogo()), rep)
+
+    # Compras primero: reponen los productos que después se venden, así ninguna venta falla por stock
+    elegidos = rnd.sample(ids, min(len(ids), 200))
+    items = {p[0]: p for p in (catalogo().por_id(pid) for pid in elegidos)}
+    def carrito(n, cantidad):
+        return [{'id': pid, 'nombre': items[pid][2], 'cantidad': cantidad, 'precio': items[pid][5], 'nuevo': False}
+                for pid in rnd.sample(elegidos, min(n, len(elegidos)))]
+    ops["compra_200"] = cronometrar(db_procesar_compra, 1, antes=lambda: carrito(200, 5000))
+    ops["compra_20"] = cronometrar(db_procesar_compra, rep * 4, antes=lambda: carrito(20, 10))
+    nuevos = iter(range(10 ** 9))
+    ops["compra_20_nuevos"] = cronometrar(db_procesar_compra, rep * 2, antes=lambda: [
+        {'nuevo': True, 'tipo': "Remera", 'nombre': f"BENCH {datetime.now():%H%M%S} {next(nuevos):06d}",
+         'genero': "Unisex", 'cantidad': 10, 'precio': 1_500_000} for _ in range(20)])
+    for n in CARRITOS:
+        ops[f"venta_{n}"] = cronometrar(db_procesar_venta, rep * 4, antes=lambda n=n: carrito(n, 1))
+
+    ops["dashboard"] = cronometrar(db_totales_dashboard, rep * 4)
+    ops["dashboard_sin_resumen"] = cronometrar(dashboard_sin_resumen, rep)
+    with cx.conexion() as conn:
+        ops["totales_mes"] = cronometrar(lambda: totales_periodo(conn, mes), rep * 4)
+        if medio: ops["stock_al"] = cronometrar(lambda: stock_al(conn, medio[0]), rep)
+        ops["conciliar"] = cronometrar(lambda: conciliar(conn), rep)
+    ops["historial_primera_pagina"] = cronometrar(db_historial_pagina, rep * 4)
+    ops["historial_completo"] = cronometrar(historial_completo, max(1, rep // 2))
+    return ops
+
+
+def medir_tree(rep):
+    # Llenar y ordenar el Treeview del inventario; sin display (o sin la app) queda como omitido
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        return {"omitido": f"sin display: {e}"}
+    try:
+        from app import ReconciliadorTree, _fila_producto, ordenar_treeview
+    except Exception as e:
+        root.destroy()
+        return {"omitido": f"no se pudo importar app: {e}"}
+    root.withdraw()
+    filas = catalogo().listar()[:MAX_FILAS_TREE]
+    ops = {}
+    try:
+        def llenar(_):
+            tree = ttk.Treeview(root, columns=("ID", "Tipo", "Nombre", "Genero", "Stock", "Precio"), show="headings")
+            ReconciliadorTree(tree).aplicar(filas, valores=_fila_producto)
+            root.update_idletasks()
+            tree.destroy()
+            return len(filas)
+        ops["tree_llenar"] = cronometrar(llenar, rep, antes=lambda: None)
+        tree = ttk.Treeview(root, columns=("ID", "Tipo", "Nombre", "Genero", "Stock", "Precio"), show="headings")
+        ReconciliadorTree(tree).aplicar(filas, valores=_fila_producto)
+        sentido = iter([False, True] * rep)
+        def ordenar(_):
+            ordenar_treeview(tree, "Precio", next(sentido))
+            root.update_idletasks()
+            return len(filas)
+        ops["tree_ordenar_precio"] = cronometrar(ordenar, rep, antes=lambda: None)
+    finally:
+        root.destroy()
+    return ops
+
+
+def correr_escala(escala, historial, directorio, rep):
+    base, generada = obtener(escala, historial, directorio)
+    copia = base + ".corrida"
+    shutil.copyfile(base, copia)
+    try:
+        cx.configurar(copia)
+        catalogo().cargar()
+        with cx.conexion() as conn:
+            productos, renglones = [conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0] for t in ("productos", "historial")]
+        resultado = {"productos": productos, "historial": renglones, "bytes": os.path.getsize(base),
+                     "generacion_s": round(generada, 1) if generada else None}
+        t0 = time.perf_counter()
+        resultado["operaciones"] = medir_backend(rep)
+        resultado["tree"] = medir_tree(rep)
+        resultado["duracion_s"] = round(time.perf_counter() - t0, 1)
+        return resultado
+    finally:
+        cx.obtener_pool().cerrar()
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(copia + sufijo): os.remove(copia + sufijo)
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def imprimir(resultados):
+    for escala, r in resultados["escalas"].items():
+        print(f"\n== {escala}: {r['productos']:,} productos, {r['historial']:,} renglones ({r['duracion_s']} s)")
+        print(f"{'operación':28s} {'n':>4s} {'mín':>10s} {'mediana':>10s} {'p95':>10s} {'máx':>10s} {'filas':>10s}")
+        operaciones = dict(r["operaciones"])
+        if "omitido" in r["tree"]: print(f"{'tree':28s} omitido ({r['tree']['omitido']})")
+        else: operaciones.update(r["tree"])
+        for nombre, o in operaciones.items():
+            filas = "" if o["filas"] is None else f"{o['filas']:,}"
+            print(f"{nombre:28s} {o['repeticiones']:4d} {o['min_ms']:10.2f} {o['mediana_ms']:10.2f} "
+                  f"{o['p95_ms']:10.2f} {o['max_ms']:10.2f} {filas:>10s}")
+
+
+def comparar(base, actual, tolerancia):
+    # Medianas de 'actual' contra 'base' por escala y operación; devuelve las regresiones
+    regresiones = []
+    print(f"\nComparación contra {base.get('commit') or '?'} del {base.get('fecha')} (tolerancia {tolerancia:.0%})")
+    for escala, r in actual["escalas"].items():
+        previa = base.get("escalas", {}).get(escala)
+        if not previa: print(f"{escala}: sin datos en la base"); continue
+        if (previa["productos"], previa["historial"]) != (r["productos"], r["historial"]):
+            print(f"{escala}: ojo, los datos no son del mismo tamaño que en la base")
+        viejas = dict(previa["operaciones"]); viejas.update({k: v for k, v in previa.get("tree", {}).items() if isinstance(v, dict)})
+        nuevas = dict(r["operaciones"]); nuevas.update({k: v for k, v in r["tree"].items() if isinstance(v, dict)})
+        for nombre, o in nuevas.items():
+            if nombre not in viejas: continue
+            antes, ahora = viejas[nombre]["mediana_ms"], o["mediana_ms"]
+            razon = ahora / antes if antes else float("inf")
+            marca = ""
+            if razon > 1 + tolerancia and ahora >= MINIMO_COMPARABLE_MS:
+                marca = "  <-- REGRESIÓN"; regresiones.append((escala, nombre, antes, ahora))
+            elif razon < 1 - tolerancia: marca = "  mejor"
+            print(f"{escala:5s} {nombre:28s} {antes:10.2f} -> {ahora:10.2f} ms  x{razon:5.2f}{marca}")
+    return regresiones
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    opcion = lambda nombre, defecto: args[args.index(nombre) + 1] if nombre in args else defecto
+    escalas = [a for a in args if a in ESCALAS] or ["1k"]
+    historial = int(opcion("--historial", 0)) or None
+    directorio = opcion("--dir", DIRECTORIO)
+    rep = int(opcion("--rep", 5))
+    salida = opcion("--salida", os.path.join(RAIZ, "benchmarks", "resultados",
+                                             f"{datetime.now():%Y%m%d_%H%M%S}_{'_'.join(escalas)}.json"))
+
+    resultados = {"fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "commit": _commit(),
+                  "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                  "plataforma": platform.platform(), "repeticiones": rep, "escalas": {}}
+    for escala in escalas:
+        resultados["escalas"][escala] = correr_escala(escala, historial, directorio, rep)
+    imprimir(resultados)
+
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f: json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados en {salida}")
+
+    if "--comparar" in args:
+        with open(opcion("--comparar", ""), encoding="utf-8") as f: base = json.load(f)
+        regresiones = comparar(base, resultados, float(opcion("--tolerancia", 0.25)))
+        print(f"{len(regresiones)} regresiones" if regresiones else "Sin regresiones")
+        sys.exit(1 if regresiones else 0)
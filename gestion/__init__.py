@@ -0,0 +1 @@
+# Núcleo del sistema de gestión (base de datos y lógica de negocio)
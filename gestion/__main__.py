@@ -0,0 +1,187 @@
+import argparse
+import sys
+
+# ==========================================
+# LÍNEA DE COMANDOS: python -m gestion <comando>
+# ==========================================
+# Usa gestion.db sin cargar Tk. Cada comando importa lo que necesita recién al ejecutarse
+# (el importador, pandas para reportes), así 'stock' o 'venta' arrancan rápido.
+#   python -m gestion stock [texto] [--bajo N] [--al AAAA-MM-DD] [--salida stock.csv]
+#   python -m gestion venta ID:CANT[:PRECIO] ...
+#   python -m gestion compra ID:CANT:PRECIO ...
+#   python -m gestion importar proveedor.csv
+#   python -m gestion reporte "Margen por producto" [--desde AAAA-MM-DD] [--hasta ...] [--salida archivo]
+#   python -m gestion migrar
+#   python -m gestion servidor [--host 0.0.0.0] [--puerto 8765]
+# Base de datos: variable NEGOCIO_DB o --db.
+
+
+def _renglones(args, con_precio):
+    # "ID:CANT[:PRECIO]" -> [(id, cantidad, precio en centavos o None)]; PRECIO en pesos: 1500 o 1500,50
+    from gestion.dinero import a_centavos
+    res = []
+    for arg in args:
+        partes = arg.split(":")
+        if len(partes) not in ((3,) if con_precio else (2, 3)):
+            raise ValueError(f"Renglón inválido: {arg!r} (se espera ID:CANT{':PRECIO' if con_precio else '[:PRECIO]'})")
+        try:
+            res.append((int(partes[0]), int(partes[1]), a_centavos(partes[2]) if len(partes) == 3 else None))
+        except ValueError:
+            raise ValueError(f"Renglón inválido: {arg!r}")
+    return res
+
+
+def _productos(ids):
+    from gestion.db import db_consultar
+    filas = db_consultar("SELECT id, tipo, nombre, genero, cantidad, precio FROM productos WHERE id IN (%s)"
+                         % ",".join("?" * len(ids)), list(ids), "productos_por_id")
+    return {f[0]: f for f in filas}
+
+
+def _imprimir(filas):
+    from gestion.dinero import formatear
+    for pid, tipo, nombre, genero, cantidad, precio in filas:
+        print(f"{pid:6d}  {nombre[:30]:30s} {tipo[:12]:12s} {genero[:8]:8s} {cantidad:6d}  {formatear(precio):>11s}")
+
+
+def cmd_stock(a):
+    from gestion.db import db_buscar_productos, db_consultar
+    if a.texto: filas = db_buscar_productos(a.texto)
+    else: filas = db_consultar("SELECT id, tipo, nombre, genero, cantidad, precio FROM productos ORDER BY nombre", nombre="listar_productos")
+    if a.al:
+        # Stock a esa fecha según el libro de movimientos (gestion.movimientos)
+        from gestion.conexion import conexion
+        from gestion.movimientos import stock_al
+        with conexion() as conn: al = stock_al(conn, a.al)
+        filas = [f[:4] + (al.get(f[0], 0), f[5]) for f in filas]
+    if a.bajo is not None: filas = [f for f in filas if f[4] <= a.bajo]
+    if a.salida:
+        import csv
+        from gestion.dinero import a_texto
+        filas = [f[:5] + (a_texto(f[5]),) for f in filas]
+        with open(a.salida, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["id", "tipo", "nombre", "genero", "cantidad", "precio"]); w.writerows(filas)
+        print(f"{len(filas)} productos exportados a {a.salida}")
+    else:
+        _imprimir(filas)
+    return 0
+
+
+def cmd_venta(a):
+    from gestion.db import db_procesar_venta
+    renglones = _renglones(a.renglones, con_precio=False)
+    productos = _productos({pid for pid, _, _ in renglones})
+    carrito = []
+    for pid, cantidad, precio in renglones:
+        if pid not in productos: raise ValueError(f"Producto inexistente: {pid}")
+        prod = productos[pid]
+        carrito.append({'id': pid, 'cantidad': cantidad, 'precio': prod[5] if precio is None else precio, 'nombre': prod[2]})
+    res = db_procesar_venta(carrito)
+    print("Venta guardada" if res == "OK" else res)
+    return 0 if res == "OK" else 1
+
+
+def cmd_compra(a):
+    # Solo productos existentes; para altas en cantidad está 'importar'
+    from gestion.db import db_procesar_compra
+    renglones = _renglones(a.renglones, con_precio=True)
+    productos = _productos({pid for pid, _, _ in renglones})
+    carrito = []
+    for pid, cantidad, precio in renglones:
+        if pid not in productos: raise ValueError(f"Producto inexistente: {pid}")
+        carrito.append({'nuevo': False, 'id': pid, 'cantidad': cantidad, 'precio': precio, 'nombre': productos[pid][2]})
+    res = db_procesar_compra(carrito)
+    print("Ingreso guardado" if res == "OK" else res)
+    return 0 if res == "OK" else 1
+
+
+def cmd_importar(a):
+    from gestion.importador import importar
+    res = importar(a.archivo, progreso=lambda l, i, e: print(f"\r{l} leídas, {i} importadas, {e} errores", end="", flush=True))
+    print(f"\nTicket {res['ticket']}")
+    for linea, motivo in res['errores']: print(f"  línea {linea}: {motivo}")
+    return 1 if res['cant_errores'] else 0
+
+
+def cmd_reporte(a):
+    from gestion.reportes import REPORTES, generar, exportar
+    if a.nombre not in REPORTES: raise ValueError(f"Reporte desconocido. Disponibles: {', '.join(REPORTES)}")
+    df = generar(a.nombre, a.desde, a.hasta)
+    if a.salida: print(f"{exportar(df, a.salida)} filas exportadas a {a.salida}")
+    else: print(df.to_string(index=False))
+    return 0
+
+
+def cmd_migrar(a):
+    from gestion.conexion import conexion
+    from gestion.migraciones import migrar
+    with conexion() as conn: print(f"Esquema en versión {migrar(conn)}")
+    return 0
+
+
+def cmd_servidor(a):
+    import asyncio
+    from gestion.servidor import Servidor
+    try: asyncio.run(Servidor(a.host, a.puerto).servir())
+    except KeyboardInterrupt: pass
+    return 0
+
+
+def crear_parser():
+    p = argparse.ArgumentParser(prog="python -m gestion", description="Sistema de gestión de stock sin interfaz gráfica")
+    p.add_argument("--db", help="archivo de la base (por defecto NEGOCIO_DB o negocio.db)")
+    sub = p.add_subparsers(dest="comando", required=True)
+
+    s = sub.add_parser("stock", help="listar o buscar productos")
+    s.add_argument("texto", nargs="?", default="")
+    s.add_argument("--bajo", type=int, help="solo productos con stock <= N")
+    s.add_argument("--al", help="stock al cierre de esa fecha (AAAA-MM-DD)")
+    s.add_argument("--salida", help="exportar a CSV")
+    s.set_defaults(fn=cmd_stock)
+
+    s = sub.add_parser("venta", help="registrar una venta")
+    s.add_argument("renglones", nargs="+", metavar="ID:CANT[:PRECIO]")
+    s.set_defaults(fn=cmd_venta)
+
+    s = sub.add_parser("compra", help="registrar un ingreso de productos existentes")
+    s.add_argument("renglones", nargs="+", metavar="ID:CANT:PRECIO")
+    s.set_defaults(fn=cmd_compra)
+
+    s = sub.add_parser("importar", help="importar productos y compras desde CSV/XLSX")
+    s.add_argument("archivo")
+    s.set_defaults(fn=cmd_importar)
+
+    s = sub.add_parser("reporte", help="generar un reporte (necesita pandas)")
+    s.add_argument("nombre")
+    s.add_argument("--desde", default="")
+    s.add_argument("--hasta", default="")
+    s.add_argument("--salida", help="exportar a .csv o .parquet")
+    s.set_defaults(fn=cmd_reporte)
+
+    s = sub.add_parser("migrar", help="crear o actualizar el esquema")
+    s.set_defaults(fn=cmd_migrar)
+
+    s = sub.add_parser("servidor", help="servir la base a otras cajas por HTTP/JSON (gestion.servidor)")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--puerto", type=int, default=8765)
+    s.set_defaults(fn=cmd_servidor)
+    return p
+
+
+def main(argv=None):
+    a = crear_parser().parse_args(argv)
+    if a.db:
+        from gestion.conexion import configurar
+        configurar(a.db)
+    from gestion.db import iniciar_db
+    iniciar_db()
+    try:
+        return a.fn(a)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
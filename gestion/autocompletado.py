@@ -0,0 +1,80 @@
+import heapq
+from bisect import bisect_left, bisect_right
+
+from gestion.buscador import normalizar
+
+# ==========================================
+# MOTOR DE AUTOCOMPLETADO (para AutocompleteCombobox)
+# ==========================================
+# Se arma una vez por lista (en set_completion_list): todas las opciones ya normalizadas
+# (minúsculas, sin acentos) concatenadas en un solo texto con sus posiciones de inicio.
+# Una búsqueda nueva recorre ese texto con str.find (en C) en vez de bajar a minúsculas
+# cada opción en cada tecla; si la consulta extiende a la anterior, solo se filtran
+# los aciertos anteriores. Se devuelven los 'limite' mejores por relevancia y stock.
+# Las opciones que EMPIEZAN con la consulta salen de un orden alfabético con bisect:
+# si alcanzan para llenar el límite (lo normal con 1-2 letras) no hace falta recorrer nada.
+# (Un índice de trigramas en Python puro tarda ~1 s en armarse para 100k opciones y
+# la lista se rearma tras cada venta; este texto concatenado se arma en milisegundos.)
+
+LIMITE = 50
+_SEP = "\n"
+
+
+class IndiceAutocompletado:
+    def __init__(self, entradas, stock=None):
+        self.entradas = list(entradas)
+        # Normalizamos todo de una vez (no opción por opción) y recién después separamos
+        self._texto = normalizar(_SEP.join(e.replace(_SEP, " ") for e in self.entradas)).lower() + _SEP
+        self._norm = self._texto.split(_SEP)[:-1]
+        self._inicios, pos = [], 0
+        for n in self._norm:
+            self._inicios.append(pos); pos += len(n) + 1
+        self._inicios.append(pos)  # centinela: fin del texto
+        stock = stock or {}
+        self._stock = [-stock.get(e, 0) for e in self.entradas]
+        self._orden = sorted(range(len(self._norm)), key=self._norm.__getitem__)
+        self._ordenadas = [self._norm[i] for i in self._orden]
+        self._ultima, self._ultimos = None, None
+
+    def _por_prefijo(self, q):
+        a = bisect_left(self._ordenadas, q)
+        b = bisect_left(self._ordenadas, q + "\uffff", a)
+        return self._orden[a:b]
+
+    def _clase(self, n, pos):
+        # Menor es mejor: empieza con lo buscado > empieza una palabra > contiene
+        if pos == 0: return 0
+        return 1 if n[pos - 1] == " " else 2
+
+    def _escanear(self, q):
+        res, pos, find, inicios = [], 0, self._texto.find, self._inicios
+        while True:
+            pos = find(q, pos)
+            if pos < 0: return res
+            i = bisect_right(inicios, pos) - 1
+            res.append((self._clase(self._norm[i], pos - inicios[i]), self._stock[i], i))
+            pos = inicios[i + 1]  # saltamos al inicio de la opción siguiente
+
+    def _filtrar(self, q, previos):
+        res = []
+        for _, stock, i in previos:
+            n = self._norm[i]
+            pos = n.find(q)
+            if pos >= 0: res.append((self._clase(n, pos), stock, i))
+        return res
+
+    def buscar(self, texto, limite=LIMITE):
+        q = normalizar(texto).lower().replace(_SEP, " ")
+        if not q:
+            self._ultima = None
+            return self.entradas[:limite]
+        if self._ultima is not None and self._ultima in q:
+            candidatos = self._filtrar(q, self._ultimos)
+        elif len(prefijos := self._por_prefijo(q)) >= limite:
+            # Los que empiezan con q ya llenan el límite: son exactamente los mejores
+            self._ultima = None
+            return [self.entradas[i] for _, i in heapq.nsmallest(limite, ((self._stock[i], i) for i in prefijos))]
+        else:
+            candidatos = self._escanear(q)
+        self._ultima, self._ultimos = q, candidatos
+        return [self.entradas[i] for _, _, i in heapq.nsmallest(limite, candidatos)]
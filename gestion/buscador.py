@@ -0,0 +1,84 @@
+from gestion.conexion import conexion
+
+# ==========================================
+# BÚSQUEDA DE PRODUCTOS (SQLite FTS5 trigram)
+# ==========================================
+# productos_fts guarda nombre/tipo/genero normalizados (sin acentos) con rowid = productos.id
+# y se mantiene por triggers. El tokenizer trigram encuentra subcadenas de 3+ letras usando
+# el índice (lo que antes era un LIKE '%...%' recorriendo toda la tabla) e ignora mayúsculas.
+# La normalización se hace con replace() en SQL (no con una función de Python) para que
+# cualquier conexión pueda escribir en productos, incluso fuera de la app.
+
+ACENTOS = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n",
+           "Á": "A", "É": "E", "Í": "I", "Ó": "O", "Ú": "U", "Ü": "U", "Ñ": "N"}
+LIMITE = 500  # filas máximas que devuelve una búsqueda
+
+
+def normalizar(texto):
+    # replace() encadenado: bastante más rápido que str.translate sobre textos largos
+    texto = texto or ""
+    for con, sin in ACENTOS.items():
+        if con in texto: texto = texto.replace(con, sin)
+    return texto
+
+
+def _escapar_like(texto):
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _sql_normalizar(expr):
+    for con, sin in ACENTOS.items():
+        expr = f"replace({expr}, '{con}', '{sin}')"
+    return expr
+
+
+def crear_indice_busqueda(cursor):
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(nombre, tipo, genero, tokenize='trigram')")
+    valores = ", ".join(_sql_normalizar(f"NEW.{c}") for c in ("nombre", "tipo", "genero"))
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_fts_producto_alta AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts (rowid, nombre, tipo, genero) VALUES (NEW.id, {valores});
+    END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_fts_producto_baja AFTER DELETE ON productos BEGIN
+        DELETE FROM productos_fts WHERE rowid = OLD.id;
+    END""")
+    # Solo si cambia algo buscable: las ventas (que tocan cantidad) no reescriben el índice
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_fts_producto_modif AFTER UPDATE OF nombre, tipo, genero ON productos BEGIN
+        DELETE FROM productos_fts WHERE rowid = OLD.id;
+        INSERT INTO productos_fts (rowid, nombre, tipo, genero) VALUES (NEW.id, {valores});
+    END""")
+    cursor.execute("DELETE FROM productos_fts")
+    cursor.execute("INSERT INTO productos_fts (rowid, nombre, tipo, genero) SELECT id, "
+                   + ", ".join(_sql_normalizar(c) for c in ("nombre", "tipo", "genero")) + " FROM productos")
+
+
+def buscar_productos(conn, texto, limite=LIMITE):
+    # Devuelve filas (id, tipo, nombre, genero, cantidad, precio) ordenadas por relevancia:
+    # primero los que EMPIEZAN con lo buscado, después por bm25 y por nombre
+    terminos = normalizar(texto).split()
+    if not terminos: return []
+    largos = [t for t in terminos if len(t) >= 3]
+    cortos = [t for t in terminos if len(t) < 3]
+
+    cond, params = [], []
+    if largos:
+        # Cada término entre comillas (se escapan las comillas internas): subcadena exacta
+        cond.append("productos_fts MATCH ?")
+        params.append(" AND ".join('"' + t.replace('"', '""') + '"' for t in largos))
+    for t in cortos:
+        # Trigram no indexa menos de 3 letras: se filtran sobre las filas de productos_fts
+        patron = "%" + _escapar_like(t) + "%"
+        cond.append("(f.nombre LIKE ? ESCAPE '\\' OR f.tipo LIKE ? ESCAPE '\\' OR f.genero LIKE ? ESCAPE '\\')")
+        params += [patron] * 3
+
+    prefijo = _escapar_like(terminos[0]) + "%"
+    q = f"""SELECT p.id, p.tipo, p.nombre, p.genero, p.cantidad, p.precio
+            FROM productos_fts f JOIN productos p ON p.id = f.rowid
+            WHERE {" AND ".join(cond)}
+            ORDER BY (f.nombre LIKE ? ESCAPE '\\') DESC, {"f.rank, " if largos else ""}p.nombre
+            LIMIT ?"""
+    return conn.execute(q, params + [prefijo, limite]).fetchall()
+
+
+def buscar(texto, limite=LIMITE):
+    with conexion() as conn:
+        return buscar_productos(conn, texto, limite)
@@ -0,0 +1,182 @@
+import json
+import sqlite3
+import threading
+
+from gestion.conexion import obtener_pool
+from gestion.metricas import metricas
+
+# ==========================================
+# CACHÉ DEL CATÁLOGO DE PRODUCTOS
+# ==========================================
+# Se carga 'productos' una vez y se mantiene en memoria. Las escrituras de la app
+# (venta, compra, edición, alta) avisan qué ids tocaron y se releen solo esas filas.
+# Los cambios hechos por OTRA terminal se detectan con PRAGMA data_version sobre
+# una conexión propia: si cambió y no fuimos nosotros, se recarga todo.
+# Para distinguir "fuimos nosotros", cada escritura lee la versión con el lock de escritura
+# ya tomado (version_previa): si no es la que tenemos vista, otra terminal confirmó algo
+# antes y no alcanza con releer nuestros ids. En local data_version no cuenta commits (solo
+# avisa que hubo cambios), así que tras una escritura propia la versión vista no avanza y la
+# próxima verificación recarga; si las filas quedaron iguales no se avisa a nadie.
+# Las vistas se suscriben y reciben el conjunto de ids cambiados (None = recarga total).
+# Las lecturas a la fuente (SQLite o HTTP en gestion.cliente) se hacen SIN el lock: solo se
+# toma para cambiar lo que hay en memoria, así listar() desde la ventana nunca espera a la red.
+
+COLUMNAS = "id, tipo, nombre, genero, cantidad, precio"
+
+
+class CatalogoCache:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._por_id = {}       # id -> (id, tipo, nombre, genero, cantidad, precio)
+        self._por_clave = {}    # (nombre, tipo, genero) -> id
+        self._ordenados = None  # lista por nombre, se arma a demanda
+        self._suscriptores = []
+        self._conn = None
+        self._ruta = None
+        self._version = None
+        self._turno = 0         # cada cargar() toma un turno; no se pisa una carga más nueva
+        self._cargado_turno = 0
+        self._releidos = {}     # id -> turno en que recargar_ids lo releyó (durante una carga)
+        self._cargas = 0
+        self.cargado = False
+
+    # --- conexión propia para leer y vigilar data_version ---
+    def _conexion(self):
+        ruta = obtener_pool().ruta
+        if self._conn is None or self._ruta != ruta:
+            if self._conn is not None: self._conn.close()
+            self._conn = sqlite3.connect(ruta, timeout=10, check_same_thread=False)
+            self._ruta = ruta
+            self.cargado = False
+        return self._conn
+
+    # --- fuente de datos (gestion.cliente.CatalogoRemoto las reemplaza por pedidos al servidor) ---
+    def _leer_version(self):
+        return self._conexion().execute("PRAGMA data_version").fetchone()[0]
+
+    def _leer_todos(self):
+        return self._conexion().execute(f"SELECT {COLUMNAS} FROM productos").fetchall()
+
+    def _leer_ids(self, ids):
+        return self._conexion().execute(f"SELECT {COLUMNAS} FROM productos WHERE id IN (SELECT value FROM json_each(?))",
+                                        (json.dumps(list(ids)),)).fetchall()
+
+    def _misma_fuente(self):
+        return self._ruta == obtener_pool().ruta
+
+    # --- carga ---
+    def cargar(self):
+        # Devuelve si cambió algo respecto de lo que había en memoria; solo entonces avisa
+        with self._lock:
+            self._turno += 1; turno = self._turno; self._cargas += 1
+        try:
+            # La versión antes que las filas: lo que se confirme en el medio se vuelve a ver
+            version = self._leer_version()
+            por_id = {f[0]: f for f in self._leer_todos()}
+        finally:
+            with self._lock: self._cargas -= 1
+        with self._lock:
+            vieja = turno < self._cargado_turno
+            if not vieja:
+                # Lo que recargar_ids releyó mientras tanto es más nuevo que esta lectura
+                for pid, t in self._releidos.items():
+                    if t < turno: continue
+                    if pid in self._por_id: por_id[pid] = self._por_id[pid]
+                    else: por_id.pop(pid, None)
+                cambio = por_id != self._por_id
+                if cambio:
+                    self._por_id = por_id
+                    self._por_clave = {(f[2], f[1], f[3]): f[0] for f in por_id.values()}
+                    self._ordenados = None
+                self._version, self._cargado_turno, self.cargado = version, turno, True
+            if not self._cargas: self._releidos.clear()
+        if vieja: return False
+        if cambio: self._notificar(None)
+        return cambio
+
+    def _asegurar(self):
+        if not self.cargado or not self._misma_fuente(): self.cargar()
+
+    def version_previa(self):
+        # Llamar con el lock de escritura tomado (después de BEGIN IMMEDIATE): hasta nuestro
+        # commit nadie más puede confirmar, así que la versión leída es la previa a la escritura
+        return self._leer_version() if self.cargado else None
+
+    def recargar_ids(self, ids, previa=None, posterior=None):
+        # Lo llaman los caminos de escritura de la app después de confirmar, con la
+        # version_previa() de esa escritura: se releen esos ids. La versión vista avanza solo si
+        # previa era la vista y la fuente da la posterior exacta, previa + 1 (el servidor cuenta
+        # cada escritura). Leerla después del commit no sirve: otra terminal pudo confirmar en el
+        # medio. Si no, la vista queda como estaba y verificar_externos recarga todo (fuera del
+        # camino de la escritura).
+        ids = {i for i in ids if i}
+        if not self.cargado: return
+        filas = self._leer_ids(ids) if ids else []
+        with self._lock:
+            if ids:
+                for pid in ids: self._quitar(pid)
+                for f in filas:
+                    self._por_id[f[0]] = f
+                    self._por_clave[(f[2], f[1], f[3])] = f[0]
+                self._ordenados = None
+                if self._cargas: self._releidos.update(dict.fromkeys(ids, self._turno))
+            if previa is not None and previa == self._version and posterior == previa + 1: self._version = posterior
+        if ids: self._notificar(ids)
+
+    def _quitar(self, pid):
+        viejo = self._por_id.pop(pid, None)
+        if viejo and self._por_clave.get((viejo[2], viejo[1], viejo[3])) == pid:
+            del self._por_clave[(viejo[2], viejo[1], viejo[3])]
+
+    def verificar_externos(self):
+        # True si la DB cambió y al recargar el catálogo quedó distinto
+        if not self.cargado or self._leer_version() == self._version: return False
+        return self.cargar()
+
+    # --- lecturas O(1) ---
+    def por_id(self, pid):
+        self._asegurar()
+        return self._por_id.get(pid)
+
+    def por_clave(self, nombre, tipo, genero):
+        self._asegurar()
+        pid = self._por_clave.get((nombre, tipo, genero))
+        return self._por_id.get(pid) if pid is not None else None
+
+    def listar(self, filtro=""):
+        # Mismo resultado que db_listar_productos (orden por nombre, filtro en nombre o tipo)
+        self._asegurar()
+        with self._lock:
+            if self._ordenados is None:
+                self._ordenados = sorted(self._por_id.values(), key=lambda f: (f[2], f[0]))
+            filas = self._ordenados
+        if not filtro: return list(filas)
+        f = filtro.lower()
+        return [p for p in filas if f in (p[2] or "").lower() or f in (p[1] or "").lower()]
+
+    def __len__(self):
+        self._asegurar()
+        return len(self._por_id)
+
+    # --- notificaciones ---
+    def suscribir(self, fn):
+        self._suscriptores.append(fn)
+
+    def desuscribir(self, fn):
+        if fn in self._suscriptores: self._suscriptores.remove(fn)
+
+    def _notificar(self, ids):
+        for fn in list(self._suscriptores):
+            try: fn(ids)
+            except Exception as e: metricas().registrar_error("catalogo.notificar", e)
+
+
+_catalogo = CatalogoCache()
+
+def catalogo():
+    return _catalogo
+
+def usar_catalogo(instancia):
+    # Para trabajar contra otra fuente (ej. el servidor, en gestion.cliente)
+    global _catalogo
+    _catalogo = instancia
@@ -0,0 +1,198 @@
+import http.client
+import json
+import os
+import sqlite3
+import threading
+from urllib.parse import urlsplit, urlencode, quote
+
+from gestion.catalogo import CatalogoCache, catalogo, usar_catalogo
+from gestion.metricas import metricas, instrumentar
+
+# ==========================================
+# CLIENTE LIVIANO DEL SERVIDOR (gestion.servidor)
+# ==========================================
+# Mismas funciones db_* que gestion.db, pero cada una es un pedido HTTP/JSON al servidor.
+# La app las usa en lugar de las locales cuando está definida NEGOCIO_SERVIDOR
+# (ej. http://192.168.0.10:8765). El catálogo en memoria se llena desde el servidor y
+# detecta cambios de otras cajas por la 'version' del servidor en vez de data_version.
+# Cada escritura devuelve la versión de antes y de después: si en el medio escribió otra
+# caja, no alcanza con releer nuestros ids y se recarga todo (ver _recargar).
+# Una conexión HTTP keep-alive por hilo (la app pide desde sus hilos de trabajo).
+
+SERVIDOR = os.environ.get("NEGOCIO_SERVIDOR", "http://127.0.0.1:8765")
+TOKEN = os.environ.get("NEGOCIO_TOKEN", "")
+TIMEOUT = 10
+
+_local = threading.local()
+
+
+class ErrorServidor(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def configurar(url=None, token=None):
+    global SERVIDOR, TOKEN
+    if url: SERVIDOR = url
+    if token is not None: TOKEN = token
+
+
+def _conexion():
+    url = urlsplit(SERVIDOR)
+    clave = (url.hostname, url.port)
+    if getattr(_local, "clave", None) != clave:
+        _local.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=TIMEOUT)
+        _local.clave = clave
+    return _local.conn
+
+
+def _pedir(metodo, ruta, datos=None, cuerpo=None, consulta=None):
+    if consulta: ruta += "?" + urlencode(consulta)
+    if datos is not None: cuerpo = json.dumps(datos).encode("utf-8")
+    encabezados = {"Content-Type": "application/json"}
+    if TOKEN: encabezados["X-Token"] = TOKEN
+    for intento in range(2):
+        conn, enviado = _conexion(), False
+        try:
+            conn.request(metodo, ruta, body=cuerpo, headers=encabezados)
+            enviado = True
+            r = conn.getresponse()
+            respuesta = json.loads(r.read() or b"null")
+            break
+        except (http.client.HTTPException, ConnectionError):
+            # La conexión keep-alive murió (ej. el servidor se reinició): se reintenta con una nueva,
+            # salvo una escritura que ya salió (podría haberse aplicado: no se duplica una venta)
+            conn.close(); _local.clave = None
+            if intento or (enviado and metodo != "GET"): raise
+    if r.status >= 400: raise ErrorServidor(r.status, respuesta.get("error", r.reason))
+    return respuesta
+
+
+class CatalogoRemoto(CatalogoCache):
+    def _leer_version(self):
+        return _pedir("GET", "/version")["version"]
+
+    def _leer_todos(self):
+        return [tuple(f) for f in _pedir("GET", "/productos")]
+
+    def _leer_ids(self, ids):
+        return [tuple(f) for f in _pedir("GET", "/productos", consulta={"ids": ",".join(map(str, ids))})]
+
+    def _misma_fuente(self):
+        return True
+
+
+def _recargar(res, ids):
+    # res["version"] = [antes, después] de nuestra escritura en el servidor. Si subió justo
+    # uno y 'antes' es la que teníamos vista, lo único nuevo es lo nuestro: se releen esos ids
+    antes, despues = res["version"]
+    if despues != antes + 1: catalogo().cargar()
+    else: catalogo().recargar_ids(ids, antes, despues)
+
+
+# --- MISMAS FUNCIONES QUE gestion.db ---
+def iniciar_db():
+    # El esquema es cosa del servidor: acá solo se verifica que responda
+    if not isinstance(catalogo(), CatalogoRemoto): usar_catalogo(CatalogoRemoto())
+    _pedir("GET", "/version")
+
+
+def db_listar_productos(filtro=""):
+    return [tuple(f) for f in _pedir("GET", "/productos", consulta={"filtro": filtro})]
+
+
+def db_buscar_productos(texto):
+    try:
+        return [tuple(f) for f in _pedir("GET", "/productos", consulta={"q": texto})]
+    except Exception as e:
+        metricas().registrar_error("db.db_buscar_productos", e)
+        return []
+
+
+def db_actualizar_producto(pid, t, n, g, c, p):
+    try:
+        res = _pedir("PUT", f"/productos/{int(pid)}", {"tipo": t, "nombre": n, "genero": g, "cantidad": c, "precio": p})
+    except Exception as e:
+        return str(e)
+    if res["resultado"] == "OK": _recargar(res, res["ids"])
+    return res["resultado"]
+
+
+def db_obtener_precio(pid):
+    prod = catalogo().por_id(pid)
+    return prod[5] if prod else 0
+
+
+def db_crear_producto(tipo, nombre, genero, cantidad, precio):
+    try:
+        res = _pedir("POST", "/productos", {"tipo": tipo, "nombre": nombre, "genero": genero,
+                                            "cantidad": cantidad, "precio": precio})
+    except ErrorServidor as e:
+        # Igual que en local: la UI distingue el producto repetido
+        if e.estado == 409: raise sqlite3.IntegrityError(str(e))
+        raise
+    _recargar(res, [res["id"]])
+    return res["id"]
+
+
+def db_historial_pagina(clave=None, direccion=None, limite=200, desde="", hasta="", ticket=""):
+    consulta = {"clave": "" if clave is None else clave, "direccion": direccion or "", "limite": limite,
+                "desde": desde, "hasta": hasta, "ticket": ticket}
+    try:
+        return [(i, tuple(vals)) for i, vals in _pedir("GET", "/historial", consulta=consulta)]
+    except Exception as e:
+        metricas().registrar_error("db.db_historial_pagina", e)
+        return []
+
+
+def db_totales_dashboard():
+    return tuple(_pedir("GET", "/totales"))
+
+
+def db_procesar_venta(carrito):
+    try: res = _pedir("POST", "/ventas", {"carrito": carrito})
+    except Exception as e: return str(e)
+    if res["resultado"] == "OK": _recargar(res, res["ids"])
+    return res["resultado"]
+
+
+def db_procesar_compra(carrito):
+    try: res = _pedir("POST", "/compras", {"carrito": carrito})
+    except Exception as e: return str(e)
+    if res["resultado"] == "OK":
+        # Los productos nuevos tienen ids que no conocemos: en ese caso se recarga todo
+        if any(it.get('nuevo') for it in carrito): catalogo().cargar()
+        else: _recargar(res, res["ids"])
+    return res["resultado"]
+
+
+# --- IMPORTACIÓN Y REPORTES (se ejecutan en el servidor) ---
+def importar(ruta, lote=None, progreso=None, escritor=None):
+    # lote y escritor no aplican: el servidor lee el archivo y escribe por lotes (op_importar)
+    with open(ruta, "rb") as f:
+        cuerpo = f.read()
+    formato = "xlsx" if ruta.lower().endswith((".xlsx", ".xlsm")) else "csv"
+    try:
+        res = _pedir("POST", "/importar", cuerpo=cuerpo, consulta={"formato": formato})
+    except ErrorServidor as e:
+        if e.estado == 400: raise ValueError(str(e))
+        raise
+    if progreso: progreso(res['leidas'], res['importadas'], res['cant_errores'])
+    if res['importadas'] and catalogo().cargado: catalogo().cargar()
+    res['errores'] = [tuple(e) for e in res['errores']]
+    return res
+
+
+def generar(nombre, desde="", hasta=""):
+    from gestion.reportes import _pandas
+    try:
+        res = _pedir("GET", "/reportes/" + quote(nombre), consulta={"desde": desde, "hasta": hasta})
+    except ErrorServidor as e:
+        if e.estado in (400, 404): raise ValueError(str(e))
+        raise
+    return _pandas().DataFrame(res["filas"], columns=res["columnas"])
+
+
+# Medidas igual que las locales: en la app se ve la latencia de cada pedido al servidor
+instrumentar(globals(), [n for n in list(globals()) if n.startswith("db_")])
@@ -0,0 +1,133 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from gestion.metricas import metricas
+
+# ==========================================
+# POOL DE CONEXIONES SQLITE
+# ==========================================
+# Antes cada consulta abría (y cerraba) su propia conexión a negocio.db.
+# Ahora mantenemos unas pocas conexiones ya configuradas y las reutilizamos.
+
+RUTA_DB = os.environ.get("NEGOCIO_DB", "negocio.db")
+TAMANO_POOL = 4
+TIMEOUT = 10            # segundos de espera ante un bloqueo (igual que antes)
+SYNCHRONOUS = "NORMAL"  # con WAL es seguro y mucho más rápido que FULL
+CACHE_SENTENCIAS = 256  # sentencias preparadas que guarda cada conexión
+
+
+class CursorMedido(sqlite3.Cursor):
+    # BEGIN IMMEDIATE es donde se espera a que otra terminal suelte el lock de escritura:
+    # ese tiempo queda en la métrica sqlite.espera_lock (ver gestion.metricas)
+    def execute(self, sql, parametros=()):
+        if sql[:5] != "BEGIN": return super().execute(sql, parametros)
+        t0 = time.perf_counter()
+        try: return super().execute(sql, parametros)
+        finally: metricas().registrar("sqlite.espera_lock", (time.perf_counter() - t0) * 1000)
+
+
+class ConexionMedida(sqlite3.Connection):
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    # conn.execute de sqlite3 no pasa por CursorMedido.execute: un BEGIN por acá tampoco se escapa
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+
+class PoolConexiones:
+    def __init__(self, ruta=RUTA_DB, tamano=TAMANO_POOL, timeout=TIMEOUT,
+                 synchronous=SYNCHRONOUS, cache_sentencias=CACHE_SENTENCIAS):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.cache_sentencias = cache_sentencias
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        # Se llama también si el proceso hizo fork: las conexiones del padre no sirven
+        self._pid = os.getpid()
+        self._libres = queue.LifoQueue()
+        self._creadas = 0
+
+    def _nueva(self):
+        conn = sqlite3.connect(self.ruta, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.cache_sentencias, factory=ConexionMedida)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def tomar(self):
+        with self._lock:
+            if self._pid != os.getpid(): self._reiniciar()
+            try:
+                return self._libres.get_nowait()
+            except queue.Empty:
+                pass
+            if self._creadas < self.tamano:
+                self._creadas += 1
+                try:
+                    return self._nueva()
+                except Exception:
+                    self._creadas -= 1
+                    raise
+        # Pool lleno: esperamos a que alguien devuelva una conexión
+        t0 = time.perf_counter()
+        try: return self._libres.get(timeout=self.timeout)
+        finally: metricas().registrar("pool.espera", (time.perf_counter() - t0) * 1000)
+
+    def devolver(self, conn):
+        if self._pid != os.getpid():
+            return
+        # Nunca devolvemos una conexión con una transacción a medias
+        if conn.in_transaction: conn.rollback()
+        self._libres.put(conn)
+
+    def descartar(self, conn):
+        try: conn.close()
+        except Exception: pass
+        with self._lock:
+            if self._pid == os.getpid(): self._creadas -= 1
+
+    @contextmanager
+    def conexion(self):
+        conn = self.tomar()
+        try:
+            yield conn
+        finally:
+            try:
+                self.devolver(conn)
+            except sqlite3.Error:
+                # Una conexión que ni siquiera puede hacer rollback no vuelve al pool
+                self.descartar(conn)
+
+    def cerrar(self):
+        with self._lock:
+            while True:
+                try: self._libres.get_nowait().close()
+                except queue.Empty: break
+            self._reiniciar()
+
+
+# --- POOL GLOBAL DE LA APLICACIÓN ---
+_pool = PoolConexiones()
+
+def configurar(ruta=None, **opciones):
+    # Permite cambiar la ruta de la DB (u otros parámetros) antes de usarla
+    global _pool
+    _pool.cerrar()
+    _pool = PoolConexiones(ruta or _pool.ruta, **opciones)
+    return _pool
+
+def obtener_pool():
+    return _pool
+
+def conexion():
+    return _pool.conexion()
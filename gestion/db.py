@@ -0,0 +1,230 @@
+import threading
+from datetime import datetime
+
+from gestion.conexion import conexion
+from gestion.ventas import procesar_venta_lote, describir_fallos
+from gestion.tickets import nuevo_ticket
+from gestion.migraciones import migrar
+from gestion.resumen import totales_dashboard
+from gestion.movimientos import snapshot_si_corresponde
+from gestion.catalogo import catalogo
+from gestion.buscador import buscar
+from gestion.registro import sql_estimacion, elegir_indice, sql_pagina
+from gestion.metricas import metricas, medir, instrumentar
+from gestion import trabajador
+
+# ==========================================
+# BACKEND (DB + LÓGICA FINANCIERA) - VERSIÓN ANTI-LOCK
+# ==========================================
+# Precios y totales en centavos enteros (ver gestion.dinero).
+# Sin dependencias de interfaz: lo usan app.py, la línea de comandos (python -m gestion)
+# y cualquier script (importaciones nocturnas, conciliaciones, reportes).
+# Todas las conexiones salen del pool de gestion.conexion (WAL, timeout=10, caché de sentencias)
+def iniciar_db():
+    # Crea o actualiza el esquema (ver gestion.migraciones)
+    with conexion() as conn:
+        migrar(conn)
+
+def _etiqueta(query):
+    # "SELECT a, b FROM productos WHERE id IN (?)" -> "productos WHERE id IN (?)": tabla y filtro
+    texto = " ".join(query.split())
+    i = texto.upper().find(" FROM ")
+    return (texto[i + 6:] if i >= 0 else texto)[:60]
+
+def db_consultar(query, params=(), nombre=None):
+    # Cada consulta tiene su propio histograma: db.consulta.<nombre> o, sin nombre, por su texto
+    with medir("db.consulta." + (nombre or _etiqueta(query)), query[:200]) as m:
+        try:
+            # Usamos 'with' para que la conexión vuelva AUTOMÁTICAMENTE al pool al terminar
+            with conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                datos = cursor.fetchall()
+                m.filas = len(datos)
+                return datos
+        except Exception as e:
+            metricas().registrar_error(m.nombre, e)
+            return []
+
+def db_ejecutar(query, params=()):
+    try:
+        with conexion() as conn:
+            cursor = conn.cursor()
+            # Explícito, como en las demás escrituras: la espera por el lock queda medida
+            # (sqlite.espera_lock) y no se sube de lectura a escritura a mitad de camino
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(query, params)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return "OK", cursor.lastrowid
+    except Exception as e:
+        metricas().registrar_error("db.db_ejecutar", e)
+        return str(e), 0
+
+# --- FUNCIONES ESPECÍFICAS (Wrappers) ---
+
+def db_listar_productos(filtro=""):
+    q = "SELECT id, tipo, nombre, genero, cantidad, precio FROM productos"
+    if filtro: return db_consultar(q + " WHERE nombre LIKE ? OR tipo LIKE ? ORDER BY nombre", (f"%{filtro}%", f"%{filtro}%"), "listar_productos_filtro")
+    return db_consultar(q + " ORDER BY nombre", nombre="listar_productos")
+
+def db_buscar_productos(texto):
+    # Búsqueda por relevancia sobre el índice FTS5 (ver gestion.buscador)
+    try:
+        return buscar(texto)
+    except Exception as e:
+        metricas().registrar_error("db.db_buscar_productos", e)
+        return []
+
+def _registrar_ajuste(cursor, ticket_id, pid, nombre, delta, precio, fecha):
+    # Cambio de stock a mano (edición o alta con stock): queda en el Registro como AJUSTE,
+    # sin importe porque no entra ni sale plata. El libro de stock lo anota su trigger.
+    cursor.execute("""INSERT INTO historial (ticket_id, producto_id, producto_nombre, tipo_movimiento, cantidad, precio_unitario, total_renglon, fecha)
+                      VALUES (?, ?, ?, 'AJUSTE', ?, ?, 0, ?)""", (ticket_id, pid, nombre, delta, precio, fecha))
+
+_foto_en_cola = threading.Event()
+
+def _compactar():
+    # La foto del libro de stock es una optimización y copia todo el stock: se toma en el hilo
+    # de escrituras cuando ya se devolvió el resultado, no mientras la caja espera la venta.
+    # Si falla (o el hilo ya se detuvo) se toma en la próxima escritura.
+    if _foto_en_cola.is_set(): return
+    _foto_en_cola.set()
+    try: trabajador.escribir(_tomar_foto)
+    except RuntimeError: _foto_en_cola.clear()
+
+def _tomar_foto():
+    _foto_en_cola.clear()
+    try:
+        with medir("db.foto_stock"), conexion() as conn: snapshot_si_corresponde(conn)
+    except Exception:
+        pass  # ya quedó en los errores de db.foto_stock
+
+def db_actualizar_producto(pid, t, n, g, c, p):
+    try:
+        ticket_id = nuevo_ticket("A")  # antes de la transacción: puede escribir en 'secuencias'
+        with conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                previa = catalogo().version_previa()
+                fila = cursor.execute("SELECT cantidad FROM productos WHERE id=?", (pid,)).fetchone()
+                cursor.execute("UPDATE productos SET tipo=?, nombre=?, genero=?, cantidad=?, precio=? WHERE id=?", (t, n, g, c, p, pid))
+                if fila and c != (fila[0] or 0):
+                    _registrar_ajuste(cursor, ticket_id, pid, n, c - (fila[0] or 0), p, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            _compactar()
+    except Exception as e:
+        return str(e)
+    catalogo().recargar_ids([pid], previa)
+    return "OK"
+
+def db_obtener_precio(pid):
+    # Sale del catálogo en memoria (ver gestion.catalogo), sin ir a la DB
+    prod = catalogo().por_id(pid)
+    return prod[5] if prod else 0
+
+def db_crear_producto(tipo, nombre, genero, cantidad, precio):
+    # A diferencia de db_ejecutar, deja pasar la excepción (la UI distingue IntegrityError)
+    ticket_id = nuevo_ticket("A") if cantidad else None
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            previa = catalogo().version_previa()
+            cursor.execute("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)",
+                           (tipo, nombre, genero, cantidad, precio))
+            pid = cursor.lastrowid
+            if cantidad: _registrar_ajuste(cursor, ticket_id, pid, nombre, cantidad, precio, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _compactar()
+    catalogo().recargar_ids([pid], previa)
+    return pid
+
+def db_historial_pagina(clave=None, direccion=None, limite=200, desde="", hasta="", ticket=""):
+    # Paginación por clave (keyset) sobre historial, del más nuevo al más viejo.
+    # direccion: None = primera página, "abajo" = más viejos que 'clave', "arriba" = más nuevos
+    # Con filtro, primero se estima por índices qué camino conviene (ver gestion.registro)
+    indice = None
+    if desde or hasta or ticket:
+        estimacion = db_consultar(*sql_estimacion(desde, hasta, ticket), "historial_estimacion")
+        if estimacion: indice = elegir_indice(estimacion[0], desde, hasta, ticket, clave, limite)
+    filas = db_consultar(*sql_pagina(clave, direccion, limite, desde, hasta, ticket, indice), "historial_pagina")
+    if direccion == "arriba": filas.reverse()
+    return [(f[0], f[1:]) for f in filas]
+
+def db_totales_dashboard():
+    # Lee el resumen materializado (mantenido por triggers): no recorre el historial
+    with conexion() as conn:
+        return totales_dashboard(conn)
+
+def _precios_invalidos(carrito):
+    # Los importes son centavos enteros (gestion.dinero): un float es alguien mandando pesos
+    malos = [str(it.get('nombre') or it.get('id')) for it in carrito if type(it.get('precio')) is not int]
+    return f"Error: precio en centavos enteros esperado para {', '.join(malos)}" if malos else None
+
+def db_procesar_venta(carrito):
+    # Toda la venta en una transacción y 3 sentencias (ver gestion.ventas)
+    error = _precios_invalidos(carrito)
+    if error: return error
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    previa = []
+    try:
+        ticket_id = nuevo_ticket("T")
+        with conexion() as conn:
+            fallos = procesar_venta_lote(conn, carrito, ticket_id, fecha, lambda: previa.append(catalogo().version_previa()))
+            if not fallos: _compactar()
+    except Exception as e:
+        return str(e)
+    if fallos: return describir_fallos(fallos)
+    catalogo().recargar_ids([item['id'] for item in carrito], previa[0])
+    return "OK"
+
+def db_procesar_compra(carrito):
+    error = _precios_invalidos(carrito)
+    if error: return error
+    try: ticket_id = nuevo_ticket("C")
+    except Exception as e: return str(e)
+    with conexion() as conn:
+        cursor = conn.cursor()
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        tocados = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            previa = catalogo().version_previa()
+            for item in carrito:
+                pid, nom = 0, item.get('nombre')
+                if item['nuevo']:
+                    cursor.execute("INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)", 
+                                  (item['tipo'], item['nombre'], item['genero'], item['cantidad'], item['precio']))
+                    pid = cursor.lastrowid
+                else:
+                    pid = item['id']
+                    cursor.execute("UPDATE productos SET cantidad=cantidad+?, precio=? WHERE id=?", (item['cantidad'], item['precio'], pid))
+                    if 'nombre_real' in item: nom = item['nombre_real']
+                tocados.append(pid)
+                
+                total_linea = item['cantidad'] * item['precio']
+                cursor.execute("INSERT INTO historial VALUES (NULL,?,?,?,?,?,?,?,?)", 
+                               (ticket_id, pid, nom, "COMPRA", item['cantidad'], item['precio'], total_linea, fecha))
+            conn.commit()
+        except Exception as e: 
+            conn.rollback()
+            return str(e)
+        _compactar()
+    catalogo().recargar_ids(tocados, previa)
+    return "OK"
+
+# Cada función db_* queda medida: latencia, filas devueltas y errores (ver gestion.metricas).
+# db_consultar se mide por consulta (arriba), no toda junta
+instrumentar(globals(), [n for n in list(globals()) if n.startswith("db_") and n != "db_consultar"])
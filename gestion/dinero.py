@@ -0,0 +1,70 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+# ==========================================
+# IMPORTES EN CENTAVOS
+# ==========================================
+# Todo importe (precio, precio_unitario, total_renglon, totales del resumen) se guarda y se
+# calcula como int de centavos: cantidad * precio y las sumas de SQLite son exactas y no
+# derivan con el tamaño del historial. Decimal se usa solo al convertir lo que escribe
+# el usuario (entradas, CSV del proveedor, línea de comandos); el camino de la venta
+# multiplica y suma enteros. Pesos con decimales solo al mostrar o exportar.
+
+
+_MILES = re.compile(r"^\d{1,3}([.,]\d{3})+$")
+_AMBIGUO = re.compile(r"^-?[1-9]\d{0,2}[.,]\d{3}$")  # "1.500", "12,000": un solo separador y 3 dígitos
+
+
+def a_centavos(valor):
+    # Pesos -> centavos. Acepta 12.5, "12,50", "$1,234.50", "1.234,50", "1.234.567".
+    # ValueError si no es un importe, si es negativo, si tiene más de 2 decimales (no se
+    # redondea en silencio) o si es ambiguo: "1.500" ¿son mil quinientos o uno cincuenta?
+    original = valor
+    if isinstance(valor, bool): raise ValueError(f"Importe inválido: {original!r}")
+    if isinstance(valor, int):
+        if valor < 0: raise ValueError(f"Importe negativo: {original!r}")
+        return valor * 100
+    if isinstance(valor, float):
+        # Un float (celda de Excel) trae ruido binario: 0.1 + 0.2 es 0.30000000000000004
+        centavos = round(valor, 2)
+        if abs(valor - centavos) > 1e-9 * max(1, abs(valor)): raise ValueError(f"Importe con más de 2 decimales: {original!r}")
+        valor = f"{centavos:.2f}"
+    texto = str(valor).replace("$", "").replace(" ", "")
+    if "," in texto and "." in texto:
+        # El último separador es el decimal: "1,234.50" o "1.234,50"
+        miles = "," if texto.rfind(",") < texto.rfind(".") else "."
+        texto = texto.replace(miles, "")
+    elif texto.count(",") > 1 or texto.count(".") > 1:
+        # "1.234.567": solo miles, y tienen que estar bien agrupados
+        if not _MILES.match(texto.lstrip("-")): raise ValueError(f"Importe inválido: {original!r}")
+        texto = texto.replace(",", "").replace(".", "")
+    elif _AMBIGUO.match(texto):
+        raise ValueError(f"Importe ambiguo: {original!r} (escribir 1500 o 1500,00; 1,50 para uno cincuenta)")
+    texto = texto.replace(",", ".")
+    try:
+        importe = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"Importe inválido: {original!r}")
+    if not importe.is_finite(): raise ValueError(f"Importe inválido: {original!r}")
+    if importe < 0: raise ValueError(f"Importe negativo: {original!r}")
+    if importe.as_tuple().exponent < -2: raise ValueError(f"Importe con más de 2 decimales: {original!r}")
+    return int(importe * 100)
+
+
+def a_texto(centavos):
+    # 123450 -> "1234.50" (para precargar entradas y exportar)
+    signo = "-" if centavos < 0 else ""
+    centavos = abs(int(centavos))
+    return f"{signo}{centavos // 100}.{centavos % 100:02d}"
+
+
+def formatear(centavos):
+    # 123450 -> "$1,234.50"
+    signo = "-" if centavos < 0 else ""
+    centavos = abs(int(centavos))
+    return f"{signo}${centavos // 100:,}.{centavos % 100:02d}"
+
+
+def a_pesos(centavos):
+    # Solo para reportes/exportación: el float ya no vuelve a la DB
+    return centavos / 100
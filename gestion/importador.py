@@ -0,0 +1,199 @@
+import csv
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+from gestion.buscador import normalizar
+from gestion.catalogo import catalogo
+from gestion.conexion import conexion
+from gestion.dinero import a_centavos
+from gestion.migraciones import migrar
+from gestion.movimientos import snapshot_si_corresponde
+from gestion.tickets import nuevo_ticket
+
+# ==========================================
+# IMPORTACIÓN MASIVA (CSV / XLSX)
+# ==========================================
+# Lee el archivo fila por fila (nunca entero en memoria) y lo aplica en lotes de LOTE filas:
+#   1. Upsert de productos por UNIQUE(nombre, tipo, genero) con executemany:
+#      si existe suma la cantidad y actualiza el precio (igual que una compra), si no lo crea
+#   2. Un renglón COMPRA en historial por fila, todos bajo UN ticket por archivo
+# Cada lote es su propia transacción: la DB no queda bloqueada para las otras terminales
+# durante todo el archivo. Las filas inválidas no frenan la importación: se informan con
+# su número de línea. El precio se guarda en centavos (gestion.dinero).
+# XLSX necesita openpyxl (opcional, se importa solo si hace falta).
+
+LOTE = 1000
+MAX_ERRORES = 1000  # errores que se guardan con detalle (se cuentan todos)
+COLUMNAS = ("tipo", "nombre", "genero", "cantidad", "precio")
+
+_UPSERT = """INSERT INTO productos (tipo, nombre, genero, cantidad, precio) VALUES (?,?,?,?,?)
+    ON CONFLICT(nombre, tipo, genero) DO UPDATE SET cantidad = cantidad + excluded.cantidad, precio = excluded.precio"""
+_HISTORIAL = """INSERT INTO historial (ticket_id, producto_id, producto_nombre, tipo_movimiento, cantidad, precio_unitario, total_renglon, fecha)
+    SELECT ?, id, nombre, 'COMPRA', ?, ?, ?, ? FROM productos WHERE nombre=? AND tipo=? AND genero=?"""
+
+
+# --- LECTURA ---
+def _clave_columna(nombre):
+    return normalizar(str(nombre or "")).strip().lower()
+
+
+def _leer_csv(ruta):
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        muestra = f.read(4096); f.seek(0)
+        # Excel en español guarda con ';'
+        try: dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error: dialecto = csv.excel
+        lector = csv.reader(f, dialecto)
+        yield from lector
+
+
+def _leer_xlsx(ruta):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Para importar .xlsx hace falta openpyxl (pip install openpyxl)")
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for fila in libro.active.iter_rows(values_only=True):
+            yield ["" if v is None else v for v in fila]
+    finally:
+        libro.close()
+
+
+def leer_filas(ruta):
+    # Valida el encabezado ya (ValueError) y devuelve un iterador de (número de línea, {columna: valor})
+    filas = _leer_xlsx(ruta) if ruta.lower().endswith((".xlsx", ".xlsm")) else _leer_csv(ruta)
+    encabezado = [_clave_columna(c) for c in next(filas, [])]
+    faltan = [c for c in COLUMNAS if c not in encabezado]
+    if faltan:
+        filas.close()
+        raise ValueError(f"Faltan columnas en el encabezado: {', '.join(faltan)}")
+    return _con_lineas(filas, {c: encabezado.index(c) for c in COLUMNAS})
+
+
+def _con_lineas(filas, pos):
+    for linea, fila in enumerate(filas, start=2):
+        if not any(str(v).strip() for v in fila): continue  # fila vacía
+        yield linea, {c: (fila[i] if i < len(fila) else "") for c, i in pos.items()}
+
+
+# --- VALIDACIÓN ---
+_MILES = re.compile(r"^[1-9]\d{0,2}([.,])\d{3}(\1\d{3})*$")  # "1.000", "12,500", "1.000.000"
+
+
+def _cantidad(valor):
+    # Unidades enteras. "1.000" y "1,000" son mil (grupos de 3 con un mismo separador);
+    # cualquier otra cosa con punto o coma ("1.5", "10,0", "1.00") es ambigua: ValueError
+    if isinstance(valor, bool): raise ValueError(valor)
+    if isinstance(valor, int): return valor
+    if isinstance(valor, float):
+        if not valor.is_integer(): raise ValueError(valor)
+        return int(valor)
+    texto = str(valor).strip()
+    if _MILES.match(texto): texto = texto.replace(".", "").replace(",", "")
+    if not (texto.isascii() and texto.isdigit()): raise ValueError(valor)
+    return int(texto)
+
+
+def validar_fila(fila):
+    # Devuelve (tipo, nombre, genero, cantidad, precio) o lanza ValueError con el motivo
+    # Mismo formato que el alta manual, así la clave única coincide con lo ya cargado
+    nombre = str(fila["nombre"]).strip().upper()
+    tipo, genero = (str(fila[c]).strip().capitalize() for c in ("tipo", "genero"))
+    for campo, valor in (("Nombre", nombre), ("Tipo", tipo), ("Género", genero)):
+        if not valor: raise ValueError(f"{campo} vacío")
+    try:
+        cantidad = _cantidad(fila["cantidad"])
+        valida = cantidad >= 0
+    except (ValueError, OverflowError): valida = False
+    if not valida: raise ValueError(f"Cantidad inválida: {fila['cantidad']!r}")
+    # a_centavos rechaza negativos, más de 2 decimales y miles ambiguos ("1.500")
+    try: precio = a_centavos(fila["precio"])
+    except ValueError as e: raise ValueError(f"Precio inválido: {e}")
+    return tipo, nombre, genero, cantidad, precio
+
+
+# --- ESCRITURA ---
+def _historial(ticket_id, fecha, productos):
+    # Una fila con cantidad 0 solo da de alta el producto: no es un movimiento
+    return [(ticket_id, can, pre, can * pre, fecha, nom, tip, gen) for tip, nom, gen, can, pre in productos if can > 0]
+
+
+def _aplicar_lote(conn, lote, ticket_id, fecha, res):
+    productos = [p for _, p in lote]
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany(_UPSERT, productos)
+        cursor.executemany(_HISTORIAL, _historial(ticket_id, fecha, productos))
+        conn.commit()
+        res['importadas'] += len(lote)
+        return
+    except sqlite3.Error:
+        conn.rollback()
+        if len(lote) == 1: raise
+    # Algo del lote falló en la DB: se reintenta fila por fila para saber cuál
+    for linea, producto in lote:
+        try: _aplicar_lote(conn, [(linea, producto)], ticket_id, fecha, res)
+        except sqlite3.Error as e: _error(res, linea, str(e))
+
+
+def _error(res, linea, motivo):
+    res['cant_errores'] += 1
+    if len(res['errores']) < MAX_ERRORES: res['errores'].append((linea, motivo))
+
+
+def _aplicar(lote, ticket_id, fecha, res):
+    # Un lote como trabajo suelto (ej. en el hilo de escrituras), con su propia conexión
+    with conexion() as conn: _aplicar_lote(conn, lote, ticket_id, fecha, res)
+
+
+def _foto():
+    with conexion() as conn: snapshot_si_corresponde(conn)
+
+
+def importar(ruta, lote=None, progreso=None, escritor=None):
+    # progreso(leidas, importadas, errores) se llama después de cada lote (desde este mismo hilo)
+    # escritor: ej. trabajador.escribir. Este hilo lee y valida el archivo y cada lote se aplica
+    # como un trabajo aparte en ese hilo: una venta espera a lo sumo un lote, no el archivo entero.
+    # Sin escritor todo corre acá (consola).
+    # Devuelve {'ticket', 'leidas', 'importadas', 'cant_errores', 'errores': [(línea, motivo)]}
+    lote = lote or LOTE
+    escribir = (lambda fn, *args: escritor(fn, *args).result()) if escritor else (lambda fn, *args: fn(*args))
+    filas = leer_filas(ruta)
+    ticket_id = nuevo_ticket("C")
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    res = {'ticket': ticket_id, 'leidas': 0, 'importadas': 0, 'cant_errores': 0, 'errores': []}
+    pendientes = []
+    for linea, fila in filas:
+        res['leidas'] += 1
+        try: pendientes.append((linea, validar_fila(fila)))
+        except ValueError as e: _error(res, linea, str(e))
+        if len(pendientes) >= lote:
+            escribir(_aplicar, pendientes, ticket_id, fecha, res); pendientes = []
+            if progreso: progreso(res['leidas'], res['importadas'], res['cant_errores'])
+    if pendientes: escribir(_aplicar, pendientes, ticket_id, fecha, res)
+    if res['importadas']: escribir(_foto)
+    if progreso: progreso(res['leidas'], res['importadas'], res['cant_errores'])
+    # Son muchas filas: más barato recargar el catálogo entero que id por id
+    if res['importadas'] and catalogo().cargado: catalogo().cargar()
+    return res
+
+
+if __name__ == "__main__":
+    # python -m gestion.importador archivo.csv|archivo.xlsx [--lote N]
+    if len(sys.argv) < 2 or not os.path.exists(sys.argv[1]):
+        print("Uso: python -m gestion.importador archivo.csv|archivo.xlsx [--lote N]"); sys.exit(2)
+    tam = int(sys.argv[sys.argv.index("--lote") + 1]) if "--lote" in sys.argv else LOTE
+    with conexion() as conn: migrar(conn)
+    try:
+        res = importar(sys.argv[1], tam, lambda l, i, e: print(f"\r{l} leídas, {i} importadas, {e} errores", end="", flush=True))
+    except ValueError as e:
+        print(f"Error: {e}"); sys.exit(2)
+    print(f"\nTicket {res['ticket']}")
+    for linea, motivo in res['errores']: print(f"  línea {linea}: {motivo}")
+    if res['cant_errores'] > len(res['errores']): print(f"  ... y {res['cant_errores'] - len(res['errores'])} errores más")
+    sys.exit(1 if res['cant_errores'] else 0)
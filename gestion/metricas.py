@@ -0,0 +1,175 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+# ==========================================
+# MÉTRICAS DE RENDIMIENTO
+# ==========================================
+# Registro en memoria, seguro entre hilos, de cuánto tarda cada operación:
+#   - db.*     cada función db_* (gestion.db o gestion.cliente), con filas devueltas y errores
+#   - db.consulta.*        cada consulta de db_consultar por separado (por nombre o por su texto)
+#   - sqlite.espera_lock   lo que tarda un BEGIN IMMEDIATE en conseguir el lock (gestion.conexion)
+#   - pool.espera          espera por una conexión libre del pool
+#   - ui.*     handlers de la interfaz y ui.congelamiento (latido del loop de Tk atrasado)
+#   - tarea.*  desde que la interfaz manda algo a un hilo de DB hasta que recibe el resultado
+# Cada nombre guarda un histograma de latencias con cubetas fijas (no crece con las llamadas).
+# Lo que supera UMBRAL_LENTO_MS va al registro de operaciones lentas (y a ARCHIVO_LENTAS si
+# está configurado). Se ve en el panel Diagnóstico de la app y se exporta a JSON.
+
+UMBRAL_LENTO_MS = float(os.environ.get("NEGOCIO_LENTO_MS", "250"))
+ARCHIVO_LENTAS = os.environ.get("NEGOCIO_LOG_LENTAS", "")
+MAX_LENTAS = 200   # entradas del registro de lentas en memoria
+MAX_ERRORES = 100
+CUBETAS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histograma:
+    def __init__(self):
+        self.cubetas = [0] * (len(CUBETAS_MS) + 1)  # la última: más de 10 s
+        self.cantidad = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.filas = 0
+        self.errores = 0
+
+    def agregar(self, ms, filas=None):
+        self.cubetas[bisect.bisect_left(CUBETAS_MS, ms)] += 1
+        self.cantidad += 1
+        self.total_ms += ms
+        if ms > self.max_ms: self.max_ms = ms
+        if filas: self.filas += filas
+
+    def percentil(self, p):
+        # Límite superior de la cubeta donde cae el percentil p (el máximo real si es la última)
+        if not self.cantidad: return 0.0
+        objetivo, acumulado = self.cantidad * p / 100, 0
+        for i, n in enumerate(self.cubetas):
+            acumulado += n
+            if acumulado >= objetivo: return min(CUBETAS_MS[i], self.max_ms) if i < len(CUBETAS_MS) else self.max_ms
+        return self.max_ms
+
+    def resumen(self):
+        return {"cantidad": self.cantidad, "errores": self.errores, "filas": self.filas,
+                "promedio_ms": round(self.total_ms / self.cantidad, 3) if self.cantidad else 0.0,
+                "p50_ms": round(self.percentil(50), 3), "p95_ms": round(self.percentil(95), 3),
+                "p99_ms": round(self.percentil(99), 3),
+                "max_ms": round(self.max_ms, 3), "cubetas_ms": dict(zip([str(c) for c in CUBETAS_MS] + ["mas"], self.cubetas))}
+
+
+class Metricas:
+    def __init__(self, umbral_lento_ms=UMBRAL_LENTO_MS, archivo_lentas=ARCHIVO_LENTAS):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.archivo_lentas = archivo_lentas
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas = {}
+            self.lentas = deque(maxlen=MAX_LENTAS)
+            self.errores = deque(maxlen=MAX_ERRORES)
+            self.desde = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def registrar(self, nombre, ms, filas=None, detalle=""):
+        with self._lock:
+            h = self._histogramas.get(nombre)
+            if h is None: h = self._histogramas[nombre] = Histograma()
+            h.agregar(ms, filas)
+            lenta = ms >= self.umbral_lento_ms
+            if lenta:
+                entrada = (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), nombre, round(ms, 1), filas, detalle)
+                self.lentas.append(entrada)
+        if lenta and self.archivo_lentas: self._escribir_lenta(entrada)
+
+    def registrar_error(self, nombre, error):
+        with self._lock:
+            h = self._histogramas.get(nombre)
+            if h is None: h = self._histogramas[nombre] = Histograma()
+            h.errores += 1
+            self.errores.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), nombre, str(error)))
+
+    def _escribir_lenta(self, entrada):
+        try:
+            with open(self.archivo_lentas, "a", encoding="utf-8") as f:
+                f.write("\t".join("" if v is None else str(v) for v in entrada) + "\n")
+        except OSError as e:
+            self.registrar_error("metricas.log_lentas", e)
+
+    def instantanea(self):
+        with self._lock:
+            return {"desde": self.desde, "hasta": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "umbral_lento_ms": self.umbral_lento_ms,
+                    "operaciones": {n: h.resumen() for n, h in sorted(self._histogramas.items())},
+                    "lentas": [dict(zip(("fecha", "nombre", "ms", "filas", "detalle"), e)) for e in self.lentas],
+                    "errores": [dict(zip(("fecha", "nombre", "error"), e)) for e in self.errores]}
+
+    def exportar(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.instantanea(), f, ensure_ascii=False, indent=2)
+        return ruta
+
+
+_metricas = Metricas()
+
+def metricas():
+    return _metricas
+
+
+class Medicion:
+    def __init__(self, nombre, detalle=""):
+        self.nombre, self.detalle, self.filas = nombre, detalle, None
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        _metricas.registrar(self.nombre, (time.perf_counter() - self._t0) * 1000, self.filas, self.detalle)
+        if valor is not None: _metricas.registrar_error(self.nombre, valor)
+
+    def __call__(self, fn):
+        nombre = self.nombre
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                res = fn(*args, **kwargs)
+            except Exception as e:
+                _metricas.registrar(nombre, (time.perf_counter() - t0) * 1000)
+                _metricas.registrar_error(nombre, e)
+                raise
+            # Las funciones db_* devuelven un texto de error en vez de lanzar
+            if isinstance(res, str) and res != "OK": _metricas.registrar_error(nombre, res)
+            # En el registro de lentas va el primer argumento si es texto (ej. lo buscado)
+            detalle = args[0][:200] if args and isinstance(args[0], str) else ""
+            _metricas.registrar(nombre, (time.perf_counter() - t0) * 1000, len(res) if isinstance(res, list) else None, detalle)
+            return res
+        return envoltura
+
+
+def medir(nombre, detalle=""):
+    # with medir("ui.llenar_tree"): ...  o como decorador: @medir("ui.fin_venta")
+    return Medicion(nombre, detalle)
+
+
+def instrumentar(espacio, nombres):
+    # Reemplaza en el diccionario 'espacio' (globals() de un módulo) cada función por su versión medida
+    for n in nombres: espacio[n] = medir(f"db.{n}")(espacio[n])
+
+
+if __name__ == "__main__":
+    # python -m gestion.metricas metricas.json  -> resumen legible de un archivo exportado
+    import sys
+    with open(sys.argv[1], encoding="utf-8") as f: datos = json.load(f)
+    print(f"{datos['desde']} a {datos['hasta']} (lentas >= {datos['umbral_lento_ms']} ms)")
+    print(f"{'operación':40s} {'n':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'máx':>9s} {'filas':>9s} {'err':>5s}")
+    for nombre, r in datos["operaciones"].items():
+        print(f"{nombre[:40]:40s} {r['cantidad']:7d} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} "
+              f"{r['max_ms']:9.1f} {r['filas']:9d} {r['errores']:5d}")
+    for e in datos["lentas"][-20:]: print(f"LENTA {e['fecha']} {e['nombre']} {e['ms']} ms {e['detalle'] or ''}")
+    for e in datos["errores"][-20:]: print(f"ERROR {e['fecha']} {e['nombre']}: {e['error']}")
@@ -0,0 +1,236 @@
+import re
+import sys
+
+from gestion.conexion import conexion
+from gestion.tickets import crear_tabla_secuencias
+from gestion.resumen import crear_tablas_resumen, reconstruir_resumen
+from gestion.buscador import crear_indice_busqueda
+from gestion.movimientos import crear_tablas_movimientos, cargar_movimientos_iniciales
+from gestion.registro import sql_estimacion, sql_pagina
+
+# ==========================================
+# MIGRACIONES DE ESQUEMA
+# ==========================================
+# La versión del esquema se guarda en PRAGMA user_version. Cada migración corre
+# en su propia transacción y sube la versión en 1; las DBs viejas (versión 0, creadas
+# por el iniciar_db original) pasan por la 1 sin perder datos porque usa IF NOT EXISTS.
+
+
+def _v1_esquema_inicial(cursor):
+    # Esquema original de iniciar_db
+    cursor.execute('''CREATE TABLE IF NOT EXISTS productos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT,
+            nombre TEXT,
+            genero TEXT,
+            cantidad INTEGER,
+            precio REAL,
+            UNIQUE(nombre, tipo, genero))''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS historial (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT,
+            producto_id INTEGER,
+            producto_nombre TEXT,
+            tipo_movimiento TEXT,
+            cantidad INTEGER,
+            precio_unitario REAL,
+            total_renglon REAL,
+            fecha TEXT)''')
+    crear_tabla_secuencias(cursor)
+
+
+def _v2_indices_historial(cursor):
+    # fecha ya se guarda como 'YYYY-MM-DD HH:MM:SS' (ordenable como texto);
+    # normalizamos cualquier fila cargada a mano con otro formato para que los rangos funcionen
+    cursor.execute("""UPDATE historial SET fecha = datetime(fecha)
+                      WHERE datetime(fecha) IS NOT NULL AND fecha <> datetime(fecha)""")
+    _indices_historial(cursor)
+
+
+def _indices_historial(cursor):
+    # Dashboard y totales por día/mes: sum(total_renglon) WHERE tipo_movimiento=? [AND fecha BETWEEN ...]
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_mov_fecha ON historial(tipo_movimiento, fecha, total_renglon)")
+    # Detalle de un ticket
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_ticket ON historial(ticket_id)")
+    # Movimientos de un producto (último costo de compra, rotación)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_producto ON historial(producto_id, tipo_movimiento, fecha)")
+    # Registro filtrado por rango de fechas
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial(fecha)")
+
+
+def _v3_resumen_dashboard(cursor):
+    # Tablas de resumen mantenidas por triggers (ver gestion.resumen), cargadas con lo ya existente
+    crear_tablas_resumen(cursor)
+    reconstruir_resumen(cursor)
+
+
+def _v4_busqueda_fts(cursor):
+    # Índice FTS5 trigram para el buscador de Inventario (ver gestion.buscador)
+    crear_indice_busqueda(cursor)
+
+
+def _v5_centavos(cursor):
+    # Importes en centavos enteros (ver gestion.dinero). Una columna REAL convierte a float
+    # todo lo que se guarda en ella, así que productos e historial se reconstruyen con las
+    # columnas de importe INTEGER. total_renglon se convierte tal como quedó registrado.
+    secuencias = dict(cursor.execute("SELECT name, seq FROM sqlite_sequence WHERE name IN ('productos', 'historial')"))
+    cursor.execute('''CREATE TABLE productos_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT,
+            nombre TEXT,
+            genero TEXT,
+            cantidad INTEGER,
+            precio INTEGER,
+            UNIQUE(nombre, tipo, genero))''')
+    cursor.execute("""INSERT INTO productos_nueva (id, tipo, nombre, genero, cantidad, precio)
+                      SELECT id, tipo, nombre, genero, cantidad, CAST(round(precio * 100) AS INTEGER) FROM productos""")
+    cursor.execute('''CREATE TABLE historial_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id TEXT,
+            producto_id INTEGER,
+            producto_nombre TEXT,
+            tipo_movimiento TEXT,
+            cantidad INTEGER,
+            precio_unitario INTEGER,
+            total_renglon INTEGER,
+            fecha TEXT)''')
+    cursor.execute("""INSERT INTO historial_nueva
+                      SELECT id, ticket_id, producto_id, producto_nombre, tipo_movimiento, cantidad,
+                             CAST(round(precio_unitario * 100) AS INTEGER), CAST(round(total_renglon * 100) AS INTEGER), fecha
+                      FROM historial""")
+    # Al borrar las tablas viejas se van sus triggers e índices: se vuelven a crear abajo
+    for tabla in ("productos", "historial"):
+        cursor.execute(f"DROP TABLE {tabla}")
+        cursor.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+    for tabla, seq in secuencias.items():
+        cursor.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?", (seq, tabla))
+    _indices_historial(cursor)
+    for tabla in ("resumen_general", "resumen_diario", "resumen_mensual"):
+        cursor.execute(f"DROP TABLE IF EXISTS {tabla}")
+    crear_tablas_resumen(cursor)
+    reconstruir_resumen(cursor)
+    crear_indice_busqueda(cursor)
+
+
+def _v6_libro_stock(cursor):
+    # Libro de movimientos de stock y fotos periódicas (ver gestion.movimientos)
+    crear_tablas_movimientos(cursor)
+    cargar_movimientos_iniciales(cursor)
+
+
+MIGRACIONES = [
+    _v1_esquema_inicial,
+    _v2_indices_historial,
+    _v3_resumen_dashboard,
+    _v4_busqueda_fts,
+    _v5_centavos,
+    _v6_libro_stock,
+]
+
+
+def version_actual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(conn):
+    # Aplica las migraciones pendientes; devuelve la versión final
+    version = version_actual(conn)
+    for numero, migracion in enumerate(MIGRACIONES, start=1):
+        if numero <= version: continue
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Otra terminal pudo haber migrado mientras esperábamos el lock
+            if version_actual(conn) >= numero:
+                conn.rollback(); continue
+            migracion(cursor)
+            cursor.execute(f"PRAGMA user_version = {numero}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = numero
+    return version_actual(conn)
+
+
+# ==========================================
+# VERIFICACIÓN DE PLANES (EXPLAIN QUERY PLAN)
+# ==========================================
+# Consultas reales de la aplicación que NO deben recorrer la tabla entera (ni un índice
+# entero: "SCAN t USING INDEX i" también lee todo), salvo las de LECTURAS_COMPLETAS, que
+# leen todo a propósito, y las de RECORREN_POR_ID, que van por id y las corta el LIMIT de la
+# página. Ninguna debe ordenar en un B-tree temporal, salvo las de ORDENAN_POCAS.
+CONSULTAS_INDEXADAS = [
+    ("Dashboard: ventas históricas",
+     "SELECT sum(total_renglon) FROM historial WHERE tipo_movimiento='VENTA'", ()),
+    ("Ventas de un rango de fechas",
+     "SELECT sum(total_renglon) FROM historial WHERE tipo_movimiento=? AND fecha >= ? AND fecha < ?",
+     ("VENTA", "2024-01-01", "2024-02-01")),
+    # El Registro tal como lo arma db_historial_pagina, por cada camino (ver gestion.registro)
+    ("Registro: primera página", *sql_pagina()),
+    ("Registro: página siguiente (keyset)", *sql_pagina(1000, "abajo")),
+    ("Registro: página anterior (keyset)", *sql_pagina(1000, "arriba")),
+    ("Registro: estimación del filtro", *sql_estimacion("2024-01-01", "2024-12-31", "T-2024")),
+    ("Registro filtrado recorriendo por id", *sql_pagina(None, None, 200, "2024-01-01", "2024-12-31", "T-2")),
+    ("Registro filtrado recorriendo por id (keyset)", *sql_pagina(1000, "abajo", 200, "2024-01-01", "2024-12-31", "T-2")),
+    ("Registro de un día por su índice", *sql_pagina(1000, "abajo", 200, "2024-01-01", "2024-01-01", "", "fecha")),
+    ("Registro de un ticket por su índice", *sql_pagina(1000, "arriba", 200, "", "", "T-20240101", "ticket")),
+    ("Detalle de ticket",
+     "SELECT * FROM historial WHERE ticket_id=?", ("T-20240101-000001",)),
+    ("Último costo de compra de un producto",
+     "SELECT precio_unitario FROM historial WHERE producto_id=? AND tipo_movimiento='COMPRA' ORDER BY fecha DESC LIMIT 1", (1,)),
+    ("Dashboard: resumen materializado",
+     "SELECT clave, valor FROM resumen_general WHERE clave IN ('productos', 'total_VENTA')", ()),
+    ("Ventas de un mes (resumen)",
+     "SELECT total, unidades, renglones FROM resumen_mensual WHERE mes=? AND tipo_movimiento=?", ("2024-01", "VENTA")),
+    ("Precio de un producto",
+     "SELECT precio FROM productos WHERE id=?", (1,)),
+    ("Movimientos de stock desde la última foto",
+     "SELECT producto_id, delta FROM movimientos_stock WHERE id > ?", (0,)),
+    ("Movimientos de stock entre dos fotos a una fecha",
+     "SELECT producto_id, delta FROM movimientos_stock WHERE id > ? AND id <= ? AND fecha <= ?", (0, 10000, "2024-01-31 23:59:59")),
+    ("Stock de un producto desde la última foto",
+     "SELECT producto_id, delta FROM movimientos_stock WHERE id > ? AND producto_id = ?", (0, 1)),
+    ("Primera foto de stock después de una fecha",
+     "SELECT ultimo_mov FROM snapshots_stock WHERE fecha > ? ORDER BY fecha, id LIMIT 1", ("2024-01-31 23:59:59",)),
+    ("Última foto de stock a una fecha",
+     "SELECT id, ultimo_mov, fecha FROM snapshots_stock WHERE fecha <= ? ORDER BY fecha DESC, id DESC LIMIT 1", ("2024-01-31 23:59:59",)),
+    ("Listado de productos ordenado",
+     "SELECT id, tipo, nombre, genero, cantidad, precio FROM productos ORDER BY nombre", ()),
+]
+
+LECTURAS_COMPLETAS = {"Listado de productos ordenado"}
+RECORREN_POR_ID = {"Registro: primera página", "Registro filtrado recorriendo por id"}
+# Van por el índice del filtro y ordenan lo que traen: el Registro las usa solo si la
+# estimación dice que son pocas filas (gestion.registro.elegir_indice)
+ORDENAN_POCAS = {"Registro de un día por su índice", "Registro de un ticket por su índice"}
+
+# Una tabla virtual (FTS5) con MATCH también figura como SCAN, pero usa su propio índice;
+# "SCAN CONSTANT ROW" es un SELECT sin FROM (ej. varias subconsultas escalares)
+_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)\w+(?! VIRTUAL TABLE)( |$)")
+
+
+def consultas_sin_indice(conn, consultas=None):
+    # Devuelve [(descripcion, plan)] de las consultas que recorren una tabla o índice entero
+    # sin estar en LECTURAS_COMPLETAS / RECORREN_POR_ID, o que ordenan en un B-tree temporal
+    # sin estar en ORDENAN_POCAS
+    malas = []
+    for descripcion, sql, params in consultas or CONSULTAS_INDEXADAS:
+        plan = [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        recorre = descripcion in LECTURAS_COMPLETAS or descripcion in RECORREN_POR_ID
+        ordena = descripcion in ORDENAN_POCAS
+        if any((_SCAN.match(p) and not recorre) or (p.startswith("USE TEMP B-TREE") and not ordena) for p in plan):
+            malas.append((descripcion, plan))
+    return malas
+
+
+if __name__ == "__main__":
+    # python -m gestion.migraciones  -> migra negocio.db y verifica los planes de consulta
+    with conexion() as conn:
+        print(f"Esquema en versión {migrar(conn)}")
+        malas = consultas_sin_indice(conn)
+    for descripcion, plan in malas:
+        print(f"SIN ÍNDICE: {descripcion}: {' / '.join(plan)}")
+    print("Todas las consultas usan índices" if not malas else f"{len(malas)} consultas sin índice")
+    sys.exit(1 if malas else 0)
@@ -0,0 +1,193 @@
+import sys
+
+from gestion.conexion import conexion
+
+# ==========================================
+# LIBRO DE MOVIMIENTOS DE STOCK
+# ==========================================
+# productos.cantidad se pisa en el lugar (ventas, compras, importación, edición manual).
+# Triggers sobre productos anotan cada cambio de cantidad en movimientos_stock
+# (solo se agregan filas, nunca se modifican): alta = +cantidad, cambio = nuevo - viejo,
+# baja = -cantidad. Como en gestion.resumen, cualquier camino que escriba queda anotado.
+# Cada MOVIMIENTOS_POR_SNAPSHOT movimientos (o tantos como productos haya, si son más) se
+# compacta una foto del stock en snapshots_stock: el stock a una fecha y la conciliación
+# parten de la última foto y suman solo los movimientos posteriores, no toda la historia.
+# Una foto copia el stock de todos los productos: escalar el intervalo con el catálogo
+# mantiene su costo en O(1) por movimiento y el detalle de fotos del tamaño del libro.
+# Una foto incluye todos los movimientos con id <= ultimo_mov y su fecha es la mayor de
+# ellos, así que sirve para cualquier momento >= fecha aunque algún reloj ande atrasado.
+
+MOVIMIENTOS_POR_SNAPSHOT = 10_000
+_AHORA = "datetime('now', 'localtime')"
+
+
+def crear_tablas_movimientos(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS movimientos_stock (
+            id INTEGER PRIMARY KEY,
+            producto_id INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            fecha TEXT NOT NULL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_producto ON movimientos_stock(producto_id)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS snapshots_stock (
+            id INTEGER PRIMARY KEY,
+            ultimo_mov INTEGER NOT NULL,
+            fecha TEXT NOT NULL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_fecha ON snapshots_stock(fecha)")
+    # Solo productos con stock distinto de 0 (el resto vale 0)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS snapshots_stock_detalle (
+            snapshot_id INTEGER,
+            producto_id INTEGER,
+            cantidad INTEGER NOT NULL,
+            PRIMARY KEY(snapshot_id, producto_id)) WITHOUT ROWID''')
+
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_movimiento_alta AFTER INSERT ON productos
+        WHEN coalesce(NEW.cantidad, 0) <> 0 BEGIN
+        INSERT INTO movimientos_stock (producto_id, delta, fecha) VALUES (NEW.id, NEW.cantidad, {_AHORA});
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_movimiento_baja AFTER DELETE ON productos
+        WHEN coalesce(OLD.cantidad, 0) <> 0 BEGIN
+        INSERT INTO movimientos_stock (producto_id, delta, fecha) VALUES (OLD.id, -OLD.cantidad, {_AHORA});
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_movimiento_modif AFTER UPDATE OF cantidad ON productos
+        WHEN coalesce(NEW.cantidad, 0) <> coalesce(OLD.cantidad, 0) BEGIN
+        INSERT INTO movimientos_stock (producto_id, delta, fecha)
+            VALUES (NEW.id, coalesce(NEW.cantidad, 0) - coalesce(OLD.cantidad, 0), {_AHORA});
+    END""")
+
+
+def cargar_movimientos_iniciales(cursor, cada=MOVIMIENTOS_POR_SNAPSHOT):
+    # Para una DB con historia: las compras y ventas del historial pasan al libro, y lo que el
+    # historial no explica (altas con stock, ediciones manuales) entra como saldo inicial
+    # justo antes del primer movimiento del producto. Todo en orden de fecha (los ids siguen
+    # a las fechas), con una foto cada tanto como en el uso normal: el stock a una fecha
+    # vieja parte de una foto cercana y no de toda la historia.
+    cursor.execute("""INSERT INTO movimientos_stock (producto_id, delta, fecha)
+        SELECT producto_id, delta, fecha FROM (
+            SELECT p.id AS producto_id, p.cantidad - coalesce(h.neto, 0) AS delta,
+                   coalesce(h.primera, datetime('now', 'localtime')) AS fecha, 0 AS orden, 0 AS hid
+            FROM productos p LEFT JOIN (
+                SELECT producto_id, sum(CASE tipo_movimiento WHEN 'VENTA' THEN -cantidad ELSE cantidad END) AS neto,
+                       min(fecha) AS primera
+                FROM historial WHERE tipo_movimiento IN ('COMPRA', 'VENTA') GROUP BY producto_id) h ON h.producto_id = p.id
+            WHERE p.cantidad <> coalesce(h.neto, 0)
+            UNION ALL
+            SELECT producto_id, CASE tipo_movimiento WHEN 'VENTA' THEN -cantidad ELSE cantidad END, fecha, 1, id
+            FROM historial WHERE tipo_movimiento IN ('COMPRA', 'VENTA') AND producto_id IN (SELECT id FROM productos))
+        ORDER BY fecha, orden, hid""")
+    # Fotos con el stock acumulado, cada max(cada, productos) movimientos (ver snapshot_si_corresponde)
+    productos = cursor.execute("SELECT count(*) FROM productos").fetchone()[0]
+    intervalo, ultimo_foto, ultimo, fecha_max, stock = max(cada, productos), 0, None, None, {}
+    # Se recorre con otro cursor (sin traer todo a memoria) mientras este escribe las fotos
+    for mid, pid, delta, fecha in cursor.connection.execute("SELECT id, producto_id, delta, fecha FROM movimientos_stock ORDER BY id"):
+        stock[pid] = stock.get(pid, 0) + delta
+        ultimo = mid
+        if fecha_max is None or fecha > fecha_max: fecha_max = fecha
+        if ultimo - ultimo_foto >= intervalo:
+            _guardar_foto(cursor, ultimo, fecha_max, stock); ultimo_foto = ultimo
+    if ultimo is not None and ultimo != ultimo_foto: _guardar_foto(cursor, ultimo, fecha_max, stock)
+
+
+# --- FOTOS ---
+def _ultima_foto(cursor, momento=None):
+    # (id, ultimo_mov, fecha) de la última foto (con fecha <= momento si se pasa) o None
+    if momento is None:
+        return cursor.execute("SELECT id, ultimo_mov, fecha FROM snapshots_stock ORDER BY id DESC LIMIT 1").fetchone()
+    return cursor.execute("SELECT id, ultimo_mov, fecha FROM snapshots_stock WHERE fecha <= ? ORDER BY fecha DESC, id DESC LIMIT 1",
+                          (momento,)).fetchone()
+
+
+def _desde_foto(cursor, foto, momento=None, producto_id=None, hasta_mov=None):
+    # Stock {producto_id: cantidad} = foto + movimientos posteriores (hasta momento inclusive,
+    # y sin pasar del movimiento hasta_mov). Los movimientos se leen por rango de id y se suman
+    # acá: con sum() ... GROUP BY SQLite prefería recorrer idx_movimientos_producto entero
+    # (todo el libro) para no ordenar, y el costo crecía con la historia y no desde la foto.
+    cond, params = ["id > ?"], [foto[1] if foto else 0]
+    if hasta_mov is not None: cond.append("id <= ?"); params.append(hasta_mov)
+    if momento is not None: cond.append("fecha <= ?"); params.append(momento)
+    if producto_id is not None: cond.append("producto_id = ?"); params.append(producto_id)
+    stock = {}
+    if foto:
+        q, p = "SELECT producto_id, cantidad FROM snapshots_stock_detalle WHERE snapshot_id = ?", [foto[0]]
+        if producto_id is not None: q += " AND producto_id = ?"; p.append(producto_id)
+        stock = dict(cursor.execute(q, p))
+    for pid, delta in cursor.execute("SELECT producto_id, delta FROM movimientos_stock WHERE " + " AND ".join(cond), params):
+        stock[pid] = stock.get(pid, 0) + delta
+    return {pid: c for pid, c in stock.items() if c}
+
+
+def tomar_snapshot(cursor):
+    # Compacta los movimientos desde la última foto en una foto nueva; devuelve su id
+    # (None si no hubo movimientos). Llamar dentro de una transacción de escritura.
+    anterior = _ultima_foto(cursor)
+    ultimo, fecha = cursor.execute("SELECT max(id), max(fecha) FROM movimientos_stock WHERE id > ?",
+                                   (anterior[1] if anterior else 0,)).fetchone()
+    if ultimo is None: return None
+    if anterior: fecha = max(fecha, anterior[2])
+    return _guardar_foto(cursor, ultimo, fecha, _desde_foto(cursor, anterior))
+
+
+def _guardar_foto(cursor, ultimo, fecha, stock):
+    foto = cursor.execute("INSERT INTO snapshots_stock (ultimo_mov, fecha) VALUES (?, ?)", (ultimo, fecha)).lastrowid
+    cursor.executemany("INSERT INTO snapshots_stock_detalle (snapshot_id, producto_id, cantidad) VALUES (?,?,?)",
+                       [(foto, pid, c) for pid, c in stock.items() if c])
+    return foto
+
+
+def snapshot_si_corresponde(conn, cada=MOVIMIENTOS_POR_SNAPSHOT):
+    # Barato de llamar después de cada escritura: tres lecturas por índice
+    foto = _ultima_foto(conn)
+    ultimo = conn.execute("SELECT max(id) FROM movimientos_stock").fetchone()[0] or 0
+    productos = conn.execute("SELECT valor FROM resumen_general WHERE clave = 'productos'").fetchone()
+    if ultimo - (foto[1] if foto else 0) < max(cada, productos[0] if productos else 0): return None
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        foto = tomar_snapshot(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return foto
+
+
+# --- CONSULTAS ---
+def _momento(fecha):
+    # 'AAAA-MM-DD' = al cierre de ese día
+    return fecha + " 23:59:59" if len(fecha) == 10 else fecha
+
+
+def stock_al(conn, fecha, producto_id=None):
+    # Stock {producto_id: cantidad} al momento 'AAAA-MM-DD[ HH:MM:SS]' (inclusive); omite los 0.
+    # Se recorre desde la foto anterior hasta la primera foto posterior al momento: lo que vino
+    # después de esa foto se anotó más tarde (las fotos nunca bajan de fecha).
+    momento = _momento(fecha)
+    siguiente = conn.execute("SELECT ultimo_mov FROM snapshots_stock WHERE fecha > ? ORDER BY fecha, id LIMIT 1",
+                             (momento,)).fetchone()
+    return _desde_foto(conn, _ultima_foto(conn, momento), momento, producto_id, siguiente[0] if siguiente else None)
+
+
+def conciliar(conn):
+    # Libro (última foto + movimientos) contra productos.cantidad: [(producto_id, libro, actual)]
+    libro = _desde_foto(conn, _ultima_foto(conn))
+    actual = dict(conn.execute("SELECT id, cantidad FROM productos WHERE cantidad <> 0"))
+    return [(pid, libro.get(pid, 0), actual.get(pid, 0))
+            for pid in sorted(set(libro) | set(actual)) if libro.get(pid, 0) != actual.get(pid, 0)]
+
+
+if __name__ == "__main__":
+    # python -m gestion.movimientos [--snapshot] [--al AAAA-MM-DD]
+    with conexion() as conn:
+        if "--snapshot" in sys.argv:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            foto = tomar_snapshot(cursor)
+            conn.commit()
+            print(f"Foto {foto} tomada" if foto else "Sin movimientos nuevos")
+        if "--al" in sys.argv:
+            fecha = sys.argv[sys.argv.index("--al") + 1]
+            for pid, cantidad in sorted(stock_al(conn, fecha).items()): print(f"{pid:6d} {cantidad:8d}")
+        diferencias = conciliar(conn)
+        for pid, libro, actual in diferencias:
+            print(f"DIFERENCIA producto {pid}: libro={libro} actual={actual}")
+        print("Libro de stock conciliado" if not diferencias else f"{len(diferencias)} diferencias")
+    sys.exit(1 if diferencias else 0)
@@ -0,0 +1,69 @@
+# ==========================================
+# CONSULTAS DEL REGISTRO (historial paginado)
+# ==========================================
+# Las arma db_historial_pagina (gestion.db) y gestion.migraciones verifica su plan tal cual.
+# Sin filtro se recorre historial por id desde 'clave' (keyset), sin ordenar nada.
+# Con filtro de fecha o de ticket hay dos caminos: buscar por el índice del filtro y ordenar por
+# id lo que trae (caro si trae mucho), o recorrer por id filtrando al paso (caro si hay que
+# saltear mucho hasta llenar la página). Se estima con índices (los ids siguen a las fechas) y se
+# fuerza el más barato: librado a sí mismo, SQLite siempre elige el índice y ordena el año entero.
+
+TOPE_CONTEO_TICKET = 20_000  # más que esto ya no es un filtro selectivo
+COSTO_ORDENAR = 10           # buscar y ordenar una fila ~ recorrer 10 por id (medido en 50k)
+COLUMNAS = "id, ticket_id, fecha, tipo_movimiento, producto_nombre, cantidad, precio_unitario, total_renglon"
+
+
+def _condiciones(desde, hasta, ticket, indice=None):
+    # Solo la columna de 'indice' queda buscable: "+fecha" no puede usar idx_historial_fecha
+    f, t = ("" if indice == "fecha" else "+"), ("" if indice == "ticket" else "+")
+    cond, params = [], []
+    if desde: cond.append(f"{f}fecha >= ?"); params.append(desde)
+    if hasta: cond.append(f"{f}fecha < date(?, '+1 day')"); params.append(hasta)
+    if ticket:
+        # GLOB distingue mayúsculas y puede usar el índice de ticket_id (LIKE no)
+        cond.append(f"{t}ticket_id GLOB ?"); params.append(ticket.upper().translate(str.maketrans("", "", "*?[]")) + "*")
+    return cond, params
+
+
+def sql_estimacion(desde="", hasta="", ticket=""):
+    # Una fila: último id, primer id desde 'desde', primer id después de 'hasta' y cuántos tickets
+    # coinciden (hasta TOPE_CONTEO_TICKET). Todo por índice, sin recorrer el rango de fechas.
+    cols, params = ["(SELECT max(id) FROM historial)"], []
+    if desde: cols.append("(SELECT id FROM historial WHERE fecha >= ? ORDER BY fecha LIMIT 1)"); params.append(desde)
+    else: cols.append("(SELECT min(id) FROM historial)")
+    if hasta: cols.append("(SELECT id FROM historial WHERE fecha >= date(?, '+1 day') ORDER BY fecha LIMIT 1)"); params.append(hasta)
+    else: cols.append("NULL")
+    if ticket:
+        cond, p = _condiciones("", "", ticket, "ticket")
+        cols.append(f"(SELECT count(*) FROM (SELECT 1 FROM historial WHERE {cond[0]} LIMIT ?))"); params += p + [TOPE_CONTEO_TICKET]
+    else: cols.append("NULL")
+    return "SELECT " + ", ".join(cols), params
+
+
+def elegir_indice(estimacion, desde, hasta, ticket, clave, limite):
+    # Con la fila de sql_estimacion: None = recorrer por id; "fecha" / "ticket" = por ese índice
+    ultimo, primero, despues, tickets = estimacion
+    if not ultimo: return None
+    fin = despues or ultimo + 1  # primer id después del rango de fechas
+    trae, saltear = {}, 0
+    if desde or hasta:
+        trae["fecha"] = max(0, fin - (primero or fin))
+        if clave is None: saltear = ultimo + 1 - fin  # la primera página arranca del último id
+    if ticket and tickets < TOPE_CONTEO_TICKET: trae["ticket"] = tickets
+    if not trae: return None
+    indice = min(trae, key=trae.get)
+    recorrer = saltear + limite * ultimo / max(1, trae[indice])
+    return indice if COSTO_ORDENAR * trae[indice] < recorrer else None
+
+
+def sql_pagina(clave=None, direccion=None, limite=200, desde="", hasta="", ticket="", indice=None):
+    # direccion: None = primera página, "abajo" = más viejos que 'clave', "arriba" = más nuevos.
+    # Con 'indice', "+id" evita que SQLite lo cambie por recorrer desde 'clave'
+    q = f"SELECT {COLUMNAS} FROM historial"
+    cond, params = _condiciones(desde, hasta, ticket, indice)
+    id_ = "+id" if indice else "id"
+    if direccion == "abajo": cond.append(f"{id_} < ?"); params.append(clave)
+    if direccion == "arriba": cond.append(f"{id_} > ?"); params.append(clave)
+    if cond: q += " WHERE " + " AND ".join(cond)
+    q += " ORDER BY id " + ("ASC" if direccion == "arriba" else "DESC") + " LIMIT ?"
+    return q, params + [limite]
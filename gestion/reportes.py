@@ -0,0 +1,200 @@
+import sys
+from datetime import date, timedelta
+
+from gestion.conexion import conexion
+from gestion.movimientos import stock_al
+
+# ==========================================
+# REPORTES (pandas)
+# ==========================================
+# El historial puede tener millones de renglones: nunca se lee entero. Cada reporte recorre
+# la consulta en bloques de BLOQUE filas (read_sql_query con chunksize), agrupa cada bloque
+# con operaciones vectorizadas y acumula solo el parcial agrupado (una fila por producto o
+# por período). La memoria queda acotada por el tamaño del bloque y del catálogo.
+# Las ventas por día/mes salen del resumen materializado (gestion.resumen), que ya está agrupado.
+# pandas es opcional para el resto de la app: se importa recién al pedir un reporte.
+# Fechas: 'AAAA-MM-DD', ambas inclusive (como en los filtros del Registro).
+# Los importes se acumulan en centavos enteros y recién el resultado final pasa a pesos.
+
+BLOQUE = 100_000
+DIAS_POR_DEFECTO = 30
+IMPORTES = ("total", "ventas", "costo", "margen", "precio", "valor")  # columnas en centavos
+
+
+def _pandas():
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ValueError("Los reportes necesitan pandas (pip install pandas)")
+    return pd
+
+
+def _rango(desde, hasta):
+    hasta = hasta or date.today().isoformat()
+    desde = desde or (date.fromisoformat(hasta) - timedelta(days=DIAS_POR_DEFECTO - 1)).isoformat()
+    return desde, hasta
+
+
+def _bloques(conn, sql, params):
+    return _pandas().read_sql_query(sql, conn, params=params, chunksize=BLOQUE)
+
+
+def _acumular(acum, parcial):
+    # Suma un parcial agrupado al acumulado (mismos índices se suman; los enteros siguen enteros)
+    if acum is None: return parcial
+    return acum.add(parcial, fill_value=0).astype(parcial.dtypes.to_dict())
+
+
+def _con_nombres(conn, df):
+    # Nombre actual del producto (el del historial puede ser viejo)
+    pd = _pandas()
+    nombres = pd.read_sql_query("SELECT id AS producto_id, nombre, tipo, genero FROM productos", conn).set_index("producto_id")
+    return nombres.join(df, how="right").reset_index()
+
+
+# --- VENTAS POR PERÍODO ---
+def ventas_por_periodo(conn, periodo="dia", desde="", hasta="", tipo_movimiento="VENTA"):
+    pd = _pandas()
+    desde, hasta = _rango(desde, hasta)
+    tabla, col, largo = ("resumen_diario", "dia", 10) if periodo == "dia" else ("resumen_mensual", "mes", 7)
+    return pd.read_sql_query(f"""SELECT {col} AS periodo, total, unidades, renglones FROM {tabla}
+                                 WHERE tipo_movimiento = ? AND {col} BETWEEN ? AND ? AND renglones > 0 ORDER BY {col}""",
+                             conn, params=(tipo_movimiento, desde[:largo], hasta[:largo]))
+
+
+# --- PRODUCTOS MÁS VENDIDOS ---
+def top_productos(conn, desde="", hasta="", n=20, por="total"):
+    pd = _pandas()
+    desde, hasta = _rango(desde, hasta)
+    acum = None
+    for bloque in _bloques(conn, """SELECT producto_id, cantidad, total_renglon FROM historial
+                                    WHERE tipo_movimiento = 'VENTA' AND fecha >= ? AND fecha < date(?, '+1 day')""",
+                           (desde, hasta)):
+        parcial = bloque.groupby("producto_id").agg(unidades=("cantidad", "sum"), total=("total_renglon", "sum"),
+                                                    renglones=("cantidad", "size"))
+        acum = _acumular(acum, parcial)
+    if acum is None: return pd.DataFrame(columns=["producto_id", "nombre", "tipo", "genero", "unidades", "total", "renglones"])
+    return _con_nombres(conn, acum.nlargest(n, por if por in ("total", "unidades") else "total"))
+
+
+# --- MARGEN (venta contra el último costo de COMPRA) ---
+def margen(conn, desde="", hasta=""):
+    # El costo de cada venta es el precio_unitario de la última COMPRA del producto ANTERIOR a la
+    # venta. Se recorre el historial en orden cronológico arrastrando el último costo entre bloques.
+    pd = _pandas()
+    desde, hasta = _rango(desde, hasta)
+    ultimo_costo = pd.Series(dtype="float64")  # producto_id -> último costo visto
+    acum = None
+    # '+tipo_movimiento' evita el índice por tipo: así recorre idx_historial_fecha ya ordenado, sin ordenar millones de filas
+    for b in _bloques(conn, """SELECT producto_id, tipo_movimiento, cantidad, precio_unitario, total_renglon, fecha FROM historial
+                               WHERE +tipo_movimiento IN ('COMPRA', 'VENTA') AND fecha < date(?, '+1 day') ORDER BY fecha, id""",
+                      (hasta,)):
+        es_compra = b["tipo_movimiento"] == "COMPRA"
+        # Costo vigente en cada fila: la compra más reciente del bloque, o la arrastrada de bloques anteriores
+        costo = b["precio_unitario"].where(es_compra).groupby(b["producto_id"]).ffill()
+        costo = costo.fillna(b["producto_id"].map(ultimo_costo))
+        compras = b[es_compra]
+        if len(compras):
+            ultimo_costo = compras.groupby("producto_id")["precio_unitario"].last().combine_first(ultimo_costo)
+
+        ventas = b[~es_compra & (b["fecha"] >= desde)].assign(costo_unit=costo)
+        if not len(ventas): continue
+        # Las ventas sin compra previa no tienen costo: quedan fuera del margen y se informan aparte
+        con_costo = ventas["costo_unit"].notna()
+        ventas = ventas.assign(costo=ventas["costo_unit"] * ventas["cantidad"],
+                               ventas_costeadas=ventas["total_renglon"].where(con_costo, 0),
+                               sin_costo=ventas["cantidad"].where(~con_costo, 0))
+        parcial = ventas.groupby("producto_id").agg(unidades=("cantidad", "sum"), ventas=("total_renglon", "sum"),
+                                                    ventas_costeadas=("ventas_costeadas", "sum"),
+                                                    costo=("costo", "sum"), unidades_sin_costo=("sin_costo", "sum"))
+        acum = _acumular(acum, parcial)
+    columnas = ["producto_id", "nombre", "tipo", "genero", "unidades", "ventas", "costo", "unidades_sin_costo", "margen", "margen_pct"]
+    if acum is None: return pd.DataFrame(columns=columnas)
+    acum["margen"] = acum["ventas_costeadas"] - acum["costo"]
+    acum["margen_pct"] = (acum["margen"] / acum["ventas_costeadas"].where(acum["ventas_costeadas"] != 0)) * 100
+    return _con_nombres(conn, acum.sort_values("margen", ascending=False))[columnas]
+
+
+# --- ROTACIÓN DE STOCK ---
+def _stock_a(conn, fecha, nombre):
+    # Stock del libro (gestion.movimientos) al cierre de 'fecha' como Serie por producto_id
+    return _pandas().Series(stock_al(conn, fecha), name=nombre, dtype="int64")
+
+
+def rotacion_stock(conn, desde="", hasta=""):
+    # Stock al inicio y al fin del período según el libro de stock (incluye ajustes manuales).
+    # rotación = unidades vendidas / stock promedio
+    pd = _pandas()
+    desde, hasta = _rango(desde, hasta)
+    acum = None
+    for b in _bloques(conn, """SELECT producto_id, cantidad FROM historial
+                               WHERE tipo_movimiento = 'VENTA' AND fecha >= ? AND fecha < date(?, '+1 day')""", (desde, hasta)):
+        acum = _acumular(acum, b.groupby("producto_id")[["cantidad"]].sum().rename(columns={"cantidad": "vendidas"}))
+
+    stock = pd.read_sql_query("SELECT id AS producto_id, nombre, tipo, genero FROM productos", conn).set_index("producto_id")
+    inicio = (date.fromisoformat(desde) - timedelta(days=1)).isoformat()
+    stock = stock.join(_stock_a(conn, inicio, "stock_inicial")).join(_stock_a(conn, hasta, "stock_final"))
+    if acum is not None: stock = stock.join(acum, how="left")
+    for c in ("stock_inicial", "stock_final", "vendidas"):
+        stock[c] = stock[c].fillna(0).astype("int64") if c in stock else 0
+    dias = (date.fromisoformat(hasta) - date.fromisoformat(desde)).days + 1
+    promedio = (stock["stock_inicial"] + stock["stock_final"]) / 2
+    stock["rotacion"] = stock["vendidas"] / promedio.where(promedio > 0)
+    venta_diaria = stock["vendidas"] / dias
+    stock["dias_cobertura"] = stock["stock_final"] / venta_diaria.where(venta_diaria > 0)
+    columnas = ["producto_id", "nombre", "tipo", "genero", "vendidas", "stock_inicial", "stock_final", "rotacion", "dias_cobertura"]
+    return stock.reset_index().sort_values("rotacion", ascending=False, na_position="last")[columnas]
+
+
+# --- STOCK A UNA FECHA ---
+def stock_a_fecha(conn, hasta=""):
+    # Foto del libro más cercana + movimientos posteriores: no recorre toda la historia
+    pd = _pandas()
+    hasta = hasta or date.today().isoformat()
+    productos = pd.read_sql_query("SELECT id AS producto_id, nombre, tipo, genero, precio FROM productos", conn).set_index("producto_id")
+    df = productos.join(_stock_a(conn, hasta, "stock"), how="inner").reset_index()
+    df["valor"] = df["stock"] * df["precio"]  # a precio actual
+    return df.sort_values("nombre")[["producto_id", "nombre", "tipo", "genero", "stock", "precio", "valor"]]
+
+
+REPORTES = {
+    "Ventas por día": lambda conn, d, h: ventas_por_periodo(conn, "dia", d, h),
+    "Ventas por mes": lambda conn, d, h: ventas_por_periodo(conn, "mes", d, h),
+    "Productos más vendidos": lambda conn, d, h: top_productos(conn, d, h),
+    "Margen por producto": margen,
+    "Rotación de stock": rotacion_stock,
+    "Stock a una fecha": lambda conn, d, h: stock_a_fecha(conn, h),
+}
+
+
+def generar(nombre, desde="", hasta=""):
+    with conexion() as conn:
+        df = REPORTES[nombre](conn, desde, hasta)
+    for c in IMPORTES:
+        if c in df: df[c] = df[c] / 100
+    return df
+
+
+def exportar(df, ruta):
+    # .parquet necesita pyarrow (o fastparquet); cualquier otra extensión sale como CSV
+    if ruta.lower().endswith(".parquet"):
+        try: df.to_parquet(ruta, index=False)
+        except ImportError: raise ValueError("Para exportar a Parquet hace falta pyarrow (pip install pyarrow)")
+    else:
+        df.to_csv(ruta, index=False)
+    return len(df)
+
+
+if __name__ == "__main__":
+    # python -m gestion.reportes "Margen por producto" [desde] [hasta] [--salida archivo.csv|.parquet]
+    if len(sys.argv) < 2 or sys.argv[1] not in REPORTES:
+        print("Uso: python -m gestion.reportes REPORTE [desde] [hasta] [--salida archivo]")
+        print("Reportes: " + ", ".join(REPORTES)); sys.exit(2)
+    salida = sys.argv[sys.argv.index("--salida") + 1] if "--salida" in sys.argv else None
+    fechas = [a for a in sys.argv[2:] if not a.startswith("--") and a != salida]
+    try:
+        df = generar(sys.argv[1], *fechas[:2])
+        if salida: print(f"{exportar(df, salida)} filas exportadas a {salida}")
+        else: print(df.to_string(index=False))
+    except ValueError as e:
+        print(f"Error: {e}"); sys.exit(2)
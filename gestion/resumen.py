@@ -0,0 +1,141 @@
+import sys
+
+from gestion.conexion import conexion
+
+# ==========================================
+# RESUMEN MATERIALIZADO PARA EL DASHBOARD
+# ==========================================
+# Triggers sobre productos e historial mantienen al día:
+#   resumen_general  -> cantidad de productos y total histórico por tipo de movimiento
+#   resumen_diario   -> total por día y tipo de movimiento
+#   resumen_mensual  -> total por mes y tipo de movimiento
+# Así el dashboard lee un par de filas en vez de recorrer todo el historial.
+# Al ser triggers, cualquier camino que escriba (venta, compra, importación, otra terminal)
+# queda reflejado sin tocar su código.
+
+# Los totales son centavos enteros (gestion.dinero): la comparación con el recálculo es exacta.
+
+
+def _sql_sumar(signo, fila):
+    # Sentencias que suman (signo=+1) o restan (signo=-1) un renglón de historial (NEW/OLD)
+    return f"""
+        INSERT INTO resumen_general (clave, valor) VALUES ('total_' || {fila}.tipo_movimiento, {signo} * {fila}.total_renglon)
+            ON CONFLICT(clave) DO UPDATE SET valor = valor + excluded.valor;
+        INSERT INTO resumen_diario (dia, tipo_movimiento, total, unidades, renglones)
+            VALUES (substr({fila}.fecha, 1, 10), {fila}.tipo_movimiento, {signo} * {fila}.total_renglon, {signo} * {fila}.cantidad, {signo})
+            ON CONFLICT(dia, tipo_movimiento) DO UPDATE SET total = total + excluded.total,
+                unidades = unidades + excluded.unidades, renglones = renglones + excluded.renglones;
+        INSERT INTO resumen_mensual (mes, tipo_movimiento, total, unidades, renglones)
+            VALUES (substr({fila}.fecha, 1, 7), {fila}.tipo_movimiento, {signo} * {fila}.total_renglon, {signo} * {fila}.cantidad, {signo})
+            ON CONFLICT(mes, tipo_movimiento) DO UPDATE SET total = total + excluded.total,
+                unidades = unidades + excluded.unidades, renglones = renglones + excluded.renglones;"""
+
+
+def crear_tablas_resumen(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS resumen_general (
+            clave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL DEFAULT 0)''')
+    for tabla, periodo in (("resumen_diario", "dia"), ("resumen_mensual", "mes")):
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS {tabla} (
+                {periodo} TEXT,
+                tipo_movimiento TEXT,
+                total INTEGER NOT NULL DEFAULT 0,
+                unidades INTEGER NOT NULL DEFAULT 0,
+                renglones INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY({periodo}, tipo_movimiento))''')
+
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_resumen_producto_alta AFTER INSERT ON productos BEGIN
+        INSERT INTO resumen_general (clave, valor) VALUES ('productos', 1)
+            ON CONFLICT(clave) DO UPDATE SET valor = valor + 1;
+    END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS trg_resumen_producto_baja AFTER DELETE ON productos BEGIN
+        UPDATE resumen_general SET valor = valor - 1 WHERE clave = 'productos';
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_resumen_historial_alta AFTER INSERT ON historial BEGIN
+        {_sql_sumar(1, "NEW")}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_resumen_historial_baja AFTER DELETE ON historial BEGIN
+        {_sql_sumar(-1, "OLD")}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_resumen_historial_modif
+        AFTER UPDATE OF tipo_movimiento, cantidad, total_renglon, fecha ON historial BEGIN
+        {_sql_sumar(-1, "OLD")}
+        {_sql_sumar(1, "NEW")}
+    END""")
+
+
+# --- RECÁLCULO DESDE CERO ---
+_CALCULO_GENERAL = """
+    SELECT 'productos', count(*) FROM productos
+    UNION ALL
+    SELECT 'total_' || tipo_movimiento, sum(total_renglon) FROM historial GROUP BY tipo_movimiento"""
+_CALCULO_PERIODO = """
+    SELECT substr(fecha, 1, {largo}), tipo_movimiento, sum(total_renglon), sum(cantidad), count(*)
+    FROM historial GROUP BY 1, 2"""
+
+
+def reconstruir_resumen(cursor):
+    # Recalcula todo desde productos/historial (se usa en la migración y para corregir deriva)
+    cursor.execute("DELETE FROM resumen_general")
+    cursor.execute("DELETE FROM resumen_diario")
+    cursor.execute("DELETE FROM resumen_mensual")
+    cursor.execute("INSERT INTO resumen_general (clave, valor) " + _CALCULO_GENERAL)
+    cursor.execute("INSERT INTO resumen_diario (dia, tipo_movimiento, total, unidades, renglones) "
+                   + _CALCULO_PERIODO.format(largo=10))
+    cursor.execute("INSERT INTO resumen_mensual (mes, tipo_movimiento, total, unidades, renglones) "
+                   + _CALCULO_PERIODO.format(largo=7))
+
+
+def _distintos(esperado, guardado):
+    return (esperado or 0) != (guardado or 0)
+
+
+def verificar_resumen(conn):
+    # Compara el resumen guardado con un recálculo; devuelve [(tabla, clave, esperado, guardado)]
+    deriva = []
+    esperado = dict(conn.execute(_CALCULO_GENERAL).fetchall())
+    guardado = dict(conn.execute("SELECT clave, valor FROM resumen_general").fetchall())
+    for clave in sorted(set(esperado) | set(guardado)):
+        if _distintos(esperado.get(clave), guardado.get(clave)):
+            deriva.append(("resumen_general", clave, esperado.get(clave), guardado.get(clave)))
+
+    for tabla, periodo, largo in (("resumen_diario", "dia", 10), ("resumen_mensual", "mes", 7)):
+        esperado = {(p, t): (tot, u, r) for p, t, tot, u, r in conn.execute(_CALCULO_PERIODO.format(largo=largo))}
+        guardado = {(p, t): (tot, u, r) for p, t, tot, u, r in
+                    conn.execute(f"SELECT {periodo}, tipo_movimiento, total, unidades, renglones FROM {tabla}")}
+        for clave in sorted(set(esperado) | set(guardado), key=str):
+            e, g = esperado.get(clave, (0, 0, 0)), guardado.get(clave, (0, 0, 0))
+            if any(_distintos(a, b) for a, b in zip(e, g)):
+                deriva.append((tabla, clave, e, g))
+    return deriva
+
+
+# --- LECTURAS PARA LA INTERFAZ ---
+def totales_dashboard(conn):
+    # (productos en catálogo, ventas históricas en centavos)
+    vals = dict(conn.execute("SELECT clave, valor FROM resumen_general WHERE clave IN ('productos', 'total_VENTA')"))
+    return int(vals.get('productos', 0)), vals.get('total_VENTA', 0) or 0
+
+
+def totales_periodo(conn, periodo, tipo_movimiento="VENTA"):
+    # periodo: 'YYYY-MM-DD' (día) o 'YYYY-MM' (mes)
+    tabla, col = ("resumen_diario", "dia") if len(periodo) == 10 else ("resumen_mensual", "mes")
+    fila = conn.execute(f"SELECT total, unidades, renglones FROM {tabla} WHERE {col}=? AND tipo_movimiento=?",
+                        (periodo, tipo_movimiento)).fetchone()
+    return fila or (0, 0, 0)
+
+
+if __name__ == "__main__":
+    # python -m gestion.resumen [--reconstruir]
+    with conexion() as conn:
+        deriva = verificar_resumen(conn)
+        for tabla, clave, esperado, guardado in deriva:
+            print(f"DERIVA {tabla} {clave}: esperado={esperado} guardado={guardado}")
+        print("Resumen consistente" if not deriva else f"{len(deriva)} diferencias")
+        if deriva and "--reconstruir" in sys.argv:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            reconstruir_resumen(cursor)
+            conn.commit()
+            print("Resumen reconstruido")
+    sys.exit(1 if deriva and "--reconstruir" not in sys.argv else 0)
@@ -0,0 +1,280 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from gestion import db, trabajador
+from gestion.catalogo import catalogo
+from gestion.conexion import obtener_pool
+from gestion.metricas import metricas
+
+# ==========================================
+# SERVIDOR HTTP/JSON PARA VARIAS TERMINALES
+# ==========================================
+# Un solo proceso es dueño de negocio.db y las cajas le hablan por HTTP (gestion.cliente),
+# en vez de abrir el mismo archivo por una carpeta de red (locks y timeouts).
+# asyncio atiende las conexiones; el trabajo de DB corre en los hilos de gestion.trabajador:
+# TODAS las escrituras pasan por el único hilo de escrituras, en orden de llegada, así que
+# nunca compiten entre sí por el lock de SQLite. Las lecturas van por los hilos de lectura
+# y el catálogo se sirve desde la caché en memoria.
+# 'version' sube con cada escritura: los clientes la consultan para saber si recargar.
+# Cada escritura responde además "version": [antes, después]; si subió más de uno, otra
+# caja (o un cambio externo) escribió en el medio y el cliente recarga todo el catálogo.
+# Pensado para la red local del negocio: sin HTTPS; NEGOCIO_TOKEN exige el header X-Token.
+# Todos los importes (precios, totales) van y vienen en centavos enteros.
+
+HOST = os.environ.get("NEGOCIO_HOST", "127.0.0.1")
+PUERTO = int(os.environ.get("NEGOCIO_PUERTO", "8765"))
+TOKEN = os.environ.get("NEGOCIO_TOKEN", "")
+MAX_CUERPO = 64 * 1024 * 1024  # la importación manda el archivo entero
+INTERVALO_VIGILANCIA = 2  # s entre chequeos de cambios hechos directo sobre la DB
+
+RAZONES = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ErrorPedido(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _json(cuerpo):
+    try: return json.loads(cuerpo or b"{}")
+    except ValueError: raise ErrorPedido(400, "JSON inválido")
+
+
+def _uno(consulta, clave, defecto=""):
+    return consulta.get(clave, [defecto])[0]
+
+
+def _centavos(valor):
+    # Los importes viajan en centavos enteros (gestion.dinero): 12.5 no se trunca en silencio
+    if type(valor) is not int: raise ValueError("precio en centavos enteros")
+    return valor
+
+
+# --- OPERACIONES (corren en hilos de trabajo; devuelven (estado, datos)) ---
+def op_version(servidor, consulta, cuerpo):
+    return 200, {"version": servidor.version}
+
+
+def op_productos(servidor, consulta, cuerpo):
+    if "ids" in consulta:
+        ids = [int(i) for i in _uno(consulta, "ids").split(",") if i]
+        return 200, [p for p in map(catalogo().por_id, ids) if p]
+    if "q" in consulta: return 200, db.db_buscar_productos(_uno(consulta, "q"))
+    return 200, catalogo().listar(_uno(consulta, "filtro"))
+
+
+def op_crear_producto(servidor, consulta, cuerpo):
+    d = _json(cuerpo)
+    try:
+        pid = db.db_crear_producto(d["tipo"], d["nombre"], d["genero"], int(d["cantidad"]), _centavos(d["precio"]))
+    except sqlite3.IntegrityError as e:
+        raise ErrorPedido(409, str(e))
+    except (KeyError, TypeError, ValueError):
+        raise ErrorPedido(400, "Faltan datos del producto")
+    return 201, {"id": pid}
+
+
+def op_actualizar_producto(servidor, consulta, cuerpo, pid):
+    d = _json(cuerpo)
+    try: res = db.db_actualizar_producto(int(pid), d["tipo"], d["nombre"], d["genero"], int(d["cantidad"]), _centavos(d["precio"]))
+    except (KeyError, TypeError, ValueError): raise ErrorPedido(400, "Faltan datos del producto")
+    return 200, {"resultado": res, "ids": [int(pid)]}
+
+
+def op_venta(servidor, consulta, cuerpo):
+    carrito = _json(cuerpo).get("carrito") or []
+    res = db.db_procesar_venta(carrito)
+    return 200, {"resultado": res, "ids": sorted({it.get("id") for it in carrito if it.get("id")})}
+
+
+def op_compra(servidor, consulta, cuerpo):
+    # Puede crear productos: los ids nuevos no se conocen acá, el cliente recarga por versión
+    carrito = _json(cuerpo).get("carrito") or []
+    res = db.db_procesar_compra(carrito)
+    return 200, {"resultado": res, "ids": sorted({it.get("id") for it in carrito if it.get("id")})}
+
+
+def op_historial(servidor, consulta, cuerpo):
+    clave = _uno(consulta, "clave")
+    filas = db.db_historial_pagina(int(clave) if clave else None, _uno(consulta, "direccion") or None,
+                                   int(_uno(consulta, "limite", "200")), _uno(consulta, "desde"),
+                                   _uno(consulta, "hasta"), _uno(consulta, "ticket"))
+    return 200, filas
+
+
+def op_totales(servidor, consulta, cuerpo):
+    return 200, list(db.db_totales_dashboard())
+
+
+def op_importar(servidor, consulta, cuerpo):
+    from gestion.importador import importar
+    sufijo = ".xlsx" if _uno(consulta, "formato") == "xlsx" else ".csv"
+    with tempfile.NamedTemporaryFile(suffix=sufijo, delete=False) as f:
+        f.write(cuerpo)
+    # Corre en un hilo de lectura: solo cada lote pasa por el de escrituras (ver importar), así
+    # las ventas de las cajas no esperan el archivo entero
+    try: res = importar(f.name, escritor=trabajador.escribir)
+    except ValueError as e: raise ErrorPedido(400, str(e))
+    finally: os.unlink(f.name)
+    if res['importadas']: res['version'] = [servidor.version, servidor.subir_version()]
+    return 200, res
+
+
+def op_reporte(servidor, consulta, cuerpo, nombre):
+    from gestion.reportes import REPORTES, generar
+    nombre = unquote(nombre)
+    if nombre not in REPORTES: raise ErrorPedido(404, "Reporte desconocido")
+    try: df = generar(nombre, _uno(consulta, "desde"), _uno(consulta, "hasta"))
+    except ValueError as e: raise ErrorPedido(400, str(e))
+    # NaN no es JSON válido: viaja como null
+    df = df.astype(object).where(df.notna(), None)
+    return 200, {"columnas": list(df.columns), "filas": df.values.tolist()}
+
+
+def op_metricas(servidor, consulta, cuerpo):
+    # Latencias del lado del servidor (ver gestion.metricas)
+    return 200, metricas().instantanea()
+
+
+# (método, ruta, operación, es escritura)
+RUTAS = [
+    ("GET", r"/version", op_version, False),
+    ("GET", r"/productos", op_productos, False),
+    ("POST", r"/productos", op_crear_producto, True),
+    ("PUT", r"/productos/(\d+)", op_actualizar_producto, True),
+    ("POST", r"/ventas", op_venta, True),
+    ("POST", r"/compras", op_compra, True),
+    ("GET", r"/historial", op_historial, False),
+    ("GET", r"/totales", op_totales, False),
+    ("POST", r"/importar", op_importar, False),  # escribe por lotes por su cuenta
+    ("GET", r"/reportes/([^/]+)", op_reporte, False),
+    ("GET", r"/metricas", op_metricas, False),
+]
+
+
+def _ejecutar(op, *args):
+    # El JSON se arma también en el hilo de trabajo: una lista de 50k productos no frena el loop
+    estado, datos = op(*args)
+    return estado, _codificar(datos)
+
+
+def _ejecutar_escritura(op, servidor, *args):
+    # En el hilo de escrituras: la versión sube pegada a la escritura, no cuando el loop
+    # recibe el resultado (ahí la siguiente escritura ya podría haber leído la vieja)
+    antes = servidor.version
+    estado, datos = op(servidor, *args)
+    despues = servidor.subir_version()
+    if isinstance(datos, dict): datos["version"] = [antes, despues]
+    return estado, _codificar(datos)
+
+
+def _codificar(datos):
+    return json.dumps(datos, ensure_ascii=False).encode("utf-8")
+
+
+class Servidor:
+    def __init__(self, host=HOST, puerto=PUERTO, token=TOKEN):
+        self.host, self.puerto, self.token = host, puerto, token
+        self.version = int(time.time())  # distinta en cada arranque: un cliente viejo no la confunde
+        self._lock_version = threading.Lock()  # la suben el hilo de escrituras y _vigilar
+        self._server = None
+
+    def subir_version(self):
+        with self._lock_version:
+            self.version += 1
+            return self.version
+
+    # --- HTTP ---
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea: break
+                metodo, destino, _ = linea.decode("latin-1").split(" ", 2)
+                encabezados = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""): break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    encabezados[k.strip().lower()] = v.strip()
+                largo = int(encabezados.get("content-length", 0))
+                if largo > MAX_CUERPO:
+                    await self._responder(writer, 413, _codificar({"error": "Cuerpo demasiado grande"}), cerrar=True); break
+                cuerpo = await reader.readexactly(largo) if largo else b""
+                cerrar = encabezados.get("connection", "").lower() == "close"
+                if self.token and encabezados.get("x-token") != self.token:
+                    estado, datos = 401, _codificar({"error": "Token inválido"})
+                else:
+                    estado, datos = await self._despachar(metodo, destino, cuerpo)
+                await self._responder(writer, estado, datos, cerrar)
+                if cerrar: break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _responder(self, writer, estado, cuerpo, cerrar=False):
+        cabecera = (f"HTTP/1.1 {estado} {RAZONES.get(estado, '')}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n" + ("Connection: close\r\n" if cerrar else "") + "\r\n")
+        writer.write(cabecera.encode("latin-1") + cuerpo)
+        await writer.drain()
+
+    async def _despachar(self, metodo, destino, cuerpo):
+        url = urlsplit(destino)
+        for m, patron, op, escritura in RUTAS:
+            coincide = re.fullmatch(patron, url.path)
+            if m != metodo or not coincide: continue
+            consulta = parse_qs(url.query)
+            if escritura: futuro = trabajador.escribir(_ejecutar_escritura, op, self, consulta, cuerpo, *coincide.groups())
+            else: futuro = trabajador.leer(_ejecutar, op, self, consulta, cuerpo, *coincide.groups())
+            try:
+                return await asyncio.wrap_future(futuro)
+            except ErrorPedido as e:
+                return e.estado, _codificar({"error": str(e)})
+            except Exception as e:
+                return 500, _codificar({"error": str(e)})
+        return 404, _codificar({"error": f"{metodo} {url.path} no existe"})
+
+    # --- ciclo de vida ---
+    async def _vigilar(self):
+        # Si alguien escribe directo en la DB (ej. un script), el catálogo se recarga y la versión sube
+        while True:
+            await asyncio.sleep(INTERVALO_VIGILANCIA)
+            if await asyncio.wrap_future(trabajador.leer(catalogo().verificar_externos)): self.subir_version()
+
+    async def iniciar(self):
+        db.iniciar_db()
+        catalogo().cargar()
+        self._server = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._server.sockets[0].getsockname()[1]  # por si se pidió el puerto 0
+        asyncio.get_running_loop().create_task(self._vigilar())
+        return self
+
+    async def servir(self):
+        await self.iniciar()
+        print(f"Sirviendo {os.path.abspath(obtener_pool().ruta)} en http://{self.host}:{self.puerto}", flush=True)
+        async with self._server:
+            await self._server.serve_forever()
+
+
+if __name__ == "__main__":
+    # python -m gestion.servidor [--host 0.0.0.0] [--puerto 8765] [--db negocio.db]
+    args = sys.argv[1:]
+    opcion = lambda nombre, defecto: args[args.index(nombre) + 1] if nombre in args else defecto
+    if "--db" in args:
+        from gestion.conexion import configurar
+        configurar(opcion("--db", None))
+    try:
+        asyncio.run(Servidor(opcion("--host", HOST), int(opcion("--puerto", PUERTO))).servir())
+    except KeyboardInterrupt:
+        pass
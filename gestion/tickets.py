@@ -0,0 +1,71 @@
+import os
+import threading
+from datetime import datetime
+
+from gestion.conexion import conexion, obtener_pool
+
+# ==========================================
+# NUMERACIÓN DE TICKETS
+# ==========================================
+# Antes el ticket era "T-" + fecha/hora al segundo: dos ventas en el mismo segundo
+# (dos terminales, una importación) terminaban mezcladas bajo el mismo ticket.
+# Ahora cada proceso reserva un bloque de números en la tabla 'secuencias' y los
+# entrega desde memoria: una escritura a la DB cada BLOQUE tickets, no una por ticket.
+# Los números son únicos entre procesos y crecientes dentro de cada proceso
+# (los sobrantes de un bloque se pierden al cerrar; puede haber huecos).
+
+BLOQUE = 50
+
+
+def crear_tabla_secuencias(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS secuencias (
+            nombre TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL)''')
+
+
+class SecuenciaTickets:
+    def __init__(self, nombre, bloque=BLOQUE):
+        self.nombre = nombre
+        self.bloque = bloque
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._pid = os.getpid()
+        self._ruta = None
+        self._proximo, self._tope = 1, 0
+
+    def _reservar(self):
+        with conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("INSERT OR IGNORE INTO secuencias (nombre, valor) VALUES (?, 0)", (self.nombre,))
+                tope = cursor.execute("UPDATE secuencias SET valor = valor + ? WHERE nombre = ? RETURNING valor",
+                                    (self.bloque, self.nombre)).fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._proximo, self._tope = tope - self.bloque + 1, tope
+        self._ruta = obtener_pool().ruta
+
+    def siguiente(self):
+        with self._lock:
+            # Un bloque reservado no sirve en un proceso hijo (fork) ni en otra DB
+            if self._pid != os.getpid(): self._reiniciar()
+            if self._proximo > self._tope or self._ruta != obtener_pool().ruta: self._reservar()
+            n = self._proximo
+            self._proximo += 1
+            return n
+
+
+_secuencias = {}
+_lock_secuencias = threading.Lock()
+
+def nuevo_ticket(prefijo):
+    # prefijo: "T" (venta), "C" (compra) o "A" (ajuste manual de stock). Ej: T-20261017-000123
+    with _lock_secuencias:
+        if prefijo not in _secuencias: _secuencias[prefijo] = SecuenciaTickets(prefijo)
+    n = _secuencias[prefijo].siguiente()
+    return f"{prefijo}-{datetime.now().strftime('%Y%m%d')}-{n:06d}"
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# ACCESO A DATOS EN SEGUNDO PLANO
+# ==========================================
+# La interfaz no debe esperar a SQLite en su propio hilo: con timeout=10 una DB bloqueada
+# por otra terminal congelaba la ventana hasta 10 segundos. Las operaciones se mandan a
+# hilos propios y devuelven un Future; la interfaz recoge el resultado desde su loop.
+#   - escrituras: un solo hilo, así ventas/compras/ediciones se aplican en orden
+#   - lecturas: hilos aparte, para que un refresco no quede en cola detrás de una escritura
+#     larga (con WAL las lecturas no esperan a las escrituras)
+
+_escrituras = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-escritura")
+_lecturas = ThreadPoolExecutor(max_workers=2, thread_name_prefix="db-lectura")
+
+
+def escribir(fn, *args, **kwargs):
+    return _escrituras.submit(fn, *args, **kwargs)
+
+
+def leer(fn, *args, **kwargs):
+    return _lecturas.submit(fn, *args, **kwargs)
+
+
+def detener():
+    # Espera lo que esté en curso (no se corta una venta a la mitad) y descarta lo pendiente
+    _escrituras.shutdown(wait=True, cancel_futures=False)
+    _lecturas.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,83 @@
+import json
+
+# ==========================================
+# MOTOR DE VENTAS EN LOTE
+# ==========================================
+# En vez de SELECT/UPDATE/INSERT por renglón (3N idas y vueltas), la venta completa
+# se resuelve en una sola transacción BEGIN IMMEDIATE con 3 sentencias:
+#   1. Validar el stock de todo el carrito en una consulta
+#   2. Descontar con un executemany protegido (cantidad >= ?), sin leer-modificar-escribir desde Python
+#   3. Insertar el historial en bloque
+
+
+def agrupar_carrito(carrito):
+    # Un mismo producto puede aparecer en varios renglones: validamos contra el total pedido
+    pedidos = {}
+    for item in carrito:
+        pedidos[item['id']] = pedidos.get(item['id'], 0) + item['cantidad']
+    return pedidos
+
+
+def validar_stock(cursor, carrito):
+    pedidos = agrupar_carrito(carrito)
+    cursor.execute("SELECT id, cantidad FROM productos WHERE id IN (SELECT value FROM json_each(?))",
+                   (json.dumps(list(pedidos)),))
+    stock = dict(cursor.fetchall())
+
+    fallos = []
+    for renglon, item in enumerate(carrito):
+        disponible = stock.get(item['id'])
+        if disponible is None:
+            motivo = "Producto inexistente"
+        elif item['cantidad'] <= 0:
+            motivo = "Cantidad inválida"
+        elif disponible < pedidos[item['id']]:
+            motivo = "Stock insuficiente"
+        else:
+            continue
+        fallos.append({'renglon': renglon, 'id': item['id'], 'nombre': item['nombre'],
+                       'pedido': pedidos[item['id']], 'disponible': disponible or 0, 'motivo': motivo})
+    return fallos
+
+
+def procesar_venta_lote(conn, carrito, ticket_id, fecha, al_bloquear=None):
+    # Devuelve la lista de renglones que fallaron ([] si la venta se guardó).
+    # al_bloquear(), si se da, se llama con el lock de escritura ya tomado
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        if al_bloquear: al_bloquear()
+        fallos = validar_stock(cursor, carrito)
+        if fallos:
+            conn.rollback()
+            return fallos
+
+        pedidos = agrupar_carrito(carrito)
+        cursor.executemany("UPDATE productos SET cantidad = cantidad - ? WHERE id = ? AND cantidad >= ?",
+                           [(c, pid, c) for pid, c in pedidos.items()])
+        if cursor.rowcount != len(pedidos):
+            # No debería pasar con el lock de escritura tomado, pero no vendemos a ciegas
+            conn.rollback()
+            return validar_stock(cursor, carrito) or [{'renglon': None, 'id': None, 'nombre': None, 'pedido': 0,
+                                                      'disponible': 0, 'motivo': "Stock modificado durante la venta"}]
+
+        cursor.executemany("""
+            INSERT INTO historial (ticket_id, producto_id, producto_nombre, tipo_movimiento, cantidad, precio_unitario, total_renglon, fecha)
+            VALUES (?, ?, ?, 'VENTA', ?, ?, ?, ?)
+        """, [(ticket_id, item['id'], item['nombre'], item['cantidad'], item['precio'],
+               item['cantidad'] * item['precio'], fecha) for item in carrito])
+        conn.commit()
+        return []
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def describir_fallos(fallos):
+    partes = []
+    for f in fallos:
+        if f['motivo'] == "Stock insuficiente":
+            partes.append(f"Stock insuficiente para {f['nombre']} (pedido {f['pedido']}, disponible {f['disponible']})")
+        else:
+            partes.append(f"{f['motivo']}: {f['nombre'] or ''}".rstrip(": "))
+    return "Error: " + "; ".join(partes)